@@ -0,0 +1,45 @@
+"""Compares item creation from local files with item creation from granules
+held in memory, using the granules in tests/data-files. The in-memory times
+are the CPU cost of item creation without storage."""
+
+import timeit
+from pathlib import Path
+
+import fsspec
+
+from stactools.sentinel3.filesystem import load_granule
+from stactools.sentinel3.stac import create_item_dict
+
+root = Path(__file__).parents[1]
+hrefs = [
+    str(p.parent)
+    for p in sorted((root / "tests" / "data-files").glob("*.SEN3/xfdumanifest.xml"))
+]
+local = fsspec.filesystem("file")
+loaded = [load_granule(href) for href in hrefs]
+repeat = 20
+
+
+def from_paths() -> None:
+    for href in hrefs:
+        create_item_dict(href)
+
+
+def from_local_filesystem() -> None:
+    for href in hrefs:
+        create_item_dict(href, filesystem=local)
+
+
+def from_memory() -> None:
+    for filesystem, href in loaded:
+        create_item_dict(href, filesystem=filesystem)
+
+
+print(f"{len(hrefs)} granules x {repeat} repetitions")
+for name, function in [
+    ("local paths", from_paths),
+    ("local fsspec filesystem", from_local_filesystem),
+    ("in memory", from_memory),
+]:
+    seconds = timeit.timeit(function, number=repeat)
+    print(f"{name:24} {seconds * 1000 / (repeat * len(hrefs)):8.3f} ms/item")
@@ -0,0 +1,44 @@
+"""Measures item creation under remote object-store conditions, simulated for
+the granules in tests/data-files: requests and bytes per item, and the time
+per item with and without a warm block cache."""
+
+import tempfile
+import time
+from pathlib import Path
+
+from stactools.sentinel3.cache import BlockCache, set_block_cache
+from stactools.sentinel3.simulation import SimulatedObjectStore
+from stactools.sentinel3.stac import create_item_dict
+
+LATENCY = 0.05
+BANDWIDTH = 50e6
+
+root = Path(__file__).parents[1]
+hrefs = [
+    str(p.parent)
+    for p in sorted((root / "tests" / "data-files").glob("*.SEN3/xfdumanifest.xml"))
+]
+
+
+def run(name: str, store: SimulatedObjectStore) -> None:
+    start = time.perf_counter()
+    for href in hrefs:
+        create_item_dict(href, filesystem=store)
+    seconds = time.perf_counter() - start
+    stats = store.stats
+    print(
+        f"{name:20} {stats.requests / len(hrefs):8.1f} requests/item "
+        f"{stats.bytes / len(hrefs) / 1e6:8.2f} MB/item "
+        f"{seconds * 1000 / len(hrefs):8.1f} ms/item"
+    )
+
+
+print(
+    f"{len(hrefs)} granules, {LATENCY * 1000:.0f} ms latency, {BANDWIDTH / 1e6:.0f} MB/s"
+)
+run("no cache", SimulatedObjectStore(latency=LATENCY, bandwidth=BANDWIDTH))
+with tempfile.TemporaryDirectory() as directory:
+    set_block_cache(BlockCache(directory))
+    run("cold block cache", SimulatedObjectStore(latency=LATENCY, bandwidth=BANDWIDTH))
+    run("warm block cache", SimulatedObjectStore(latency=LATENCY, bandwidth=BANDWIDTH))
+    set_block_cache(None)
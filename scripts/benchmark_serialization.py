@@ -0,0 +1,51 @@
+"""Compares item serialization through pystac and the stdlib json module
+with the fast path in stactools.sentinel3.serialization, using the items in
+examples/."""
+
+import json
+import timeit
+from pathlib import Path
+
+import pystac
+
+from stactools.sentinel3 import serialization
+
+root = Path(__file__).parents[1]
+dicts = [json.loads(p.read_text()) for p in sorted((root / "examples").glob("*.json"))]
+items = [pystac.Item.from_dict(d) for d in dicts]
+repeat = 200
+
+
+def stdlib_from_items() -> None:
+    for item in items:
+        json.dumps(item.to_dict(), indent=2)
+
+
+def fast_from_items() -> None:
+    for item in items:
+        serialization.dumps(serialization.item_to_dict(item), indent=True)
+
+
+def stdlib_from_dicts() -> None:
+    for d in dicts:
+        json.dumps(d, separators=(",", ":"))
+
+
+def fast_from_dicts() -> None:
+    for d in dicts:
+        serialization.dumps(d)
+
+
+for d in dicts:
+    assert json.loads(serialization.dumps(d)) == json.loads(json.dumps(d))
+
+print(f"orjson available: {serialization.orjson is not None}")
+print(f"{len(dicts)} items x {repeat} repetitions")
+for name, function in [
+    ("pystac.Item -> stdlib json", stdlib_from_items),
+    ("pystac.Item -> fast path", fast_from_items),
+    ("dict -> stdlib json", stdlib_from_dicts),
+    ("dict -> fast path", fast_from_dicts),
+]:
+    seconds = timeit.timeit(function, number=repeat)
+    print(f"{name:28} {seconds * 1000 / (repeat * len(dicts)):8.3f} ms/item")
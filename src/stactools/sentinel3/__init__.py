@@ -1,8 +1,19 @@
 import stactools.core
 
-from stactools.sentinel3.stac import create_item
-
-__all__ = ["create_item"]
+from stactools.sentinel3.batch import create_items, create_items_async
+from stactools.sentinel3.stac import (
+    create_item,
+    create_item_dict,
+    create_item_from_bytes,
+)
+
+__all__ = [
+    "create_item",
+    "create_item_dict",
+    "create_item_from_bytes",
+    "create_items",
+    "create_items_async",
+]
 
 stactools.core.use_fsspec()
 
@@ -0,0 +1,123 @@
+import os
+import posixpath
+import zipfile
+from typing import List, Optional
+
+import fsspec  # type: ignore
+from stactools.core.io import ReadHrefModifier
+
+from . import policy
+from .constants import MANIFEST_FILENAME
+from .filesystem import CHAIN_SEPARATOR, ZIP_PROTOCOL, is_member, open_file
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def is_zip(href: str) -> bool:
+    """Checks whether an HREF points to a zipped granule, e.g. a
+    ``.SEN3.zip`` file."""
+    return href.lower().rstrip("/").endswith(".zip")
+
+
+def granule_root(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> str:
+    """Returns the HREF that the files of a granule are joined to.
+
+    For a granule directory this is the HREF itself. For a zipped granule it
+    is an fsspec URL of the ``.SEN3`` directory inside the archive, e.g.
+    ``zip://S3A_..._002.SEN3::s3://bucket/S3A_..._002.SEN3.zip``. Only the
+    archive's central directory is read to find it, using range reads on
+    remote storage.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+
+    Returns:
+        str: The HREF to pass to :func:`join`.
+    """
+    if not is_zip(granule_href):
+        return granule_href
+
+    def read() -> List[str]:
+        with open_file(granule_href, read_href_modifier, filesystem) as f:
+            with zipfile.ZipFile(f) as archive:
+                return [
+                    name
+                    for name in archive.namelist()
+                    if posixpath.basename(name) == MANIFEST_FILENAME
+                ]
+
+    manifests = policy.call(read, kind="listing")
+    if not manifests:
+        raise ArchiveError(f"No {MANIFEST_FILENAME} in archive {granule_href}")
+    root = posixpath.dirname(min(manifests, key=len))
+    return f"{ZIP_PROTOCOL}{root}{CHAIN_SEPARATOR}{granule_href}"
+
+
+def join(granule_href: str, *paths: str) -> str:
+    """Joins paths to a granule HREF from :func:`granule_root`.
+
+    Args:
+        granule_href (str): The HREF to the granule directory, or to the
+            granule directory inside an archive.
+        *paths (str): Paths relative to the granule directory.
+
+    Returns:
+        str: The HREF of the file.
+    """
+    if not is_member(granule_href):
+        return os.path.join(granule_href, *paths)
+    member, target = granule_href[len(ZIP_PROTOCOL) :].split(CHAIN_SEPARATOR, 1)
+    # Member names are matched literally, so relative prefixes are resolved
+    member = posixpath.normpath(posixpath.join(member, *paths))
+    return f"{ZIP_PROTOCOL}{member}{CHAIN_SEPARATOR}{target}"
+
+
+def public_href(href: str) -> str:
+    """Returns the HREF of a file as published on items.
+
+    The ``zip://<member>::<archive>`` URLs of archive members can only be
+    read through fsspec, so members are published as the archive's HREF
+    with the member's path as fragment, e.g.
+    ``s3://bucket/S3A_..._002.SEN3.zip#S3A_..._002.SEN3/Oa01_radiance.nc``.
+    Any client fetching the HREF gets the archive that holds the file.
+
+    Args:
+        href (str): The HREF of a file, from :func:`join`.
+
+    Returns:
+        str: The HREF itself, or the archive-relative form for members.
+    """
+    if not is_member(href):
+        return href
+    member, target = href[len(ZIP_PROTOCOL) :].split(CHAIN_SEPARATOR, 1)
+    return f"{target}#{member}"
+
+
+def granule_name(granule_href: str) -> str:
+    """Returns the name of a granule's ``.SEN3`` directory.
+
+    Args:
+        granule_href (str): The HREF to the granule directory, or to the
+            granule directory inside an archive.
+
+    Returns:
+        str: The directory name, e.g. ``S3A_..._002.SEN3``.
+    """
+    if not is_member(granule_href):
+        return posixpath.basename(granule_href.rstrip("/"))
+    member, target = granule_href[len(ZIP_PROTOCOL) :].split(CHAIN_SEPARATOR, 1)
+    if member:
+        return posixpath.basename(member.rstrip("/"))
+    # Files at the top level of the archive
+    name = posixpath.basename(target.rstrip("/"))
+    return name[: -len(".zip")] if is_zip(name) else name
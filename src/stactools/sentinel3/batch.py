@@ -0,0 +1,570 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+import fsspec  # type: ignore
+import pystac
+from stactools.core.io import ReadHrefModifier
+
+from .cache import BlockCache, use_block_cache
+from .completeness import assert_complete
+from .incremental import ExistingItems, Unchanged, find_unchanged
+from .metadata_links import PrefetchedGranule
+from .policy import ReadPolicy, ReadStats, thread_read_stats, use_read_policy
+from .prefetch import prefetch
+from .serialization import EncodedItem, encode_item
+from .stac import create_item, create_item_dict
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+EXECUTORS = ("thread", "process")
+
+Result = Tuple[str, Union[pystac.Item, EncodedItem, Unchanged, Exception]]
+
+# Number of granules processed by the current worker process
+_tasks_done = 0
+
+
+@dataclass
+class BatchStats:
+    """Counters collected by :func:`create_items` while it runs."""
+
+    granules: int = 0
+    """Number of granules yielded, including failures."""
+
+    failures: int = 0
+    """Number of granules that raised an exception."""
+
+    unchanged: int = 0
+    """Number of granules skipped because their existing item is current."""
+
+    recycles: int = 0
+    """Number of times the worker pool was replaced with a fresh one."""
+
+    peak_rss: Dict[int, int] = field(default_factory=dict)
+    """Peak resident set size, in bytes, of each worker process by PID."""
+
+    reads: ReadStats = field(default_factory=ReadStats)
+    """Reads, retries, and hedged reads made for the granules, except for
+    those of reading ahead and of checksum verification, which read files on
+    their own threads."""
+
+
+class _TaskResult(NamedTuple):
+    value: Any
+    error: Optional[Exception]
+    pid: int
+    tasks: int
+    peak_rss: Optional[int]
+    reads: ReadStats
+
+
+def peak_rss() -> Optional[int]:
+    """Returns the peak resident set size of the current process.
+
+    Returns:
+        Optional[int]: The peak resident set size in bytes, or None on
+        platforms without the ``resource`` module.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return int(peak) if sys.platform == "darwin" else int(peak) * 1024
+
+
+def _create_item(
+    granule_href: str,
+    skip_nc: bool,
+    read_href_modifier: Optional[ReadHrefModifier],
+    **options: Any,
+) -> pystac.Item:
+    return create_item(granule_href, skip_nc, read_href_modifier, **options)
+
+
+def _encode_item(
+    granule_href: str,
+    skip_nc: bool,
+    read_href_modifier: Optional[ReadHrefModifier],
+    **options: Any,
+) -> EncodedItem:
+    return encode_item(
+        create_item_dict(granule_href, skip_nc, read_href_modifier, **options)
+    )
+
+
+def _make_worker(
+    encode: bool,
+    verify_checksums: bool,
+    filesystem: Optional[fsspec.AbstractFileSystem],
+    probe: str = "grouped",
+    record_processing: bool = False,
+) -> Callable[..., Any]:
+    worker: Callable[..., Any] = _encode_item if encode else _create_item
+    options: Dict[str, Any] = {}
+    if verify_checksums:
+        options["verify_checksums"] = True
+    if filesystem is not None:
+        options["filesystem"] = filesystem
+    if probe != "grouped":
+        options["probe"] = probe
+    if record_processing:
+        options["record_processing"] = True
+    # Module level functions and partials of them are picklable
+    return partial(worker, **options) if options else worker
+
+
+def _run_task(
+    worker: Callable[..., Any],
+    granule_href: str,
+    skip_nc: bool,
+    read_href_modifier: Optional[ReadHrefModifier],
+    existing_items: Optional[ExistingItems] = None,
+    check_complete: bool = False,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    read_policy: Optional[ReadPolicy] = None,
+    prefetched: Optional[PrefetchedGranule] = None,
+    block_cache: Optional[BlockCache] = None,
+    probe: str = "grouped",
+) -> _TaskResult:
+    global _tasks_done
+    _tasks_done += 1
+    reads = thread_read_stats()
+    value = None
+    error = None
+    # Scoped to this task, so that neither tasks on other threads nor the
+    # caller of a thread executor pick up the batch's policy and cache
+    with ExitStack() as stack:
+        if read_policy is not None:
+            stack.enter_context(use_read_policy(read_policy))
+        if block_cache is not None:
+            stack.enter_context(use_block_cache(block_cache))
+        try:
+            if existing_items is not None:
+                value = find_unchanged(
+                    granule_href,
+                    existing_items,
+                    read_href_modifier,
+                    filesystem,
+                    None if prefetched is None else prefetched.manifest_text,
+                    skip_nc,
+                    probe,
+                )
+            if value is None:
+                if check_complete:
+                    assert_complete(granule_href, read_href_modifier, filesystem)
+                if prefetched is None:
+                    value = worker(granule_href, skip_nc, read_href_modifier)
+                else:
+                    value = worker(
+                        granule_href,
+                        skip_nc,
+                        read_href_modifier,
+                        prefetched=prefetched,
+                    )
+        except Exception as e:
+            error = e
+    return _TaskResult(
+        value,
+        error,
+        os.getpid(),
+        _tasks_done,
+        peak_rss(),
+        thread_read_stats() - reads,
+    )
+
+
+def _resolve_limits(
+    max_workers: Optional[int], max_in_flight: Optional[int]
+) -> Tuple[int, int]:
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+    if max_in_flight is None:
+        max_in_flight = 2 * max_workers
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be at least 1, got {max_in_flight}")
+    return max_workers, max_in_flight
+
+
+def _process_context() -> multiprocessing.context.BaseContext:
+    # Forked workers inherit the memory of the parent process, and with it
+    # its resident set size and peak, so they would exceed max_worker_rss
+    # before processing anything. Workers forked from a fork server, or
+    # spawned, start from a fresh interpreter instead.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _make_executor(executor: str, max_workers: int) -> Executor:
+    if executor == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers)
+    if executor == "process":
+        return ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=_process_context()
+        )
+    raise ValueError(f"Unknown executor '{executor}', expected one of {EXECUTORS}")
+
+
+def _result(href: str, future: Union["Future[Any]", "asyncio.Future[Any]"]) -> Result:
+    error = future.exception()
+    if error is not None:
+        return href, error  # type: ignore
+    return href, future.result()
+
+
+def create_items(
+    granule_hrefs: Iterable[str],
+    skip_nc: bool = False,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    executor: Union[str, Executor] = "thread",
+    max_workers: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
+    encode: bool = False,
+    max_granules_per_worker: Optional[int] = None,
+    max_worker_rss: Optional[int] = None,
+    stats: Optional[BatchStats] = None,
+    existing_items: Optional[ExistingItems] = None,
+    check_complete: bool = False,
+    verify_checksums: bool = False,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    read_policy: Optional[ReadPolicy] = None,
+    prefetch_depth: int = 0,
+    prefetch_nc: bool = False,
+    block_cache: Optional[BlockCache] = None,
+    probe: str = "grouped",
+) -> Iterator[Result]:
+    """Creates STAC Items for many Sentinel-3 granules concurrently.
+
+    Granule HREFs are consumed lazily and at most ``max_in_flight`` granules
+    are submitted to the executor at any time, so memory use does not depend
+    on the number of input granules. Results are yielded in the order they
+    complete, not in input order.
+
+    A granule that fails does not stop the run: its exception is yielded in
+    place of the item, and not logged, so that callers report it once.
+
+    With ``encode=True`` the workers serialize each item to compact JSON and
+    return an :class:`EncodedItem` instead of a ``pystac.Item``. This avoids
+    pickling the pystac object graph between processes, and the bytes can be
+    passed straight to :class:`~stactools.sentinel3.ndjson.NdjsonShardWriter`.
+
+    NetCDF and XML libraries hold on to native memory across granules, so long
+    runs with the process executor can recycle their workers. Once a worker
+    has processed ``max_granules_per_worker`` granules, or its peak resident
+    set size exceeds ``max_worker_rss`` bytes, new granules go to a fresh pool
+    while the old pool finishes the granules already submitted to it and then
+    exits. Worker processes start from a fresh interpreter (through a fork
+    server where available) rather than as forks of the calling process, so
+    their memory use is their own. A pool whose worker was killed (e.g. by
+    the OOM killer) is replaced the same way; the granules it lost are
+    yielded as failures.
+
+    When reprocessing, ``existing_items`` looks up the item previously created
+    for a granule. If that item was created from the same manifest (compared
+    by MD5 checksum) by the same version of this package with the same
+    ``skip_nc`` and ``probe``, only the manifest is read and an
+    :class:`~stactools.sentinel3.incremental.Unchanged` marker is yielded in
+    place of the item. Items created with ``existing_items`` record what they
+    were created with in ``processing:software`` and ``processing:lineage``;
+    items without them are always created again.
+
+    With ``prefetch_depth``, the manifests of the next granules are read on
+    background threads of the calling process while the workers create items,
+    see :func:`~stactools.sentinel3.prefetch.prefetch`, under the same
+    ``read_policy`` and ``block_cache`` as the workers' reads. This hides
+    read latency when a granule's reads, not its parsing, dominate.
+
+    Example:
+        >>> for href, result in create_items(hrefs, executor="process"):
+        ...     if isinstance(result, Exception):
+        ...         print(f"{href} failed: {result}")
+
+    Args:
+        granule_hrefs (Iterable[str]): HREFs of the granule directories.
+        skip_nc (bool): Skip parsing NetCDF data files. Defaults to False.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL. Must be picklable
+            when using the process executor.
+        executor (Union[str, Executor]): Either ``"thread"``, ``"process"``, or
+            an existing ``concurrent.futures.Executor``. Executors passed in
+            are not shut down. Defaults to ``"thread"``.
+        max_workers (Optional[int]): Number of workers of the executor created
+            by this function. Defaults to the number of CPUs.
+        max_in_flight (Optional[int]): Maximum number of granules submitted
+            but not yet yielded. Defaults to twice ``max_workers``.
+        encode (bool): Return items as :class:`EncodedItem` JSON bytes rather
+            than ``pystac.Item`` objects. Defaults to False.
+        max_granules_per_worker (Optional[int]): Recycle the worker pool once
+            a worker has processed this many granules. Requires the
+            ``"process"`` executor. Defaults to never.
+        max_worker_rss (Optional[int]): Recycle the worker pool once a
+            worker's peak resident set size exceeds this many bytes. Requires
+            the ``"process"`` executor. Defaults to never.
+        stats (Optional[BatchStats]): Updated in place with counters and the
+            peak resident set size of every worker.
+        existing_items (Optional[Callable[[str], Optional[Dict[str, Any]]]]):
+            Returns the existing item of a granule HREF, or None, e.g. an
+            :class:`~stactools.sentinel3.incremental.ItemDirectory`. Must be
+            picklable when using the process executor. Defaults to creating
+            every item.
+        check_complete (bool): Before creating an item, check that every
+            file in the granule's manifest exists with the right size, and
+            yield an :class:`~stactools.sentinel3.completeness.IncompleteGranuleError`
+            otherwise. See
+            :func:`~stactools.sentinel3.completeness.check_completeness`.
+            Defaults to False.
+        verify_checksums (bool): Verify every data file against the MD5
+            checksum in the manifest before creating an item, and yield a
+            :class:`~stactools.sentinel3.verify.ChecksumMismatchError`
+            otherwise. See :func:`~stactools.sentinel3.verify.verify_checksums`.
+            Defaults to False.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A filesystem shared
+            by all granules of a worker, so that connections are reused, e.g.
+            from :func:`~stactools.sentinel3.filesystem.http_filesystem`.
+            Worker processes each get a copy with the same settings.
+        read_policy (Optional[ReadPolicy]): Retries and hedged reads of the
+            workers, see :class:`~stactools.sentinel3.policy.ReadPolicy`. It
+            is installed in every worker, and its counters are collected in
+            ``stats.reads``. Defaults to the policy of each worker process.
+        prefetch_depth (int): Number of granules whose manifests are read
+            ahead, or 0 to read them in the workers. Defaults to 0.
+        prefetch_nc (bool): Also read ahead the NetCDF headers, unless
+            ``skip_nc`` is set. Defaults to False.
+        block_cache (Optional[BlockCache]): An on-disk cache of remote reads,
+            installed in every worker, see
+            :class:`~stactools.sentinel3.cache.BlockCache`. Defaults to the
+            cache of each worker process.
+        probe (str): How NetCDF files are opened, see
+            :func:`~stactools.sentinel3.stac.create_item`. Defaults to
+            ``"grouped"``.
+
+    Returns:
+        Iterator[Tuple[str, Union[pystac.Item, EncodedItem, Unchanged, Exception]]]:
+        The granule HREF, and either its item, an unchanged marker, or the
+        exception raised while creating it.
+    """
+    max_workers, max_in_flight = _resolve_limits(max_workers, max_in_flight)
+    recycle = max_granules_per_worker is not None or max_worker_rss is not None
+    if recycle and executor != "process":
+        raise ValueError("Worker recycling requires the 'process' executor")
+    if stats is None:
+        stats = BatchStats()
+    if isinstance(executor, str):
+        pool = _make_executor(executor, max_workers)
+        owns_pool = True
+    else:
+        pool = executor
+        owns_pool = False
+
+    def should_recycle(task: _TaskResult) -> bool:
+        if max_granules_per_worker is not None:
+            if task.tasks >= max_granules_per_worker:
+                return True
+        if max_worker_rss is not None and task.peak_rss is not None:
+            if task.peak_rss > max_worker_rss:
+                return True
+        return False
+
+    worker = _make_worker(
+        encode, verify_checksums, filesystem, probe, existing_items is not None
+    )
+    hrefs: Generator[Tuple[str, Optional[PrefetchedGranule]], None, None]
+    if prefetch_depth > 0:
+        hrefs = prefetch(
+            granule_hrefs,
+            prefetch_depth,
+            read_href_modifier,
+            filesystem,
+            nc_headers=prefetch_nc and not skip_nc,
+            probe=probe,
+            read_policy=read_policy,
+            block_cache=block_cache,
+        )
+    else:
+        hrefs = ((href, None) for href in granule_hrefs)
+    pending: Dict["Future[_TaskResult]", Tuple[str, Executor]] = {}
+    retired: List[Executor] = []
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                href, prefetched = next(hrefs, (None, None))
+                if href is None:
+                    exhausted = True
+                    break
+                future = pool.submit(
+                    _run_task,
+                    worker,
+                    href,
+                    skip_nc,
+                    read_href_modifier,
+                    existing_items,
+                    check_complete,
+                    filesystem,
+                    read_policy,
+                    prefetched,
+                    block_cache,
+                    probe,
+                )
+                pending[future] = (href, pool)
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                href, source = pending.pop(future)
+                replace = False
+                error = future.exception()
+                if error is None:
+                    task = future.result()
+                    stats.reads.add(task.reads)
+                    if task.peak_rss is not None:
+                        stats.peak_rss[task.pid] = max(
+                            task.peak_rss, stats.peak_rss.get(task.pid, 0)
+                        )
+                    replace = recycle and should_recycle(task)
+                    result: Result = (href, task.error or task.value)
+                else:
+                    replace = isinstance(error, BrokenProcessPool)
+                    result = (href, error)  # type: ignore
+                if replace and owns_pool and source is pool:
+                    logger.info("Recycling worker pool")
+                    pool.shutdown(wait=False)
+                    retired.append(pool)
+                    pool = _make_executor(executor, max_workers)  # type: ignore
+                    stats.recycles += 1
+                stats.granules += 1
+                if isinstance(result[1], Unchanged):
+                    stats.unchanged += 1
+                elif isinstance(result[1], Exception):
+                    stats.failures += 1
+                yield result
+    finally:
+        hrefs.close()
+        for future in pending:
+            future.cancel()
+        if owns_pool:
+            for retired_pool in retired:
+                retired_pool.shutdown(wait=True)
+            pool.shutdown(wait=True)
+
+
+async def _aiter(
+    granule_hrefs: Union[Iterable[str], AsyncIterable[str]],
+) -> AsyncIterator[str]:
+    if isinstance(granule_hrefs, AsyncIterable):
+        async for href in granule_hrefs:
+            yield href
+    else:
+        for href in granule_hrefs:
+            yield href
+
+
+async def create_items_async(
+    granule_hrefs: Union[Iterable[str], AsyncIterable[str]],
+    skip_nc: bool = False,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    executor: Optional[Executor] = None,
+    max_in_flight: Optional[int] = None,
+    encode: bool = False,
+    verify_checksums: bool = False,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> AsyncIterator[Result]:
+    """Creates STAC Items for many Sentinel-3 granules from an asyncio program.
+
+    The asyncio counterpart of :func:`create_items`. Item creation is blocking,
+    so it runs in ``executor`` (the event loop's default executor when None)
+    while the event loop stays free. At most ``max_in_flight`` granules are
+    running at any time, and results are yielded in the order they complete.
+
+    Example:
+        >>> async for href, result in create_items_async(hrefs):
+        ...     ...
+
+    Args:
+        granule_hrefs (Union[Iterable[str], AsyncIterable[str]]): HREFs of the
+            granule directories, e.g. from an asynchronous bucket listing.
+        skip_nc (bool): Skip parsing NetCDF data files. Defaults to False.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        executor (Optional[Executor]): The executor to run item creation in.
+            Defaults to the event loop's default executor.
+        max_in_flight (Optional[int]): Maximum number of granules submitted
+            but not yet yielded. Defaults to twice the number of CPUs.
+        encode (bool): Return items as :class:`EncodedItem` JSON bytes rather
+            than ``pystac.Item`` objects. Defaults to False.
+        verify_checksums (bool): Verify every data file against the MD5
+            checksum in the manifest before creating an item. Defaults to
+            False.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A filesystem shared
+            by all granules, so that connections are reused.
+
+    Returns:
+        AsyncIterator[Tuple[str, Union[pystac.Item, EncodedItem, Exception]]]:
+        The granule HREF, and either its item or the exception raised while
+        creating it.
+    """
+    _, max_in_flight = _resolve_limits(None, max_in_flight)
+    loop = asyncio.get_running_loop()
+    worker = _make_worker(encode, verify_checksums, filesystem)
+    hrefs = _aiter(granule_hrefs).__aiter__()
+    pending: Dict["asyncio.Future[Any]", str] = {}
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_in_flight:
+                try:
+                    href = await hrefs.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                future = loop.run_in_executor(
+                    executor, worker, href, skip_nc, read_href_modifier
+                )
+                pending[future] = href
+            if not pending:
+                break
+            done: Set["asyncio.Future[Any]"]
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                yield _result(pending.pop(future), future)
+    finally:
+        for future in pending:
+            future.cancel()
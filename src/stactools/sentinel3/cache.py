@@ -0,0 +1,401 @@
+import contextvars
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+import fsspec  # type: ignore
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+# Once over its size cap, the cache is trimmed to this fraction of it, so that
+# eviction does not run on every write
+LOW_WATERMARK = 0.9
+
+# Keys of fsspec file info that identify a version of a remote file
+VERSION_KEYS = ("ETag", "etag", "md5", "Content-MD5", "generation")
+
+# Temporary files older than this many seconds were left by a killed writer
+STALE_TEMPORARY_AGE = 3600
+
+_TEMPORARY_PREFIX = ".tmp-"
+
+
+class BlockCache:
+    """An on-disk cache of fixed-size blocks of remote files, evicting the
+    least recently used blocks above a size cap.
+
+    Blocks are keyed by the unmodified HREF of the file together with its
+    size and ETag (or other version identifier reported by the filesystem),
+    so a file that changes remotely is read again, and signed HREFs whose
+    tokens change between reads still hit the cache. The directory can be
+    shared by several worker processes: blocks are written to a temporary
+    file and renamed into place, and any process may evict. Every process
+    evicts once it has written a tenth of the size cap since it last checked,
+    so the cache can exceed the cap by that much per process.
+
+    Every open requests the file's info (size and ETag) from the remote
+    filesystem to find its version, so even a warm cache costs one request
+    per file. With ``validate=False`` the info is cached too, and changes to
+    remote files go unnoticed until it is evicted. Local files, and remote
+    files whose size is unknown, e.g. HTTP responses without a
+    Content-Length, are never cached.
+
+    Example:
+        >>> set_block_cache(BlockCache("/tmp/sentinel3-cache"))
+        >>> item = create_item("https://example.com/S3A_..._002.SEN3")
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size: int = DEFAULT_MAX_SIZE,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        compression: Optional[str] = None,
+        validate: bool = True,
+    ) -> None:
+        """
+        Args:
+            directory (str): Local directory that holds the cached blocks.
+            max_size (int): Size cap of the directory in bytes. Defaults to
+                1 GiB.
+            block_size (int): Size of the cached blocks in bytes. Defaults to
+                1 MiB.
+            compression (Optional[str]): Either None or "zstd". "zstd"
+                requires the optional ``zstandard`` package. Defaults to None.
+            validate (bool): Request the info of every file when it is
+                opened, so that cached blocks of a changed file are not
+                used. Defaults to True.
+        """
+        if compression not in (None, "zstd"):
+            raise ValueError(
+                f"Unsupported compression {compression!r}, must be None or 'zstd'"
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd compression requires the 'zstandard' package, "
+                "install it with: pip install stactools-sentinel3[zstd]"
+            )
+        if max_size < block_size:
+            raise ValueError("max_size must be at least one block_size")
+        self.directory = directory
+        self.max_size = max_size
+        self.block_size = block_size
+        self.compression = compression
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Counters are per process
+        state = self.__dict__.copy()
+        state.update(hits=0, misses=0, _written=0)
+        return state
+
+    def key(self, href: str, info: Dict[str, Any]) -> str:
+        """Returns the key of a version of a file.
+
+        Args:
+            href (str): The HREF of the file, before any read HREF modifier.
+            info (Dict[str, Any]): The file's info from its fsspec filesystem.
+
+        Returns:
+            str: The key.
+        """
+        version = next((str(info[k]) for k in VERSION_KEYS if info.get(k)), "")
+        identity = f"{href}\0{info.get('size')}\0{version}\0{self.block_size}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, index: int) -> str:
+        extension = ".zst" if self.compression == "zstd" else ""
+        return os.path.join(self.directory, key[:2], f"{key}.{index}{extension}")
+
+    def get(self, key: str, index: int) -> Optional[bytes]:
+        """Returns a cached block, or None.
+
+        Args:
+            key (str): The key of the file, from :meth:`key`.
+            index (int): The index of the block in the file.
+
+        Returns:
+            Optional[bytes]: The block.
+        """
+        data = self._load(key, index)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def _load(self, key: str, index: int) -> Optional[bytes]:
+        path = self._path(key, index)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # The modification time orders blocks by their last use
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        if self.compression == "zstd":
+            data = zstandard.ZstdDecompressor().decompress(data)
+        return data
+
+    def put(self, key: str, index: int, data: bytes) -> None:
+        """Caches a block, evicting old blocks if needed.
+
+        Args:
+            key (str): The key of the file, from :meth:`key`.
+            index (int): The index of the block in the file.
+            data (bytes): The block.
+        """
+        path = self._path(key, index)
+        if self.compression == "zstd":
+            data = zstandard.ZstdCompressor().compress(data)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(
+            prefix=_TEMPORARY_PREFIX, dir=os.path.dirname(path)
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._written += len(data)
+        if self._written >= self.max_size * (1 - LOW_WATERMARK):
+            self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        now = time.time()
+        for subdirectory in os.scandir(self.directory):
+            if not subdirectory.is_dir():
+                continue
+            for entry in os.scandir(subdirectory.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(_TEMPORARY_PREFIX):
+                    if now - stat.st_mtime > STALE_TEMPORARY_AGE:
+                        _remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self) -> int:
+        """Returns the size of the cached blocks in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Removes the least recently used blocks while the cache is over its
+        size cap.
+
+        Returns:
+            int: The number of blocks removed.
+        """
+        self._written = 0
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_size:
+            return 0
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_size * LOW_WATERMARK:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+        logger.debug(f"Evicted {removed} blocks from {self.directory}")
+        return removed
+
+    def clear(self) -> None:
+        """Removes every cached block."""
+        for _, _, path in self._entries():
+            _remove(path)
+
+    def open(
+        self, filesystem: fsspec.AbstractFileSystem, path: str, href: str
+    ) -> IO[bytes]:
+        """Opens a remote file for reading through the cache.
+
+        Args:
+            filesystem (fsspec.AbstractFileSystem): The filesystem of the file.
+            path (str): The path of the file on the filesystem, including any
+                token added by a read HREF modifier.
+            href (str): The HREF the file is cached under.
+
+        Returns:
+            IO[bytes]: The open file.
+        """
+        info = None if self.validate else self._cached_info(href)
+        if info is None:
+            info = filesystem.info(path)
+            if not self.validate:
+                self._cache_info(href, info)
+        size = info.get("size")
+        if size is None:
+            # Blocks past the end of the file cannot be told apart
+            return filesystem.open(path, "rb")
+        raw = _CachedFile(self, filesystem, path, self.key(href, info), size)
+        return io.BufferedReader(raw, buffer_size=self.block_size)
+
+    def _info_key(self, href: str) -> str:
+        return hashlib.sha256(f"{href}\0info".encode("utf-8")).hexdigest()
+
+    def _cached_info(self, href: str) -> Optional[Dict[str, Any]]:
+        data = self._load(self._info_key(href), 0)
+        return None if data is None else json.loads(data)
+
+    def _cache_info(self, href: str, info: Dict[str, Any]) -> None:
+        # Only what keys the file's blocks
+        cached = {key: info[key] for key in ("size",) + VERSION_KEYS if key in info}
+        self.put(self._info_key(href), 0, json.dumps(cached, default=str).encode())
+
+
+def _remove(path: str) -> None:
+    # Another process may have evicted the block already
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _CachedFile(io.RawIOBase):
+    """A file whose blocks are read from a :class:`BlockCache`, and from the
+    remote file on misses, one request per run of missing blocks."""
+
+    def __init__(
+        self,
+        cache: BlockCache,
+        filesystem: fsspec.AbstractFileSystem,
+        path: str,
+        key: str,
+        size: int,
+    ) -> None:
+        super().__init__()
+        self._cache = cache
+        self._filesystem = filesystem
+        self._path = path
+        self._key = key
+        self._size = size
+        self._position = 0
+        self._file: Optional[IO[bytes]] = None
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        if offset < 0:
+            raise ValueError(f"Negative seek position {offset}")
+        self._position = offset
+        return offset
+
+    def _fetch(self, first: int, last: int) -> List[bytes]:
+        block_size = self._cache.block_size
+        if self._file is None:
+            self._file = self._filesystem.open(self._path, "rb")
+        self._file.seek(first * block_size)
+        data = self._file.read((last - first + 1) * block_size)
+        blocks = [
+            data[offset : offset + block_size]
+            for offset in range(0, len(data), block_size)
+        ]
+        for index, block in enumerate(blocks, first):
+            self._cache.put(self._key, index, block)
+        return blocks
+
+    def readinto(self, buffer: Any) -> int:
+        if self._position >= self._size:
+            return 0
+        block_size = self._cache.block_size
+        end = min(self._position + len(buffer), self._size)
+        first, last = self._position // block_size, (end - 1) // block_size
+        blocks: List[bytes] = []
+        missing: List[int] = []
+        for index in range(first, last + 1):
+            block = self._cache.get(self._key, index)
+            if block is None:
+                missing.append(index)
+                continue
+            if missing:
+                blocks += self._fetch(missing[0], missing[-1])
+                missing = []
+            blocks.append(block)
+        if missing:
+            blocks += self._fetch(missing[0], missing[-1])
+        data = b"".join(blocks)
+        start = self._position - first * block_size
+        count = max(0, min(len(buffer), len(data) - start))
+        buffer[:count] = data[start : start + count]
+        self._position += count
+        return count
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+_cache: Optional[BlockCache] = None
+_scoped_cache: "contextvars.ContextVar[Optional[BlockCache]]" = contextvars.ContextVar(
+    "block_cache", default=None
+)
+
+
+def set_block_cache(cache: Optional[BlockCache]) -> None:
+    """Sets the cache of every remote read in the current process.
+
+    Args:
+        cache (Optional[BlockCache]): The cache, or None to read without one.
+    """
+    global _cache
+    _cache = cache
+
+
+@contextmanager
+def use_block_cache(cache: BlockCache) -> Iterator[None]:
+    """Reads remote files of the current thread through a cache until the
+    block exits, leaving the reads of other threads alone.
+
+    Args:
+        cache (BlockCache): The cache.
+    """
+    token = _scoped_cache.set(cache)
+    try:
+        yield
+    finally:
+        _scoped_cache.reset(token)
+
+
+def get_block_cache() -> Optional[BlockCache]:
+    """Returns the cache of remote reads in the current thread, if any."""
+    cache = _scoped_cache.get()
+    return _cache if cache is None else cache
@@ -0,0 +1,145 @@
+import logging
+import os
+import sqlite3
+from typing import Any, Iterable, Iterator, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def granule_key(granule_href: str) -> str:
+    """Returns the key used to identify a granule in a checkpoint journal.
+
+    The key is the granule's directory name, e.g.
+    ``S3A_OL_1_EFR____20211021T073827_..._O_NR_002.SEN3``, so a run resumes
+    correctly even if the granules are listed from a different mount point or
+    bucket prefix.
+
+    Args:
+        granule_href (str): HREF of the granule directory.
+
+    Returns:
+        str: The granule key.
+    """
+    return os.path.basename(granule_href.rstrip("/"))
+
+
+class CheckpointJournal:
+    """Records completed granules of a batch run in a SQLite database, so an
+    interrupted run can resume where it stopped.
+
+    All completed granule keys are loaded into a set when the journal is
+    opened, so checking whether a granule is finished is a set lookup. New
+    records are buffered and committed every ``batch_size`` granules; after a
+    crash, at most the last uncommitted batch is processed again.
+
+    Record a granule only once its output has been written.
+
+    Example:
+        >>> with CheckpointJournal("run.sqlite") as journal:
+        ...     for href in journal.pending(hrefs):
+        ...         item = create_item(href)
+        ...         write_item(item, dest)
+        ...         journal.record(href, item.id, dest)
+    """
+
+    def __init__(self, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        """
+        Args:
+            path (str): Path of the SQLite database. Created if missing.
+            batch_size (int): Number of records buffered before they are
+                committed. Defaults to 1000.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size must be at least 1, got {batch_size}")
+        self.path = path
+        self.batch_size = batch_size
+        self._buffer: List[Tuple[str, str, str]] = []
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS completed ("
+            "granule TEXT PRIMARY KEY, item_id TEXT NOT NULL, location TEXT NOT NULL)"
+        )
+        self._connection.commit()
+        self._completed: Set[str] = {
+            row[0] for row in self._connection.execute("SELECT granule FROM completed")
+        }
+        logger.info(f"Loaded {len(self._completed)} completed granules from {path}")
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __contains__(self, granule_href: object) -> bool:
+        return (
+            isinstance(granule_href, str)
+            and granule_key(granule_href) in self._completed
+        )
+
+    def __len__(self) -> int:
+        return len(self._completed)
+
+    def pending(self, granule_hrefs: Iterable[str]) -> Iterator[str]:
+        """Filters out granules that are already complete.
+
+        Args:
+            granule_hrefs (Iterable[str]): HREFs of the granule directories.
+
+        Returns:
+            Iterator[str]: HREFs of the granules that are not yet complete.
+        """
+        for granule_href in granule_hrefs:
+            if granule_key(granule_href) not in self._completed:
+                yield granule_href
+
+    def record(self, granule_href: str, item_id: str, location: str) -> None:
+        """Marks a granule as complete.
+
+        Args:
+            granule_href (str): HREF of the granule directory.
+            item_id (str): ID of the item created from the granule.
+            location (str): Where the item was written.
+        """
+        key = granule_key(granule_href)
+        self._completed.add(key)
+        self._buffer.append((key, item_id, location))
+        if len(self._buffer) >= self.batch_size:
+            self.commit()
+
+    def location(self, granule_href: str) -> str:
+        """Returns where the item of a completed granule was written.
+
+        Args:
+            granule_href (str): HREF of the granule directory.
+
+        Returns:
+            str: The location recorded for the granule.
+        """
+        self.commit()
+        row = self._connection.execute(
+            "SELECT location FROM completed WHERE granule = ?",
+            (granule_key(granule_href),),
+        ).fetchone()
+        if row is None:
+            raise KeyError(granule_href)
+        return str(row[0])
+
+    def commit(self) -> None:
+        """Writes all buffered records to the database."""
+        if self._buffer:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO completed VALUES (?, ?, ?)",
+                    self._buffer,
+                )
+            self._buffer = []
+
+    def close(self) -> None:
+        """Commits buffered records and closes the database."""
+        self.commit()
+        self._connection.close()
@@ -3,6 +3,14 @@ import os
 
 import click
 
+from stactools.sentinel3.batch import EXECUTORS, create_items
+from stactools.sentinel3.cache import DEFAULT_MAX_SIZE, BlockCache
+from stactools.sentinel3.checkpoint import CheckpointJournal
+from stactools.sentinel3.diff import missing_granules, read_item_ids
+from stactools.sentinel3.incremental import ItemDirectory, Unchanged
+from stactools.sentinel3.inventory import GranuleInventory
+from stactools.sentinel3.metadata_links import PROBE_MODES
+from stactools.sentinel3.serialization import write_item
 from stactools.sentinel3.stac import create_item
 
 logger = logging.getLogger(__name__)
@@ -42,6 +50,255 @@ def create_sentinel3_command(cli):
         item_path = os.path.join(dst, "{}.json".format(item.id))
         item.set_self_href(item_path)
 
-        item.save_object()
+        write_item(item, item_path)
 
-        return sentinel3
+    @sentinel3.command(
+        "create-items",
+        short_help="Convert many Sentinel3 scenes into STAC items",
+    )
+    @click.argument("src", type=click.File("r"))
+    @click.argument("dst")
+    @click.option(
+        "--skip_nc", default=False, help="Insert <True> to skip reading nc files"
+    )
+    @click.option(
+        "--checkpoint",
+        default=None,
+        help="SQLite journal of completed scenes, used to resume an interrupted run",
+    )
+    @click.option(
+        "--executor",
+        type=click.Choice(EXECUTORS),
+        default="process",
+        help="Run scenes in worker processes or threads",
+    )
+    @click.option("--workers", type=int, default=None, help="Number of workers")
+    @click.option(
+        "--incremental",
+        is_flag=True,
+        help="Skip scenes whose item in dst was created from the same manifest "
+        "by the same package version with the same options",
+    )
+    @click.option(
+        "--check-complete",
+        is_flag=True,
+        help="Reject scenes with missing or truncated files before reading them",
+    )
+    @click.option(
+        "--verify",
+        is_flag=True,
+        help="Reject scenes whose files do not match the manifest checksums",
+    )
+    @click.option(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="Number of scenes whose manifests are read ahead",
+    )
+    @click.option(
+        "--cache-dir",
+        default=None,
+        help="Directory of an on-disk cache of remote reads, shared by the workers",
+    )
+    @click.option(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_MAX_SIZE // (1024 * 1024),
+        help="Size cap of the cache in MiB",
+    )
+    @click.option(
+        "--probe",
+        type=click.Choice(PROBE_MODES),
+        default="grouped",
+        help="How NetCDF files are opened; derived takes what it can from the "
+        "manifest and band constants",
+    )
+    def create_items_command(
+        src,
+        dst,
+        skip_nc,
+        checkpoint,
+        executor,
+        workers,
+        incremental,
+        check_complete,
+        verify,
+        prefetch,
+        cache_dir,
+        cache_size,
+        probe,
+    ):
+        """Creates STAC Items for every scene listed in a file
+
+        Args:
+            src (file): file listing one scene path per line, or - for stdin
+            dst (str): directory that will hold the STAC Item JSON files
+            skip_nc (bool): Skip parsing NetCDF data files. Defaults to False.
+            checkpoint (str): Path of a SQLite journal of completed scenes.
+                Scenes already in the journal are skipped, so rerunning the
+                same command resumes an interrupted run.
+            executor (str): "process" or "thread". Defaults to "process".
+            workers (int): Number of workers. Defaults to the number of CPUs.
+            incremental (bool): Only read the manifest of scenes that already
+                have an item in dst, and skip them if the manifest checksum,
+                package version, and options stored in the item are
+                unchanged. Items created with this flag record them.
+            check_complete (bool): Check every file listed in a scene's
+                manifest exists with the listed size, from a single listing of
+                the scene, before creating its item.
+            verify (bool): Check every file listed in a scene's manifest
+                against its MD5 checksum before creating its item. NetCDF
+                headers are read from the verified bytes.
+            prefetch (int): Number of scenes whose manifests are read ahead
+                while earlier scenes are processed. Defaults to 0.
+            cache_dir (str): Directory of a block cache of remote reads,
+                evicting the least recently used blocks. Defaults to no cache.
+            cache_size (int): Size cap of the cache in MiB. Defaults to 1024.
+            probe (str): How NetCDF files are opened, see
+                :class:`~stactools.sentinel3.metadata_links.MetadataLinks`.
+                Defaults to "grouped".
+        """
+        hrefs = (line.strip() for line in src if line.strip())
+        journal = CheckpointJournal(checkpoint) if checkpoint else None
+        failures = 0
+        try:
+            if journal is not None:
+                hrefs = journal.pending(hrefs)
+            for href, item in create_items(
+                hrefs,
+                skip_nc,
+                executor=executor,
+                max_workers=workers,
+                existing_items=ItemDirectory(dst) if incremental else None,
+                check_complete=check_complete,
+                verify_checksums=verify,
+                prefetch_depth=prefetch,
+                block_cache=(
+                    BlockCache(cache_dir, max_size=cache_size * 1024 * 1024)
+                    if cache_dir
+                    else None
+                ),
+                probe=probe,
+            ):
+                if isinstance(item, Exception):
+                    logger.error(f"Failed to create item for {href}: {item}")
+                    failures += 1
+                    continue
+                item_path = os.path.join(dst, "{}.json".format(item.id))
+                if not isinstance(item, Unchanged):
+                    item.set_self_href(item_path)
+                    write_item(item, item_path)
+                if journal is not None:
+                    journal.record(href, item.id, item_path)
+        finally:
+            if journal is not None:
+                journal.close()
+        if failures:
+            raise click.ClickException(f"Failed to create {failures} item(s)")
+
+    @sentinel3.command(
+        "build-inventory",
+        short_help="Index a listing of Sentinel3 scenes by their file names",
+    )
+    @click.argument("src", type=click.File("r"))
+    @click.argument("dst")
+    def build_inventory_command(src, dst):
+        """Builds a granule inventory from a listing of scene paths
+
+        Args:
+            src (file): file listing one scene path per line, or - for stdin
+            dst (str): path of the .npz inventory that will be created
+        """
+        inventory = GranuleInventory.from_hrefs(line for line in src if line.strip())
+        inventory.save(dst)
+        click.echo(f"Indexed {len(inventory)} scenes")
+
+    @sentinel3.command(
+        "query-inventory",
+        short_help="List the scenes of an inventory that match a query",
+    )
+    @click.argument("src")
+    @click.option("--product-type", help="Product type, e.g. OL_1_EFR___")
+    @click.option("--start", help="Earliest sensing start time, inclusive (UTC)")
+    @click.option("--end", help="Latest sensing start time, exclusive (UTC)")
+    @click.option("--mission", help="S3A or S3B")
+    @click.option("--cycle", type=int, help="Cycle number")
+    @click.option("--relative-orbit", type=int, help="Relative orbit number")
+    @click.option("--frame", type=int, help="Frame along track")
+    @click.option("--timeliness", help="NR, ST or NT")
+    @click.option(
+        "--deduplicate",
+        is_flag=True,
+        help="Keep one scene per scene id: NT over ST over NR, then the highest "
+        "baseline, then the newest",
+    )
+    @click.option("--part", type=(int, int), help="Only print part I of N, e.g. 1 8")
+    def query_inventory_command(
+        src,
+        product_type,
+        start,
+        end,
+        mission,
+        cycle,
+        relative_orbit,
+        frame,
+        timeliness,
+        deduplicate,
+        part,
+    ):
+        """Prints the scene paths of an inventory that match a query, one per
+        line, ready to be passed to create-items
+
+        Args:
+            src (str): path of the .npz inventory
+        """
+        inventory = GranuleInventory.load(src).query(
+            product_type=product_type,
+            start=start,
+            end=end,
+            mission_id=mission,
+            cycle=cycle,
+            relative_orbit=relative_orbit,
+            frame=frame,
+            timeliness=timeliness,
+        )
+        if deduplicate:
+            inventory = inventory.deduplicate()
+        if part is not None:
+            index, parts = part
+            if not 1 <= index <= parts:
+                raise click.BadParameter(f"part must be between 1 and {parts}")
+            inventory = inventory.split(parts)[index - 1]
+        for href in inventory.hrefs():
+            click.echo(href)
+
+    @sentinel3.command(
+        "list-missing",
+        short_help="List the scenes of a listing that have no STAC item yet",
+    )
+    @click.argument("src", type=click.File("r"))
+    @click.argument("items")
+    @click.option(
+        "--chunk-size",
+        type=int,
+        default=1_000_000,
+        help="Number of lines sorted in memory at a time",
+    )
+    @click.option("--tmp-dir", default=None, help="Directory for temporary files")
+    def list_missing_command(src, items, chunk_size, tmp_dir):
+        """Prints the scene paths of a listing that have no item yet, one per
+        line, ready to be passed to create-items
+
+        Args:
+            src (file): file listing one scene path per line, or - for stdin
+            items (str): existing items: a directory of item JSON files or
+                NDJSON shards, an NDJSON file, or a Parquet file
+            chunk_size (int): Number of lines sorted in memory at a time.
+            tmp_dir (str): Directory for the temporary sorted runs.
+        """
+        for href in missing_granules(
+            src, read_item_ids(items), chunk_size=chunk_size, tmp_dir=tmp_dir
+        ):
+            click.echo(href)
+
+    return sentinel3
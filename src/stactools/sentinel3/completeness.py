@@ -0,0 +1,207 @@
+import logging
+import posixpath
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import fsspec  # type: ignore
+from lxml import etree  # type: ignore
+from stactools.core.io import ReadHrefModifier
+from stactools.core.io.xml import XmlElement
+
+from . import policy
+from .archive import is_zip
+from .constants import MANIFEST_FILENAME
+from .filesystem import open_file, read_text
+
+logger = logging.getLogger(__name__)
+
+
+class DataObject(NamedTuple):
+    """A file listed in the ``dataObjectSection`` of a manifest."""
+
+    id: str
+    path: str
+    """Path of the file relative to the granule directory."""
+
+    size: Optional[int]
+    checksum: Optional[str]
+    """MD5 checksum, as a hexadecimal string."""
+
+
+class IncompleteGranuleError(Exception):
+    """Raised when a granule's files do not match its manifest."""
+
+    def __init__(self, granule_href: str, report: "CompletenessReport") -> None:
+        super().__init__(f"Granule {granule_href} is incomplete: {report}")
+        self.granule_href = granule_href
+        self.report = report
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Keep the error picklable, so it can be returned from worker processes
+        return type(self), (self.granule_href, self.report)
+
+
+@dataclass
+class CompletenessReport:
+    """Differences between a granule's files and its manifest."""
+
+    missing: List[DataObject] = field(default_factory=list)
+    """Data objects without a file."""
+
+    wrong_size: List[Tuple[DataObject, int]] = field(default_factory=list)
+    """Data objects whose file has a different size, with the actual size."""
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing and not self.wrong_size
+
+    def __str__(self) -> str:
+        problems = [f"{data_object.path} is missing" for data_object in self.missing]
+        problems += [
+            f"{data_object.path} has {size} bytes instead of {data_object.size}"
+            for data_object, size in self.wrong_size
+        ]
+        return "; ".join(problems) if problems else "complete"
+
+
+def data_objects(manifest: XmlElement) -> List[DataObject]:
+    """Returns every file listed in the ``dataObjectSection`` of a manifest.
+
+    Args:
+        manifest (XmlElement): The parsed manifest.
+
+    Returns:
+        List[DataObject]: The data objects, in manifest order.
+    """
+    objects = []
+    for element in manifest.findall(".//dataObject"):
+        href = element.find_attr("href", ".//fileLocation")
+        if href is None:
+            continue
+        size = element.find_attr("size", ".//byteStream")
+        checksum = element.find(".//checksum")
+        objects.append(
+            DataObject(
+                id=str(element.get_attr("ID")),
+                path=posixpath.normpath(href),
+                size=None if size is None else int(size),
+                checksum=None if checksum is None else checksum.text,
+            )
+        )
+    return objects
+
+
+def _list_directory(
+    granule_href: str, filesystem: Optional[fsspec.AbstractFileSystem]
+) -> Dict[str, int]:
+    if filesystem is None:
+        fs, path = fsspec.core.url_to_fs(granule_href)
+    else:
+        fs, path = filesystem, filesystem._strip_protocol(granule_href)
+    path = path.rstrip("/")
+    return {
+        posixpath.relpath(name, path): int(info["size"])
+        for name, info in fs.find(path, detail=True).items()
+    }
+
+
+def _list_zip(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier],
+    filesystem: Optional[fsspec.AbstractFileSystem],
+) -> Tuple[Dict[str, int], Optional[str]]:
+    # Only the central directory at the end of the archive is read for the
+    # listing, plus the manifest member itself
+    with open_file(granule_href, read_href_modifier, filesystem) as f:
+        with zipfile.ZipFile(f) as archive:
+            infos = [info for info in archive.infolist() if not info.is_dir()]
+            manifests = [
+                info
+                for info in infos
+                if posixpath.basename(info.filename) == MANIFEST_FILENAME
+            ]
+            if not manifests:
+                return {}, None
+            root = posixpath.dirname(manifests[0].filename)
+            manifest_text = archive.read(manifests[0]).decode("utf-8")
+    sizes = {
+        posixpath.relpath(info.filename, root or "."): info.file_size for info in infos
+    }
+    return sizes, manifest_text
+
+
+def check_completeness(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> CompletenessReport:
+    """Checks that every file listed in a granule's manifest exists, with the
+    size given in the manifest, without opening any of them.
+
+    A ``.SEN3`` directory is listed once; for a zipped granule only the zip
+    central directory and the manifest are read.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to list and read through.
+
+    Returns:
+        CompletenessReport: The missing files and the files with a wrong size.
+    """
+    manifest_text: Optional[str] = None
+    if is_zip(granule_href):
+        sizes, manifest_text = policy.call(
+            lambda: _list_zip(granule_href, read_href_modifier, filesystem),
+            kind="listing",
+        )
+    else:
+        sizes = policy.call(
+            lambda: _list_directory(granule_href, filesystem), kind="listing"
+        )
+        if MANIFEST_FILENAME in sizes:
+            manifest_text = read_text(
+                posixpath.join(granule_href, MANIFEST_FILENAME),
+                read_href_modifier,
+                filesystem,
+            )
+    if manifest_text is None:
+        return CompletenessReport(
+            missing=[DataObject("manifest", MANIFEST_FILENAME, None, None)]
+        )
+    manifest = XmlElement(etree.fromstring(manifest_text.encode("utf-8")))
+
+    report = CompletenessReport()
+    for data_object in data_objects(manifest):
+        size = sizes.get(data_object.path)
+        if size is None:
+            report.missing.append(data_object)
+        elif data_object.size is not None and size != data_object.size:
+            report.wrong_size.append((data_object, size))
+    return report
+
+
+def assert_complete(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> None:
+    """Raises if any file listed in a granule's manifest is missing or has the
+    wrong size. See :func:`check_completeness`.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to list and read through.
+
+    Raises:
+        IncompleteGranuleError: If the granule is incomplete.
+    """
+    report = check_completeness(granule_href, read_href_modifier, filesystem)
+    if not report.complete:
+        raise IncompleteGranuleError(granule_href, report)
@@ -9,6 +9,11 @@ PRODUCT_METADATA_ASSET_KEY = "product-metadata"
 
 MANIFEST_FILENAME = "xfdumanifest.xml"
 
+PROCESSING_EXTENSION_SCHEMA = (
+    "https://stac-extensions.github.io/processing/v1.1.0/schema.json"
+)
+SOFTWARE_NAME = "stactools-sentinel3"
+
 SENTINEL_LICENSE = Link(
     rel="license",
     target="https://sentinel.esa.int/documents/"
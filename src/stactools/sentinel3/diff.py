@@ -0,0 +1,178 @@
+import heapq
+import logging
+import os
+import tempfile
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .checkpoint import granule_key
+from .file_name import FileName
+from .ndjson import read_ndjson
+
+try:
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Number of keys sorted in memory before they are spilled to a temporary file
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+NDJSON_SUFFIXES = (".ndjson", ".ndjson.gz", ".ndjson.zst")
+PARQUET_SUFFIXES = (".parquet", ".geoparquet")
+
+
+def read_item_ids(source: str) -> Iterator[str]:
+    """Reads the ids of existing items.
+
+    Args:
+        source (str): One of:
+
+            - a directory of item JSON files named ``<item id>.json``, as
+              written by the ``create-item`` and ``create-items`` commands,
+              and/or NDJSON shards; only file names are read for JSON files.
+            - an NDJSON file, optionally gzip or zstd compressed.
+            - a Parquet file with an ``id`` column, e.g. stac-geoparquet.
+              Requires the optional ``pyarrow`` package.
+
+    Returns:
+        Iterator[str]: The item ids, in no particular order.
+    """
+    if os.path.isdir(source):
+        with os.scandir(source) as entries:
+            for entry in entries:
+                if entry.name.endswith(NDJSON_SUFFIXES):
+                    yield from read_item_ids(entry.path)
+                elif entry.name.endswith(PARQUET_SUFFIXES):
+                    yield from read_item_ids(entry.path)
+                elif entry.name.endswith(".json"):
+                    yield entry.name[: -len(".json")]
+    elif source.endswith(NDJSON_SUFFIXES):
+        for item in read_ndjson(source):
+            yield item["id"]
+    elif source.endswith(PARQUET_SUFFIXES):
+        if pq is None:
+            raise ImportError(
+                "Reading Parquet files requires the 'pyarrow' package, "
+                "install it with: pip install stactools-sentinel3[parquet]"
+            )
+        for batch in pq.ParquetFile(source).iter_batches(columns=["id"]):
+            yield from batch.column(0).to_pylist()
+    else:
+        raise ValueError(f"Cannot read item ids from {source}")
+
+
+def external_sort(
+    lines: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tmp_dir: Optional[str] = None,
+) -> Iterator[str]:
+    """Sorts lines of text in bounded memory.
+
+    Lines are sorted in chunks of ``chunk_size`` in memory. If there is more
+    than one chunk, each is written to a temporary file and the files are
+    merged lazily, so memory use does not depend on the number of lines.
+
+    Args:
+        lines (Iterable[str]): The lines, without newline characters.
+        chunk_size (int): Number of lines sorted in memory at a time.
+            Defaults to one million.
+        tmp_dir (Optional[str]): Directory of the temporary files. Defaults
+            to the system temporary directory.
+
+    Returns:
+        Iterator[str]: The sorted lines.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as directory:
+        runs: List[str] = []
+        chunk: List[str] = []
+        for line in lines:
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                runs.append(_write_run(sorted(chunk), directory, len(runs)))
+                chunk = []
+        if not runs:
+            yield from sorted(chunk)
+            return
+        if chunk:
+            runs.append(_write_run(sorted(chunk), directory, len(runs)))
+        files = [open(run, encoding="utf-8") for run in runs]
+        try:
+            for line in heapq.merge(*files):
+                yield line[:-1]
+        finally:
+            for f in files:
+                f.close()
+
+
+def _write_run(chunk: List[str], directory: str, index: int) -> str:
+    path = os.path.join(directory, f"run-{index:05d}.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        for line in chunk:
+            f.write(line)
+            f.write("\n")
+    return path
+
+
+def _scene_ids(granule_hrefs: Iterable[str]) -> Iterator[str]:
+    for href in granule_hrefs:
+        href = href.strip()
+        if not href:
+            continue
+        try:
+            scene_id = FileName.from_str(granule_key(href)).scene_id
+        except ValueError as e:
+            logger.warning(f"Skipping {href}: {e}")
+            continue
+        yield f"{scene_id}\t{href}"
+
+
+def missing_granules(
+    granule_hrefs: Iterable[str],
+    item_ids: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tmp_dir: Optional[str] = None,
+) -> Iterator[str]:
+    """Finds the granules of a listing that have no item yet.
+
+    The scene id of every granule is derived from its name with
+    :attr:`FileName.scene_id
+    <stactools.sentinel3.file_name.FileName.scene_id>`, then the listing and
+    the item ids are both sorted externally and merged, so memory use is
+    bounded by ``chunk_size`` regardless of the size of either input.
+
+    Args:
+        granule_hrefs (Iterable[str]): HREFs of the listed granules.
+        item_ids (Iterable[str]): Ids of the existing items, e.g. from
+            :func:`read_item_ids`.
+        chunk_size (int): Number of lines sorted in memory at a time.
+        tmp_dir (Optional[str]): Directory of the temporary files.
+
+    Returns:
+        Iterator[str]: HREFs of the granules without an item, ordered by scene
+        id. Granules that share a scene id are all yielded.
+    """
+    granules = external_sort(_scene_ids(granule_hrefs), chunk_size, tmp_dir)
+    items = _unique(external_sort(item_ids, chunk_size, tmp_dir))
+    item_id = next(items, None)
+    for scene_id, href in _split(granules):
+        while item_id is not None and item_id < scene_id:
+            item_id = next(items, None)
+        if item_id != scene_id:
+            yield href
+
+
+def _split(lines: Iterator[str]) -> Iterator[Tuple[str, str]]:
+    for line in lines:
+        scene_id, href = line.split("\t", 1)
+        yield scene_id, href
+
+
+def _unique(lines: Iterator[str]) -> Iterator[str]:
+    previous = None
+    for line in lines:
+        if line != previous:
+            yield line
+            previous = line
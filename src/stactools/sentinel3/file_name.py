@@ -64,3 +64,49 @@ class FileName:
                 f"{self.data_type_id}_{self.sensing_start_time}_{self.sensing_stop_time}_"
                 + self.instance_id
             )
+
+    @property
+    def product_type(self) -> str:
+        """Returns the product type as written in the manifest, e.g.
+        ``OL_1_EFR___``."""
+        level = "_" if self.processing_level is None else self.processing_level
+        return f"{self.data_source}_{level}_{self.data_type_id:_<6}"
+
+    @property
+    def duration(self) -> Optional[int]:
+        """Returns the sensing duration in seconds, if the instance id has one."""
+        return _parse_int(self.instance_id[0:4])
+
+    @property
+    def cycle(self) -> Optional[int]:
+        """Returns the cycle number, if the instance id has one."""
+        return _parse_int(self.instance_id[5:8])
+
+    @property
+    def relative_orbit(self) -> Optional[int]:
+        """Returns the relative orbit number, if the instance id has one."""
+        return _parse_int(self.instance_id[9:12])
+
+    @property
+    def frame(self) -> Optional[int]:
+        """Returns the frame along track, if the instance id has one."""
+        return _parse_int(self.instance_id[13:17])
+
+    @property
+    def platform(self) -> str:
+        """Returns the platform, e.g. ``O`` for operational."""
+        return self.class_id[0:1]
+
+    @property
+    def timeliness(self) -> str:
+        """Returns the processing timeliness: ``NR``, ``ST`` or ``NT``."""
+        return self.class_id[2:4]
+
+    @property
+    def baseline(self) -> str:
+        """Returns the baseline collection, e.g. ``002``."""
+        return self.class_id[5:8]
+
+
+def _parse_int(s: str) -> Optional[int]:
+    return int(s) if s.isdigit() else None
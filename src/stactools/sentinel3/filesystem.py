@@ -0,0 +1,342 @@
+import posixpath
+import zipfile
+from contextlib import contextmanager
+from functools import partial
+from typing import IO, Any, ContextManager, Dict, Iterator, Optional, Tuple
+
+import fsspec  # type: ignore
+from fsspec.implementations.memory import MemoryFileSystem  # type: ignore
+from stactools.core import io
+from stactools.core.io import ReadHrefModifier
+
+from . import policy
+from .cache import get_block_cache
+
+# Protocol of fsspec's zip file system, used to address archive members as
+# ``zip://<member>::<archive href>``
+ZIP_PROTOCOL = "zip://"
+CHAIN_SEPARATOR = "::"
+
+# Connection pool defaults of http_filesystem
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_KEEPALIVE_TIMEOUT = 60.0
+
+
+def is_member(href: str) -> bool:
+    """Checks whether an HREF addresses a member of a zip archive."""
+    return href.startswith(ZIP_PROTOCOL) and CHAIN_SEPARATOR in href
+
+
+def is_remote(href: str) -> bool:
+    """Checks whether an HREF is a URL of a file that is not local."""
+    return "://" in href and not href.startswith("file://")
+
+
+def modify_href(
+    href: str, read_href_modifier: Optional[ReadHrefModifier] = None
+) -> str:
+    """Applies a read HREF modifier, to the archive's HREF only for archive
+    members, so that e.g. signing functions see the URL they expect.
+
+    Args:
+        href (str): The HREF to read.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+
+    Returns:
+        str: The modified HREF.
+    """
+    if read_href_modifier is None:
+        return href
+    if not is_member(href):
+        return read_href_modifier(href)
+    member, target = href.split(CHAIN_SEPARATOR, 1)
+    return f"{member}{CHAIN_SEPARATOR}{read_href_modifier(target)}"
+
+
+def _is_local(filesystem: fsspec.AbstractFileSystem) -> bool:
+    protocols = filesystem.protocol
+    return "file" in (protocols if isinstance(protocols, tuple) else (protocols,))
+
+
+def local_path(
+    href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> Optional[str]:
+    """Returns the path of a file on the local filesystem, for libraries that
+    only open paths, such as netCDF4.
+
+    Args:
+        href (str): The HREF of the file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): The filesystem the
+            file is read through, if any.
+
+    Returns:
+        Optional[str]: The path, or None for remote files and archive members.
+    """
+    if is_member(href):
+        return None
+    href = modify_href(href, read_href_modifier)
+    if filesystem is None:
+        if is_remote(href):
+            return None
+        return href[len("file://") :] if href.startswith("file://") else href
+    if not _is_local(filesystem):
+        return None
+    path: str = filesystem._strip_protocol(href)
+    return path
+
+
+@contextmanager
+def _open_member(opened: ContextManager[IO[bytes]], member: str) -> Iterator[IO[bytes]]:
+    with opened as f, zipfile.ZipFile(f) as archive:
+        with archive.open(member) as m:
+            yield m
+
+
+def _open_cached(
+    href: str,
+    read_href_modifier: Optional[ReadHrefModifier],
+    filesystem: Optional[fsspec.AbstractFileSystem],
+) -> Optional[ContextManager[IO[bytes]]]:
+    # Opens a file through the block cache, or returns None for local files
+    cache = get_block_cache()
+    assert cache is not None
+    member = None
+    if is_member(href):
+        member, href = href[len(ZIP_PROTOCOL) :].split(CHAIN_SEPARATOR, 1)
+    modified = read_href_modifier(href) if read_href_modifier else href
+    if filesystem is None:
+        filesystem, path = fsspec.core.url_to_fs(modified)
+    else:
+        path = modified
+    if _is_local(filesystem):
+        return None
+    # Cached under the unmodified HREF, so changing tokens still hit the cache
+    opened = cache.open(filesystem, path, href)
+    return opened if member is None else _open_member(opened, member)
+
+
+def open_file(
+    href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    cached: bool = True,
+) -> ContextManager[IO[bytes]]:
+    """Opens a file, which may be an archive member, for binary reading.
+
+    Remote files are read through the block cache of the process, if one is
+    set with :func:`~stactools.sentinel3.cache.set_block_cache`.
+
+    Args:
+        href (str): The HREF of the file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through, e.g. from :func:`http_filesystem`. Defaults to
+            the filesystem fsspec infers from the HREF.
+        cached (bool): Read through the block cache, if one is set. Defaults
+            to True.
+
+    Returns:
+        ContextManager[IO[bytes]]: The open file.
+    """
+    if cached and get_block_cache() is not None:
+        cached_file = _open_cached(href, read_href_modifier, filesystem)
+        if cached_file is not None:
+            return cached_file
+    href = modify_href(href, read_href_modifier)
+    if filesystem is None:
+        opened: ContextManager[IO[bytes]] = fsspec.open(href, "rb")
+        return opened
+    if is_member(href):
+        member, target = href[len(ZIP_PROTOCOL) :].split(CHAIN_SEPARATOR, 1)
+        return _open_member(filesystem.open(target, "rb"), member)
+    opened = filesystem.open(href, "rb")
+    return opened
+
+
+def read_bytes(
+    href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> bytes:
+    """Reads a file, which may be an archive member, under the current
+    :class:`~stactools.sentinel3.policy.ReadPolicy`.
+
+    Args:
+        href (str): The HREF of the file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+
+    Returns:
+        bytes: The contents of the file.
+    """
+
+    def read() -> bytes:
+        with open_file(href, read_href_modifier, filesystem) as f:
+            data: bytes = f.read()
+        return data
+
+    return policy.call(read, kind="file")
+
+
+def read_text(
+    href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> str:
+    """Reads a UTF-8 text file, which may be an archive member, under the
+    current :class:`~stactools.sentinel3.policy.ReadPolicy`.
+
+    Without a ``filesystem`` or block cache this reads through
+    ``stactools.core.io``, like the rest of stactools.
+
+    Args:
+        href (str): The HREF of the file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+
+    Returns:
+        str: The text.
+    """
+    if filesystem is None and get_block_cache() is None:
+        return policy.call(
+            lambda: io.read_text(modify_href(href, read_href_modifier)), kind="text"
+        )
+    return read_bytes(href, read_href_modifier, filesystem).decode("utf-8")
+
+
+async def _get_client(
+    max_connections: int,
+    max_connections_per_host: int,
+    keepalive_timeout: float,
+    **kwargs: Any,
+) -> Any:
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(
+        limit=max_connections,
+        limit_per_host=max_connections_per_host,
+        keepalive_timeout=keepalive_timeout,
+    )
+    return aiohttp.ClientSession(connector=connector, **kwargs)
+
+
+def http_filesystem(
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    max_connections_per_host: int = 0,
+    keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+    **storage_options: Any,
+) -> fsspec.AbstractFileSystem:
+    """Creates an HTTP(S) filesystem with a tunable connection pool, to share
+    between many granules.
+
+    All reads through the filesystem use one ``aiohttp`` session, so manifest
+    and header reads reuse warm keep-alive connections instead of paying a
+    TLS handshake each. The filesystem is picklable: every worker process
+    builds its own pool with the same settings.
+
+    For object stores, pass their own fsspec filesystem instead, configured
+    with the store's pool settings, e.g.
+    ``s3fs.S3FileSystem(config_kwargs={"max_pool_connections": 64})``.
+
+    Args:
+        max_connections (int): Maximum number of open connections. Defaults
+            to 100.
+        max_connections_per_host (int): Maximum number of open connections to
+            the same host, or 0 for no limit. Defaults to 0.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+            Defaults to 60.
+        **storage_options: Passed on to ``fsspec``'s ``HTTPFileSystem``, e.g.
+            ``block_size`` or ``client_kwargs``.
+
+    Returns:
+        fsspec.AbstractFileSystem: The filesystem.
+    """
+    return fsspec.filesystem(
+        "https",
+        get_client=partial(
+            _get_client, max_connections, max_connections_per_host, keepalive_timeout
+        ),
+        **storage_options,
+    )
+
+
+class InMemoryFileSystem(MemoryFileSystem):  # type: ignore
+    """An fsspec filesystem that holds its files in memory.
+
+    Unlike fsspec's own ``memory://`` filesystem, every instance has its own
+    files, and pickling it copies them, so each worker process of a batch
+    gets the same files. Together with :func:`load_granule` this takes
+    storage out of benchmarks and tests.
+
+    Example:
+        >>> filesystem, href = load_granule("/data/S3A_..._002.SEN3")
+        >>> item = create_item(href, filesystem=filesystem)
+    """
+
+    cachable = False
+
+    def __init__(self, files: Optional[Dict[str, bytes]] = None, **kwargs: Any):
+        """
+        Args:
+            files (Optional[Dict[str, bytes]]): The initial files, by path.
+            **kwargs: Passed on to ``fsspec``'s ``MemoryFileSystem``.
+        """
+        super().__init__(**kwargs)
+        self.store: Dict[str, Any] = {}
+        self.pseudo_dirs = [""]
+        for path, data in (files or {}).items():
+            self.pipe_file(path, data)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return type(self), ({path: self.cat_file(path) for path in self.store},)
+
+
+def load_granule(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> Tuple[InMemoryFileSystem, str]:
+    """Copies a granule directory or zip file into an
+    :class:`InMemoryFileSystem`.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): The filesystem to
+            copy from. Defaults to the filesystem fsspec infers from the HREF.
+
+    Returns:
+        Tuple[InMemoryFileSystem, str]: The filesystem, and the HREF of the
+        granule in it.
+    """
+    if filesystem is None:
+        filesystem, path = fsspec.core.url_to_fs(granule_href)
+    else:
+        path = filesystem._strip_protocol(granule_href)
+    path = path.rstrip("/")
+    name = posixpath.basename(path)
+    if filesystem.isfile(path):
+        paths = {path: name}
+    else:
+        paths = {
+            found: posixpath.join(name, posixpath.relpath(found, path))
+            for found in filesystem.find(path)
+        }
+    files = {
+        f"/{relative}": read_bytes(
+            filesystem.unstrip_protocol(found), read_href_modifier, filesystem
+        )
+        for found, relative in paths.items()
+    }
+    return InMemoryFileSystem(files), f"memory://{name}"
@@ -0,0 +1,113 @@
+from typing import Optional
+
+# Signature at the start of HDF5 files, and so of NetCDF-4 files
+HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+
+_MASK = 0xFFFFFFFF
+
+
+def _rotate(value: int, bits: int) -> int:
+    return ((value << bits) | (value >> (32 - bits))) & _MASK
+
+
+def lookup3(data: bytes, initval: int = 0) -> int:
+    """Computes the Jenkins lookup3 hash that HDF5 uses to checksum its
+    metadata, e.g. version 2 and 3 superblocks.
+
+    Args:
+        data (bytes): The bytes to hash.
+        initval (int): The initial value. Defaults to 0.
+
+    Returns:
+        int: The 32-bit checksum.
+    """
+    length = len(data)
+    a = b = c = (0xDEADBEEF + length + initval) & _MASK
+    offset = 0
+    while length > 12:
+        a = (a + int.from_bytes(data[offset : offset + 4], "little")) & _MASK
+        b = (b + int.from_bytes(data[offset + 4 : offset + 8], "little")) & _MASK
+        c = (c + int.from_bytes(data[offset + 8 : offset + 12], "little")) & _MASK
+        a = (a - c) & _MASK
+        a ^= _rotate(c, 4)
+        c = (c + b) & _MASK
+        b = (b - a) & _MASK
+        b ^= _rotate(a, 6)
+        a = (a + c) & _MASK
+        c = (c - b) & _MASK
+        c ^= _rotate(b, 8)
+        b = (b + a) & _MASK
+        a = (a - c) & _MASK
+        a ^= _rotate(c, 16)
+        c = (c + b) & _MASK
+        b = (b - a) & _MASK
+        b ^= _rotate(a, 19)
+        a = (a + c) & _MASK
+        c = (c - b) & _MASK
+        c ^= _rotate(b, 4)
+        b = (b + a) & _MASK
+        length -= 12
+        offset += 12
+    if length == 0:
+        return c
+    tail = data[offset:] + bytes(12 - length)
+    a = (a + int.from_bytes(tail[0:4], "little")) & _MASK
+    b = (b + int.from_bytes(tail[4:8], "little")) & _MASK
+    c = (c + int.from_bytes(tail[8:12], "little")) & _MASK
+    c ^= b
+    c = (c - _rotate(b, 14)) & _MASK
+    a ^= c
+    a = (a - _rotate(c, 11)) & _MASK
+    b ^= a
+    b = (b - _rotate(a, 25)) & _MASK
+    c ^= b
+    c = (c - _rotate(b, 16)) & _MASK
+    a ^= c
+    a = (a - _rotate(c, 4)) & _MASK
+    b ^= a
+    b = (b - _rotate(a, 14)) & _MASK
+    c ^= b
+    c = (c - _rotate(b, 24)) & _MASK
+    return c
+
+
+def truncated_image(prefix: bytes) -> Optional[bytes]:
+    """Turns the first bytes of an HDF5 file into a file image that ends
+    where they end.
+
+    The end of file address in the superblock is set to the length of the
+    prefix, so that HDF5 fails to open the image if it needs metadata past
+    the prefix, rather than reading zeros in its place.
+
+    Args:
+        prefix (bytes): The first bytes of the file, including the whole
+            superblock.
+
+    Returns:
+        Optional[bytes]: The file image, or None if the prefix does not start
+        with a superblock this function knows.
+    """
+    if not prefix.startswith(HDF5_SIGNATURE) or len(prefix) < 16:
+        return None
+    version = prefix[8]
+    if version in (0, 1):
+        offset_size = prefix[13]
+        # Version 1 adds the indexed storage B-tree K and reserved bytes
+        eof_offset = (24 if version == 0 else 28) + 2 * offset_size
+        checksum_offset = None
+    elif version in (2, 3):
+        offset_size = prefix[9]
+        eof_offset = 12 + 2 * offset_size
+        checksum_offset = 12 + 4 * offset_size
+    else:
+        return None
+    if offset_size not in (2, 4, 8) or len(prefix) < eof_offset + 4 * offset_size:
+        return None
+    image = bytearray(prefix)
+    image[eof_offset : eof_offset + offset_size] = len(prefix).to_bytes(
+        offset_size, "little"
+    )
+    if checksum_offset is not None:
+        checksum = lookup3(bytes(image[:checksum_offset]))
+        image[checksum_offset : checksum_offset + 4] = checksum.to_bytes(4, "little")
+    return bytes(image)
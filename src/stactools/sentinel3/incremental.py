@@ -0,0 +1,156 @@
+import json
+import os
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import fsspec  # type: ignore
+from stactools.core.io import ReadHrefModifier
+
+from . import archive
+from . import filesystem as fs
+from .checkpoint import granule_key
+from .constants import MANIFEST_FILENAME, SAFE_MANIFEST_ASSET_KEY, SOFTWARE_NAME
+from .file_name import FileName
+from .properties import manifest_file_properties
+from .stac import processing_lineage, software_version
+
+ExistingItems = Callable[[str], Optional[Dict[str, Any]]]
+
+
+class Unchanged(NamedTuple):
+    """Marks a granule whose existing item is already up to date."""
+
+    id: str
+
+
+def manifest_checksum(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    manifest_text: Optional[str] = None,
+) -> str:
+    """Returns the MD5 checksum of a granule's manifest, as stored in the
+    ``file:checksum`` of its item's ``safe-manifest`` asset.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+        manifest_text (Optional[str]): The manifest, if it was already read.
+
+    Returns:
+        str: The hexadecimal MD5 digest of the manifest.
+    """
+    manifest_href = archive.join(granule_href, MANIFEST_FILENAME)
+    if manifest_text is None:
+        root = archive.granule_root(granule_href, read_href_modifier, filesystem)
+        manifest_href = archive.join(root, MANIFEST_FILENAME)
+        manifest_text = fs.read_text(manifest_href, read_href_modifier, filesystem)
+    return str(manifest_file_properties(manifest_href, manifest_text)["file:checksum"])
+
+
+def is_item_current(
+    item: Dict[str, Any],
+    checksum: str,
+    skip_nc: bool = False,
+    probe: str = "grouped",
+) -> bool:
+    """Checks whether an existing item was created from a manifest with the
+    given checksum, with the given options, by this version of the package.
+
+    Only items created with ``record_processing`` (see
+    :func:`~stactools.sentinel3.stac.create_item`) record what they were
+    created with; other items are never current.
+
+    Args:
+        item (Dict[str, Any]): The dictionary representation of the item.
+        checksum (str): The MD5 checksum of the granule's current manifest.
+        skip_nc (bool): Whether NetCDF files would be skipped. Defaults to
+            False.
+        probe (str): How NetCDF files would be opened. Defaults to
+            ``"grouped"``.
+
+    Returns:
+        bool: True if creating the item again would produce the same item.
+    """
+    manifest = item.get("assets", {}).get(SAFE_MANIFEST_ASSET_KEY, {})
+    properties = item.get("properties", {})
+    software = properties.get("processing:software") or {}
+    return (
+        manifest.get("file:checksum") == checksum
+        and software.get(SOFTWARE_NAME) == software_version()
+        and properties.get("processing:lineage") == processing_lineage(skip_nc, probe)
+    )
+
+
+def find_unchanged(
+    granule_href: str,
+    existing_items: ExistingItems,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    manifest_text: Optional[str] = None,
+    skip_nc: bool = False,
+    probe: str = "grouped",
+) -> Optional[Unchanged]:
+    """Checks whether a granule's existing item is up to date, reading only
+    the granule's manifest.
+
+    Args:
+        granule_href (str): The HREF to the granule.
+        existing_items (Callable[[str], Optional[Dict[str, Any]]]): Returns
+            the existing item of a granule HREF, or None if there is none.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+        manifest_text (Optional[str]): The manifest, if it was already read.
+        skip_nc (bool): Whether NetCDF files would be skipped. Defaults to
+            False.
+        probe (str): How NetCDF files would be opened. Defaults to
+            ``"grouped"``.
+
+    Returns:
+        Optional[Unchanged]: The marker for an up to date item, or None if the
+        item needs to be created.
+    """
+    existing = existing_items(granule_href)
+    if existing is None:
+        return None
+    checksum = manifest_checksum(
+        granule_href, read_href_modifier, filesystem, manifest_text
+    )
+    if is_item_current(existing, checksum, skip_nc, probe):
+        return Unchanged(existing["id"])
+    return None
+
+
+class ItemDirectory:
+    """Looks up existing items written as ``<directory>/<item id>.json``, the
+    layout used by the ``create-item`` and ``create-items`` commands.
+
+    Instances are picklable, so they can be passed to worker processes.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    def href(self, granule_href: str) -> str:
+        """Returns where the item of a granule is written.
+
+        Args:
+            granule_href (str): The HREF to the granule.
+
+        Returns:
+            str: The HREF of the item JSON file.
+        """
+        item_id = FileName.from_str(granule_key(granule_href)).scene_id
+        return os.path.join(self.directory, f"{item_id}.json")
+
+    def __call__(self, granule_href: str) -> Optional[Dict[str, Any]]:
+        try:
+            text = fs.read_text(self.href(granule_href))
+        except FileNotFoundError:
+            return None
+        item: Dict[str, Any] = json.loads(text)
+        return item
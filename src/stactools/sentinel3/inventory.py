@@ -0,0 +1,342 @@
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .file_name import FileName
+
+logger = logging.getLogger(__name__)
+
+# Columns of an inventory and their dtypes. Missing integers are stored as -1.
+COLUMNS = {
+    "href": "S",
+    "product_type": "S11",
+    "mission_id": "S3",
+    "sensing_start_time": "datetime64[s]",
+    "sensing_stop_time": "datetime64[s]",
+    "product_creation_date": "datetime64[s]",
+    "duration": "i4",
+    "cycle": "i2",
+    "relative_orbit": "i2",
+    "frame": "i2",
+    "instance_id": "S17",
+    "centre": "S3",
+    "platform": "S1",
+    "timeliness": "S2",
+    "baseline": "S3",
+}
+
+# Columns that together make up a granule's scene id
+SCENE_ID_COLUMNS = (
+    "mission_id",
+    "product_type",
+    "sensing_start_time",
+    "sensing_stop_time",
+    "instance_id",
+)
+
+# Default preference between granules of the same scene: the most consolidated
+# timeliness, then the most recent baseline, then the newest product
+DEFAULT_TIMELINESS = ("NT", "ST", "NR")
+DEFAULT_PREFERENCE = ("timeliness", "baseline", "creation")
+
+DateLike = Union[str, datetime, np.datetime64]
+
+
+def _to_datetime64(value: str) -> np.datetime64:
+    # Sentinel-3 file names use the compact YYYYMMDDTHHMMSS form
+    return np.datetime64(
+        f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+        f"T{value[9:11]}:{value[11:13]}:{value[13:15]}",
+        "s",
+    )
+
+
+def _as_datetime64(value: DateLike) -> np.datetime64:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()  # type: ignore
+    return np.datetime64(value, "s")  # type: ignore
+
+
+class GranuleInventory:
+    """A compact, columnar index of Sentinel-3 granules, built from their
+    file names alone.
+
+    Every field of :class:`~stactools.sentinel3.file_name.FileName` is stored
+    in its own numpy array, and rows are sorted by product type and then
+    sensing start time. Listings of millions of granules fit in a few hundred
+    megabytes, and can be queried by product type, time and orbit to plan and
+    partition ingestion without opening any manifest.
+
+    Example:
+        >>> inventory = GranuleInventory.from_hrefs(listing)
+        >>> inventory.save("inventory.npz")
+        >>> efr = inventory.query(product_type="OL_1_EFR___", start="2021-10-01")
+        >>> for part in efr.split(8):
+        ...     create_items(part.hrefs())
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Args:
+            columns (Dict[str, np.ndarray]): One array per column in
+                :data:`COLUMNS`, all of the same length and already sorted.
+                Use :meth:`from_hrefs` or :meth:`load` to create an inventory.
+        """
+        missing = set(COLUMNS) - set(columns)
+        if missing:
+            raise ValueError(f"Missing inventory columns: {', '.join(missing)}")
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["href"])
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.columns[column]
+
+    @classmethod
+    def from_hrefs(cls, hrefs: Iterable[str]) -> "GranuleInventory":
+        """Builds an inventory from granule HREFs or names.
+
+        HREFs whose name is not a Sentinel-3 file name are logged and skipped.
+
+        Args:
+            hrefs (Iterable[str]): HREFs of ``.SEN3`` granules, e.g. the lines
+                of a bucket listing.
+
+        Returns:
+            GranuleInventory: The sorted inventory.
+        """
+        rows: Dict[str, List[Any]] = {column: [] for column in COLUMNS}
+        for href in hrefs:
+            href = href.strip()
+            name = os.path.basename(href.rstrip("/"))
+            try:
+                file_name = FileName.from_str(name)
+                row = {
+                    "href": href.encode("utf-8"),
+                    "product_type": file_name.product_type,
+                    "mission_id": file_name.mission_id,
+                    "sensing_start_time": _to_datetime64(file_name.sensing_start_time),
+                    "sensing_stop_time": _to_datetime64(file_name.sensing_stop_time),
+                    "product_creation_date": _to_datetime64(
+                        file_name.product_creation_date
+                    ),
+                    "duration": file_name.duration,
+                    "cycle": file_name.cycle,
+                    "relative_orbit": file_name.relative_orbit,
+                    "frame": file_name.frame,
+                    "instance_id": file_name.instance_id,
+                    "centre": file_name.centre,
+                    "platform": file_name.platform,
+                    "timeliness": file_name.timeliness,
+                    "baseline": file_name.baseline,
+                }
+            except ValueError as e:
+                logger.warning(f"Skipping {href}: {e}")
+                continue
+            for column, value in row.items():
+                rows[column].append(-1 if value is None else value)
+
+        columns = {
+            column: np.array(values, dtype=dtype)
+            for (column, dtype), values in zip(COLUMNS.items(), rows.values())
+        }
+        order = np.lexsort(
+            (
+                columns["href"],
+                columns["sensing_start_time"],
+                columns["product_type"],
+            )
+        )
+        return cls({column: values[order] for column, values in columns.items()})
+
+    @classmethod
+    def load(cls, path: str) -> "GranuleInventory":
+        """Loads an inventory saved with :meth:`save`.
+
+        Args:
+            path (str): Path of the ``.npz`` file.
+
+        Returns:
+            GranuleInventory: The inventory.
+        """
+        with np.load(path) as data:
+            return cls({column: data[column] for column in COLUMNS})
+
+    def save(self, path: str) -> None:
+        """Saves the inventory as a compressed ``.npz`` file.
+
+        Args:
+            path (str): Path of the ``.npz`` file.
+        """
+        np.savez_compressed(path, **self.columns)  # type: ignore
+
+    def hrefs(self) -> List[str]:
+        """Returns the granule HREFs, in index order.
+
+        Returns:
+            List[str]: The HREFs.
+        """
+        return [href.decode("utf-8") for href in self.columns["href"]]
+
+    def take(self, indices: Union[np.ndarray, slice]) -> "GranuleInventory":
+        """Returns an inventory of a subset of the rows, keeping their order.
+
+        Args:
+            indices (Union[np.ndarray, slice]): Sorted row indices, a boolean
+                mask, or a slice.
+
+        Returns:
+            GranuleInventory: The subset.
+        """
+        return GranuleInventory(
+            {column: values[indices] for column, values in self.columns.items()}
+        )
+
+    def query(
+        self,
+        product_type: Optional[str] = None,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        mission_id: Optional[str] = None,
+        cycle: Optional[int] = None,
+        relative_orbit: Optional[int] = None,
+        frame: Optional[int] = None,
+        timeliness: Optional[str] = None,
+    ) -> "GranuleInventory":
+        """Selects granules matching all the given criteria.
+
+        Product type and time range lookups are binary searches on the sorted
+        columns, the other criteria are vectorized comparisons.
+
+        Args:
+            product_type (Optional[str]): Product type as written in the
+                manifest, e.g. ``OL_1_EFR___``.
+            start (Optional[DateLike]): Earliest sensing start time, inclusive.
+                Naive datetimes and strings are taken as UTC.
+            end (Optional[DateLike]): Latest sensing start time, exclusive.
+            mission_id (Optional[str]): ``S3A`` or ``S3B``.
+            cycle (Optional[int]): Cycle number.
+            relative_orbit (Optional[int]): Relative orbit number.
+            frame (Optional[int]): Frame along track.
+            timeliness (Optional[str]): ``NR``, ``ST`` or ``NT``.
+
+        Returns:
+            GranuleInventory: The matching granules, in index order.
+        """
+        lo, hi = 0, len(self)
+        product_types = self.columns["product_type"]
+        if product_type is not None:
+            key = product_type.encode("utf-8")
+            lo = int(np.searchsorted(product_types, key, side="left"))
+            hi = int(np.searchsorted(product_types, key, side="right"))
+        inventory = self.take(slice(lo, hi))
+
+        mask = np.ones(len(inventory), dtype=bool)
+        start_times = inventory["sensing_start_time"]
+        if product_type is not None:
+            # Start times are sorted within a single product type
+            if start is not None:
+                lo = int(np.searchsorted(start_times, _as_datetime64(start), "left"))
+                mask[:lo] = False
+            if end is not None:
+                hi = int(np.searchsorted(start_times, _as_datetime64(end), "left"))
+                mask[hi:] = False
+        else:
+            if start is not None:
+                mask &= start_times >= _as_datetime64(start)
+            if end is not None:
+                mask &= start_times < _as_datetime64(end)
+        for column, value in (
+            ("mission_id", mission_id),
+            ("cycle", cycle),
+            ("relative_orbit", relative_orbit),
+            ("frame", frame),
+            ("timeliness", timeliness),
+        ):
+            if isinstance(value, str):
+                mask &= inventory[column] == value.encode("utf-8")
+            elif value is not None:
+                mask &= inventory[column] == value
+        return inventory if mask.all() else inventory.take(mask)
+
+    def split(self, parts: int) -> List["GranuleInventory"]:
+        """Splits the inventory into contiguous parts of nearly equal size,
+        e.g. to distribute ingestion across machines.
+
+        Args:
+            parts (int): Number of parts.
+
+        Returns:
+            List[GranuleInventory]: The parts, in index order.
+        """
+        if parts < 1:
+            raise ValueError(f"parts must be at least 1, got {parts}")
+        bounds = np.linspace(0, len(self), parts + 1).astype(int)
+        return [self.take(slice(lo, hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+    def deduplicate(
+        self,
+        timeliness: Sequence[str] = DEFAULT_TIMELINESS,
+        preference: Sequence[str] = DEFAULT_PREFERENCE,
+    ) -> "GranuleInventory":
+        """Keeps only the preferred granule of every scene.
+
+        The same scene (see :attr:`FileName.scene_id
+        <stactools.sentinel3.file_name.FileName.scene_id>`) is often
+        distributed several times, with different processing timeliness and
+        in several baseline collections. Granules are grouped by scene and
+        ranked by the criteria in ``preference``, in order:
+
+        - ``"timeliness"``: the position of the granule's timeliness in
+          ``timeliness``; timeliness values not listed rank last.
+        - ``"baseline"``: the highest baseline collection first.
+        - ``"creation"``: the newest product creation date first.
+
+        Args:
+            timeliness (Sequence[str]): Timeliness values from most to least
+                preferred. Defaults to ``("NT", "ST", "NR")``.
+            preference (Sequence[str]): Criteria from most to least
+                important. Defaults to ``("timeliness", "baseline",
+                "creation")``.
+
+        Returns:
+            GranuleInventory: One granule per scene, in index order.
+        """
+        if len(self) == 0:
+            return self
+        timeliness_rank = np.full(len(self), len(timeliness), dtype="i2")
+        for rank, value in enumerate(timeliness):
+            timeliness_rank[self["timeliness"] == value.encode("utf-8")] = rank
+        baselines = self["baseline"]
+        numeric = np.char.isdigit(baselines)
+        baseline_rank = np.zeros(len(self), dtype="i4")
+        baseline_rank[numeric] = -baselines[numeric].astype("i4")
+        creation_rank = -self["product_creation_date"].astype("i8")
+        criteria = {
+            "timeliness": timeliness_rank,
+            "baseline": baseline_rank,
+            "creation": creation_rank,
+        }
+        unknown = set(preference) - set(criteria)
+        if unknown:
+            raise ValueError(
+                f"Unknown preference criteria: {', '.join(sorted(unknown))}, "
+                f"expected some of {', '.join(criteria)}"
+            )
+
+        keys = [self[column] for column in SCENE_ID_COLUMNS]
+        keys += [criteria[criterion] for criterion in preference]
+        # lexsort sorts by the last key first
+        order = np.lexsort(tuple(reversed(keys)))
+        same_scene = np.ones(len(self) - 1, dtype=bool)
+        for column in SCENE_ID_COLUMNS:
+            values = self[column][order]
+            same_scene &= values[1:] == values[:-1]
+        first = np.concatenate(([True], ~same_scene))
+        selected = np.sort(order[first])
+        logger.info(f"Dropped {len(self) - len(selected)} duplicate granules")
+        return self.take(selected)
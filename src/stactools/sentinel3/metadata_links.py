@@ -1,29 +1,264 @@
-import os
-from typing import List, Optional, Tuple
+import logging
+import posixpath
+import re
+import threading
+from typing import IO, Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
+import fsspec  # type: ignore
 import netCDF4 as nc  # type: ignore
 import pystac
 from lxml import etree  # type: ignore
-from stactools.core.io import ReadHrefModifier, read_text
+from stactools.core.io import ReadHrefModifier
 from stactools.core.io.xml import XmlElement
 
-from . import constants, xml
+from . import archive, constants, policy
+from .filesystem import (
+    CHAIN_SEPARATOR,
+    is_member,
+    local_path,
+    open_file,
+    read_text,
+)
+from .hdf5 import truncated_image
+from .templates import AssetTemplate, get_item_template
+
+logger = logging.getLogger(__name__)
+
+# How NetCDF files are opened for their headers: every file, one file per
+# grid group, one file per grid group checked against a second one, or one
+# file per grid group for the values the manifest and constants do not have
+PROBE_MODES = ("all", "grouped", "strict", "derived")
+
+# Files of one variable that differ only in their channel, e.g.
+# Oa01_radiance.nc to Oa21_radiance.nc, S1_radiance_an.nc to
+# S6_radiance_an.nc, or Syn_Oa01_reflectance.nc to Syn_S6O_reflectance.nc,
+# are on the same grid and have the same header
+_CHANNEL_FILE = re.compile(
+    r"^(?P<prefix>Syn_)?(?:Oa\d{2}|[SF]\d[NO]?)_(?P<variable>[A-Za-z]+)"
+    r"(?:_(?P<grid>[a-z]{2}))?\.nc$"
+)
+
+# The HDF5 library behind netCDF4 is not thread safe, so NetCDF files are
+# opened one at a time in each process
+netcdf_lock = threading.Lock()
 
 
 class ManifestError(Exception):
     pass
 
 
+# Bytes first read from NetCDF files opened through file objects, grown
+# four-fold until they hold the whole header
+HEADER_READ_SIZE = 64 * 1024
+
+# Global attributes of NetCDF files that hold the spatial resolution
+RESOLUTION_ATTRIBUTES = ("resolution", "spatial_resolution")
+
+
+class NcHeader(NamedTuple):
+    """The parts of a NetCDF file's header that end up on items."""
+
+    dimensions: Dict[str, int]
+    """Size of each dimension, in file order."""
+
+    attributes: Dict[str, str]
+    """The resolution attributes of the file, where present."""
+
+
+class PrefetchedGranule(NamedTuple):
+    """The parts of a granule read ahead of item creation, see
+    :mod:`stactools.sentinel3.prefetch`."""
+
+    granule_root: str
+    """The granule HREF that files are joined to, see
+    :func:`~stactools.sentinel3.archive.granule_root`."""
+
+    manifest_text: str
+    nc_headers: Dict[str, NcHeader]
+    """Headers of NetCDF files, by path relative to the granule. Empty if
+    they were not prefetched."""
+
+
+def read_nc_header(ds: nc.Dataset) -> NcHeader:
+    """Reads the parts of a NetCDF file's header used on items.
+
+    Args:
+        ds (nc.Dataset): The open dataset.
+
+    Returns:
+        NcHeader: The dimensions and resolution attributes.
+    """
+    return NcHeader(
+        dimensions={key: int(ds.dimensions[key].size) for key in ds.dimensions},
+        attributes={
+            name: getattr(ds, name)
+            for name in RESOLUTION_ATTRIBUTES
+            if hasattr(ds, name)
+        },
+    )
+
+
+def open_nc_header(path: str, memory: Optional[bytes] = None) -> NcHeader:
+    """Opens a NetCDF file and reads the parts of its header used on items.
+
+    Args:
+        path (str): The path of the file, or only its name if ``memory`` is
+            given.
+        memory (Optional[bytes]): The contents of the file, or enough of them
+            for netCDF4 to open it.
+
+    Returns:
+        NcHeader: The dimensions and resolution attributes.
+    """
+    with netcdf_lock:
+        ds = nc.Dataset(path, memory=memory)
+        try:
+            return read_nc_header(ds)
+        finally:
+            ds.close()
+
+
+def read_nc_header_from(f: IO[bytes], name: str) -> NcHeader:
+    """Reads the parts of a NetCDF file's header used on items from a file
+    object, e.g. a remote file or an archive member, reading only as much of
+    the file as the header needs.
+
+    netCDF4 only opens paths and complete file images, so the first
+    :data:`HEADER_READ_SIZE` bytes of NetCDF-4 files are opened as a file
+    image that ends there, see :func:`~stactools.sentinel3.hdf5.truncated_image`,
+    and more is read while that fails. Header metadata is written ahead of
+    compressed data, so this is usually one read. Files with contiguous
+    variables end up read whole, since HDF5 checks that their data is within
+    the file, as do files that are not NetCDF-4.
+
+    Args:
+        f (IO[bytes]): The file, at its start.
+        name (str): The name of the file, for error messages.
+
+    Returns:
+        NcHeader: The dimensions and resolution attributes.
+    """
+    size = HEADER_READ_SIZE
+    data = f.read(size)
+    while len(data) == size:
+        image = truncated_image(data)
+        if image is None:
+            break
+        try:
+            return open_nc_header(name, image)
+        except OSError:
+            logger.debug(f"The header of {name} is not in its first {size} bytes")
+        data += f.read(3 * size)
+        size *= 4
+    return open_nc_header(name, data + f.read())
+
+
+def grid_group(location: str) -> Optional[str]:
+    """Returns the group of NetCDF files that share a header with a file.
+
+    Args:
+        location (str): The path of the file relative to the granule.
+
+    Returns:
+        Optional[str]: The variable and grid suffix shared by the group,
+        e.g. ``"radiance_an"``, or None if the file has its own header.
+    """
+    match = _CHANNEL_FILE.match(posixpath.basename(location))
+    if match is None:
+        return None
+    prefix, variable, grid = match.group("prefix", "variable", "grid")
+    group = f"{prefix or ''}{variable}"
+    return group if grid is None else f"{group}_{grid}"
+
+
+def asset_dict(
+    href: str,
+    media_type: Optional[str] = None,
+    description: Optional[str] = None,
+    roles: Optional[List[str]] = None,
+    extra_fields: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Builds the dictionary representation of an asset, with the same keys
+    in the same order as ``pystac.Asset.to_dict``, without constructing a
+    ``pystac.Asset``."""
+    asset: Dict[str, Any] = {"href": href}
+    if media_type is not None:
+        asset["type"] = media_type
+    if description is not None:
+        asset["description"] = description
+    if extra_fields:
+        asset.update(extra_fields)
+    if roles is not None:
+        asset["roles"] = roles
+    return asset
+
+
 class MetadataLinks:
     def __init__(
-        self, granule_href: str, read_href_modifier: Optional[ReadHrefModifier] = None
+        self,
+        granule_href: str,
+        read_href_modifier: Optional[ReadHrefModifier] = None,
+        nc_headers: Optional[Dict[str, NcHeader]] = None,
+        filesystem: Optional[fsspec.AbstractFileSystem] = None,
+        prefetched: Optional[PrefetchedGranule] = None,
+        probe: str = "grouped",
     ):
-        self.granule_href = granule_href
-        self.href = os.path.join(granule_href, constants.MANIFEST_FILENAME)
-
-        self.manifest, self.manifest_text = self.parse_xml_from_href(
-            self.href, read_href_modifier
-        )
+        """
+        Args:
+            granule_href (str): The HREF to the granule directory, or to a
+                zipped granule. Members of zipped granules are read through
+                the archive's central directory, without extracting it.
+            read_href_modifier (Optional[ReadHrefModifier]): An optional
+                function to modify read HREFs.
+            nc_headers (Optional[Dict[str, NcHeader]]): Headers of NetCDF
+                files that have already been read, by path relative to the
+                granule. These files are not opened again.
+            filesystem (Optional[fsspec.AbstractFileSystem]): A shared
+                filesystem to read through, e.g. from
+                :func:`~stactools.sentinel3.filesystem.http_filesystem`.
+            prefetched (Optional[PrefetchedGranule]): The manifest, and
+                possibly NetCDF headers, already read for this granule.
+            probe (str): How NetCDF files are opened for their dimensions and
+                resolution. ``"all"`` opens every file. ``"grouped"`` opens
+                one file of each group of channel files on the same grid,
+                see :func:`grid_group`, and uses its header for the others.
+                ``"strict"`` does the same, but also opens a second file of
+                each group and falls back to opening every file of the group
+                if the headers differ. ``"derived"`` takes the resolution of
+                OLCI assets from the sampling parameters of the manifest, and
+                that of SLSTR assets from the nominal resolution of their
+                bands, and opens files like ``"grouped"`` for the other
+                values. Shapes of OLCI and SLSTR assets always come from the
+                manifest. Defaults to ``"grouped"``.
+        """
+        if probe not in PROBE_MODES:
+            raise ValueError(
+                f"Unsupported probe {probe!r}, must be one of {', '.join(PROBE_MODES)}"
+            )
+        self._probe = probe
+        # Header of the first file opened in each grid group, or None for
+        # groups whose files turned out to differ
+        self._grid_headers: Dict[str, Optional[NcHeader]] = {}
+        self._checked_groups: Set[str] = set()
+        self._read_href_modifier = read_href_modifier
+        self._filesystem = filesystem
+        self._nc_headers = dict(nc_headers or {})
+        if prefetched is None:
+            self.granule_href = archive.granule_root(
+                granule_href, read_href_modifier, filesystem
+            )
+            self.href = archive.join(self.granule_href, constants.MANIFEST_FILENAME)
+            self.manifest, self.manifest_text = self.parse_xml_from_href(
+                self.href, read_href_modifier, filesystem
+            )
+        else:
+            self.granule_href = prefetched.granule_root
+            self.href = archive.join(self.granule_href, constants.MANIFEST_FILENAME)
+            self.manifest_text = prefetched.manifest_text
+            self.manifest = XmlElement(
+                etree.fromstring(bytes(self.manifest_text, encoding="utf-8"))
+            )
+            self._nc_headers.update(prefetched.nc_headers)
         data_object_section = self.manifest.find("dataObjectSection")
         if data_object_section is None:
             raise ManifestError(
@@ -31,15 +266,40 @@ class MetadataLinks:
             )
 
         self._data_object_section = data_object_section
-        self.product_metadata_href = os.path.join(
-            granule_href, constants.MANIFEST_FILENAME
-        )
+        self.product_metadata_href = self.href
+        self._sampling: Optional[List[int]] = None
+        if probe == "derived":
+            self._sampling = self._olci_sampling()
+
+    def _olci_sampling(self) -> Optional[List[int]]:
+        # Along and across track sampling of OLCI products, in the order of
+        # the NetCDF resolution attributes once reversed. Synergy manifests
+        # repeat it, but their grid has its own resolution.
+        product_type = self.manifest.find_text(".//sentinel3:productType")
+        if product_type is None or not product_type.startswith("OL_"):
+            return None
+        along = self.manifest.find_text(".//olci:alSpatialSampling")
+        across = self.manifest.find_text(".//olci:acSpatialSampling")
+        if along is None or across is None:
+            return None
+        return [int(along), int(across)]
+
+    def _derived_resolution(self, asset_template: AssetTemplate) -> Optional[List[int]]:
+        # Resolution of an asset without opening its file, if known
+        if self._probe != "derived":
+            return None
+        if asset_template.nominal_resolution is not None:
+            return [asset_template.nominal_resolution] * 2
+        return self._sampling
 
     @classmethod
     def parse_xml_from_href(
-        cls, href: str, read_href_modifier: Optional[ReadHrefModifier] = None
+        cls,
+        href: str,
+        read_href_modifier: Optional[ReadHrefModifier] = None,
+        filesystem: Optional[fsspec.AbstractFileSystem] = None,
     ) -> Tuple["XmlElement", str]:
-        text = read_text(href, read_href_modifier)
+        text = read_text(href, read_href_modifier, filesystem)
         return XmlElement(etree.fromstring(bytes(text, encoding="utf-8"))), text
 
     def _find_href(self, xpaths: List[str]) -> Optional[str]:
@@ -54,7 +314,7 @@ class MetadataLinks:
         else:
             # Remove relative prefix that some paths have
             file_path = file_path.strip("./")
-            return os.path.join(self.granule_href, file_path)
+            return archive.join(self.granule_href, file_path)
 
     def read_href(self, xpath: str) -> str:
         asset_location = self.manifest.find_attr("href", xpath)
@@ -64,11 +324,14 @@ class MetadataLinks:
 
     @property
     def thumbnail_href(self) -> Optional[str]:
-        preview = os.path.join(self.granule_href, "preview")
-        return os.path.join(preview, "quick-look.png")
+        return archive.join(self.granule_href, "preview", "quick-look.png")
+
+    def create_manifest_asset(self) -> Tuple[str, pystac.Asset]:
+        asset_key, asset = self.create_manifest_asset_dict()
+        return asset_key, pystac.Asset.from_dict(asset)
 
-    def create_manifest_asset(self):
-        asset = pystac.Asset(
+    def create_manifest_asset_dict(self) -> Tuple[str, Dict[str, Any]]:
+        asset = asset_dict(
             href=self.href,
             media_type=pystac.MediaType.XML,
             roles=["metadata"],
@@ -78,14 +341,14 @@ class MetadataLinks:
     def _get_resolution(self, asset_href: str, skip_nc: bool) -> List[int]:
         if skip_nc:
             return []
-        ds = nc.Dataset(asset_href)
-        if hasattr(ds, "resolution"):
-            asset_resolution_str = ds.resolution.strip("[] ")
+        attributes = self._nc_header(asset_href).attributes
+        if "resolution" in attributes:
+            asset_resolution_str = attributes["resolution"].strip("[] ")
             asset_resolution = [
                 int(r) for r in reversed(asset_resolution_str.split(" "))
             ]
-        elif hasattr(ds, "spatial_resolution"):
-            spatres_str = ds.spatial_resolution
+        elif "spatial_resolution" in attributes:
+            spatres_str = attributes["spatial_resolution"]
             tail = "km at nadir"
             if spatres_str.endswith(tail):
                 asset_resolution_str = spatres_str.replace(tail, "")
@@ -99,10 +362,118 @@ class MetadataLinks:
                 )
         else:
             raise ValueError("Don't know how to pull resolution from " + asset_href)
-        ds.close()
         return asset_resolution
 
-    def create_band_asset(self, manifest: XmlElement, skip_nc=False):
+    def create_band_asset(
+        self, manifest: XmlElement, skip_nc: bool = False
+    ) -> Tuple[List[str], List[str], List[pystac.Asset]]:
+        asset_key_list, asset_identifier_list, asset_list = (
+            self.create_band_asset_dicts(manifest, skip_nc)
+        )
+        return (
+            asset_key_list,
+            asset_identifier_list,
+            [pystac.Asset.from_dict(asset) for asset in asset_list],
+        )
+
+    def _get_shape(self, asset_href: str) -> List[Dict[str, int]]:
+        dimensions = self._nc_header(asset_href).dimensions
+        return [{key: size} for key, size in dimensions.items()]
+
+    def _nc_header(self, asset_href: str) -> NcHeader:
+        # Each NetCDF file is opened at most once per granule, and only one
+        # file of each grid group unless probing every file
+        location = self._location(asset_href)
+        header = self._nc_headers.get(location)
+        group = None if self._probe == "all" else grid_group(location)
+        if header is None and group is not None:
+            header = self._grid_headers.get(group)
+            if (
+                header is not None
+                and self._probe == "strict"
+                and group not in self._checked_groups
+            ):
+                self._checked_groups.add(group)
+                checked = self._read_nc_header(asset_href, location)
+                if checked != header:
+                    logger.warning(
+                        f"{location} does not have the header of the other "
+                        f"{group} files, opening each of them"
+                    )
+                    self._grid_headers[group] = None
+                    header = checked
+        if header is None:
+            header = self._read_nc_header(asset_href, location)
+        if group is not None and group not in self._grid_headers:
+            self._grid_headers[group] = header
+        return header
+
+    def _read_nc_header(self, asset_href: str, location: str) -> NcHeader:
+        path = local_path(asset_href, self._read_href_modifier, self._filesystem)
+        if path is not None:
+            header = policy.call(
+                lambda: open_nc_header(path), hedge=False, kind="nc_header"
+            )
+        else:
+
+            def read() -> NcHeader:
+                with open_file(
+                    asset_href, self._read_href_modifier, self._filesystem
+                ) as f:
+                    return read_nc_header_from(f, location)
+
+            header = policy.call(read, kind="nc_header")
+        self._nc_headers[location] = header
+        return header
+
+    def read_nc_headers(self) -> Dict[str, NcHeader]:
+        """Reads the headers of the NetCDF files that item creation needs.
+
+        Returns:
+            Dict[str, NcHeader]: The headers, by path relative to the granule.
+        """
+        template = get_item_template(self.manifest)
+        for asset_template in template.assets:
+            if asset_template.shape_key is None and (
+                not asset_template.resolution
+                or self._derived_resolution(asset_template) is not None
+            ):
+                continue
+            xpath = f".//dataObject[@ID='{asset_template.identifier}']"
+            if asset_template.optional and not self.manifest.findall(xpath):
+                continue
+            location = self.read_href(f"{xpath}//fileLocation")
+            self._nc_header(archive.join(self.granule_href, location))
+        return dict(self._nc_headers)
+
+    def _location(self, asset_href: str) -> str:
+        # Path of a file relative to the granule directory
+        root, href = self.granule_href, asset_href
+        if is_member(asset_href):
+            root = root.split(CHAIN_SEPARATOR, 1)[0]
+            href = href.split(CHAIN_SEPARATOR, 1)[0]
+        return posixpath.normpath(href[len(root) :].lstrip("/"))
+
+    def create_band_asset_dicts(
+        self, manifest: XmlElement, skip_nc: bool = False
+    ) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """Creates the data assets of the granule as dictionaries.
+
+        The static parts of each asset (bands, fixed descriptions, roles) are
+        cloned from the product type's :class:`ItemTemplate`; only HREFs,
+        media types, descriptions from the manifest, and values read from the
+        NetCDF files are filled per granule.
+
+        Args:
+            manifest (XmlElement): manifest file parsed to XmlElement.
+            skip_nc (bool): Skip reading NetCDF files. Defaults to False.
+
+        Returns:
+            Tuple[List[str], List[str], List[Dict[str, Any]]]: The data object
+            IDs of the assets (twice, for backwards compatibility), and the
+            asset dictionaries.
+        """
+
         def strip_prefix(prefix: str, content: str) -> str:
             if content.startswith(prefix):
                 return content[len(prefix) :]
@@ -111,709 +482,54 @@ class MetadataLinks:
         asset_identifier_list = []
         asset_list = []
 
-        product_type = xml.find_text(manifest, ".//sentinel3:productType")
-        product_type_category = product_type.split("_")[0]
-
-        if product_type_category == "OL":
-            instrument_bands = constants.SENTINEL_OLCI_BANDS
-        elif product_type_category == "SL":
-            instrument_bands = constants.SENTINEL_SLSTR_BANDS
-        elif product_type_category == "SR":
-            instrument_bands = constants.SENTINEL_SRAL_BANDS
-        elif product_type_category == "SY":
-            instrument_bands = constants.SENTINEL_SYNERGY_BANDS
-        else:
-            raise RuntimeError(
-                f"Unknown product type encountered: {product_type_category}"
+        template = get_item_template(manifest)
+        for asset_template in template.assets:
+            asset_key = asset_template.identifier
+            if (
+                asset_template.optional
+                and len(manifest.findall(f".//dataObject[@ID='{asset_key}']")) == 0
+            ):
+                continue
+            asset_location = self.read_href(
+                f".//dataObject[@ID='{asset_key}']//fileLocation"
             )
-
-        asset_key_list = None
-        if instrument_bands == constants.SENTINEL_SRAL_BANDS:
-            asset_key_list = constants.SRAL_L2_LAN_WAT_KEYS
-            for asset_key in asset_key_list:
-                band_dict_list = []
-                for band in instrument_bands:
-                    band_dict = {
-                        "name": instrument_bands[band].name,
-                        "description": instrument_bands[band].description,
-                        "central_frequency": instrument_bands[band].center_wavelength,
-                        "band_width_in_Hz": instrument_bands[band].full_width_half_max,
-                    }
-                    band_dict_list.append(band_dict)
-                if "reduced" in asset_key:
-                    band_dict_list = [band_dict_list[1]]
-                else:
-                    pass
-                asset_location = self.read_href(
-                    f".//dataObject[@ID='{asset_key}']//fileLocation"
-                )
-                asset_href = os.path.join(self.granule_href, asset_location)
-                media_type = manifest.find_attr(
-                    "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                )
+            if asset_template.strip_prefix:
+                asset_location = strip_prefix("./", asset_location)
+            asset_href = archive.join(self.granule_href, asset_location)
+            media_type = manifest.find_attr(
+                "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
+            )
+            asset_description = asset_template.description
+            if asset_description is None:
                 asset_description = manifest.find_attr(
                     "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
                 )
-                if skip_nc:
-                    asset_shape_list: List[dict] = []
-                else:
-                    asset_shape_list = []
-                    ds = nc.Dataset(asset_href)
-                    for key in ds.dimensions.keys():
-                        asset_shape_dict = {key: int(ds.dimensions[key].size)}
-                        asset_shape_list.append(asset_shape_dict)
-                    ds.close()
-                asset_obj = pystac.Asset(
-                    href=asset_href,
-                    media_type=media_type,
-                    description=asset_description,
-                    roles=["data"],
-                    extra_fields={
-                        "shape": asset_shape_list,
-                        "sral:bands": band_dict_list,
-                    },
+
+            extra_fields: Dict[str, Any] = {}
+            if asset_template.shape_key is not None:
+                extra_fields[asset_template.shape_key] = (
+                    [] if skip_nc else self._get_shape(asset_href)
                 )
-                asset_identifier_list.append(asset_key)
-                asset_list.append(asset_obj)
-        elif instrument_bands == constants.SENTINEL_SYNERGY_BANDS:
-            if "_AOD_" in product_type:
-                band_key_list = list(constants.SENTINEL_SYNERGY_BANDS.keys())[26:32]
-                asset_key_list = ["NTC_AOD_Data"]
-                band_dict_list = []
-                for asset_key in asset_key_list:
-                    for band in band_key_list:
-                        band_dict = {
-                            "name": instrument_bands[band].name,
-                            "description": instrument_bands[band].description,
-                            "center_wavelength": instrument_bands[
-                                band
-                            ].center_wavelength,
-                            "band_width": instrument_bands[band].full_width_half_max,
-                        }
-                        band_dict_list.append(band_dict)
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(self.granule_href, asset_location)
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = "Global aerosol parameters"
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    asset_obj = pystac.Asset(
-                        href=asset_href,
-                        media_type=media_type,
-                        description=asset_description,
-                        roles=["data"],
-                        extra_fields={
-                            "s3:spatial_resolution": asset_resolution,
-                            "eo:bands": band_dict_list,
-                        },
-                    )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif "_SYN_" in product_type:
-                asset_key_list = constants.SYNERGY_SYN_ASSET_KEYS
-                for ind, asset_key in enumerate(asset_key_list):
-                    if ind < 26:
-                        band_key = list(constants.SENTINEL_SYNERGY_BANDS.keys())[ind]
-                        band_dict_list = []
-                        band_dict = {
-                            "name": instrument_bands[band_key].name,
-                            "description": instrument_bands[band_key].description,
-                            "center_wavelength": instrument_bands[
-                                band_key
-                            ].center_wavelength,
-                            "band_width": instrument_bands[
-                                band_key
-                            ].full_width_half_max,
-                        }
-                        band_dict_list.append(band_dict)
-                    elif ind == 26 or ind == 27:
-                        band_key_list = constants.SYNERGY_L2_A550_T550_BANDS
-                        band_dict_list = []
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": constants.SENTINEL_OLCI_SLSTR_BANDS[band].name,
-                                "description": constants.SENTINEL_OLCI_SLSTR_BANDS[
-                                    band
-                                ].description,
-                                "center_wavelength": constants.SENTINEL_OLCI_SLSTR_BANDS[
-                                    band
-                                ].center_wavelength,
-                                "band_width": constants.SENTINEL_OLCI_SLSTR_BANDS[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                    elif ind == 28:
-                        band_key_list = constants.SYNERGY_L2_SDR_BANDS
-                        band_dict_list = []
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": constants.SENTINEL_OLCI_SLSTR_BANDS[band].name,
-                                "description": constants.SENTINEL_OLCI_SLSTR_BANDS[
-                                    band
-                                ].description,
-                                "center_wavelength": constants.SENTINEL_OLCI_SLSTR_BANDS[
-                                    band
-                                ].center_wavelength,
-                                "band_width": constants.SENTINEL_OLCI_SLSTR_BANDS[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                    else:
-                        band_dict_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if skip_nc:
-                        asset_shape_list = []
-                    else:
-                        asset_shape_list = []
-                        ds = nc.Dataset(asset_href)
-                        for key in ds.dimensions.keys():
-                            asset_shape_dict = {key: int(ds.dimensions[key].size)}
-                            asset_shape_list.append(asset_shape_dict)
-                        ds.close()
-                    if band_dict_list:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:shape": asset_shape_list,
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    else:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:shape": asset_shape_list,
-                                "s3:spatial_resolution": asset_resolution,
-                            },
-                        )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif any(product_id in product_type for product_id in ["_VG1_", "_V10_"]):
-                asset_key_list = constants.SYNERGY_V10_VG1_ASSET_KEYS
-                for ind, asset_key in enumerate(asset_key_list):
-                    band_dict_list = []
-                    if ind < 4:
-                        band_key = list(constants.SENTINEL_SYNERGY_BANDS.keys())[-4:][
-                            ind
-                        ]
-                        band_dict = {
-                            "name": instrument_bands[band_key].name,
-                            "description": instrument_bands[band_key].description,
-                            "center_wavelength": instrument_bands[
-                                band_key
-                            ].center_wavelength,
-                            "band_width": instrument_bands[
-                                band_key
-                            ].full_width_half_max,
-                        }
-                        band_dict_list.append(band_dict)
-                    elif ind == 4:
-                        band_key_list = ["B2", "B3"]
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": instrument_bands[band].name,
-                                "description": instrument_bands[band].description,
-                                "center_wavelength": instrument_bands[
-                                    band
-                                ].center_wavelength,
-                                "band_width": instrument_bands[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                    else:
-                        band_dict_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if skip_nc:
-                        asset_shape_list = []
-                    else:
-                        asset_shape_list = []
-                        ds = nc.Dataset(asset_href)
-                        for key in ds.dimensions.keys():
-                            asset_shape_dict = {key: int(ds.dimensions[key].size)}
-                            asset_shape_list.append(asset_shape_dict)
-                        ds.close()
-                    if band_dict_list:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:shape": asset_shape_list,
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    else:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:shape": asset_shape_list,
-                                "s3:spatial_resolution": asset_resolution,
-                            },
-                        )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            else:
-                asset_key_list = constants.SYNERGY_VGP_ASSET_KEYS
-                for ind, asset_key in enumerate(asset_key_list):
-                    band_dict_list = []
-                    if ind < 4:
-                        band_key = list(constants.SENTINEL_SYNERGY_BANDS.keys())[-4:][
-                            ind
-                        ]
-                        band_dict = {
-                            "name": instrument_bands[band_key].name,
-                            "description": instrument_bands[band_key].description,
-                            "center_wavelength": instrument_bands[
-                                band_key
-                            ].center_wavelength,
-                            "band_width": instrument_bands[
-                                band_key
-                            ].full_width_half_max,
-                        }
-                        band_dict_list.append(band_dict)
-                    else:
-                        band_dict_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(self.granule_href, asset_location)
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if skip_nc:
-                        asset_shape_list = []
-                    else:
-                        asset_shape_list = []
-                        ds = nc.Dataset(asset_href)
-                        for key in ds.dimensions.keys():
-                            asset_shape_dict = {key: int(ds.dimensions[key].size)}
-                            asset_shape_list.append(asset_shape_dict)
-                        ds.close()
-                    if band_dict_list:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:shape": asset_shape_list,
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    else:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:shape": asset_shape_list,
-                                "s3:spatial_resolution": asset_resolution,
-                            },
-                        )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-        elif instrument_bands == constants.SENTINEL_OLCI_BANDS:
-            if "OL_1_" in product_type:
-                asset_key_list = constants.OLCI_L1_ASSET_KEYS
-                for asset_key, band in zip(asset_key_list, instrument_bands):
-                    band_dict = {
-                        "name": instrument_bands[band].name,
-                        "description": instrument_bands[band].description,
-                        "center_wavelength": instrument_bands[band].center_wavelength,
-                        "band_width": instrument_bands[band].full_width_half_max,
-                    }
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    asset_obj = pystac.Asset(
-                        href=asset_href,
-                        media_type=media_type,
-                        description=asset_description,
-                        roles=["data"],
-                        extra_fields={
-                            "s3:spatial_resolution": asset_resolution,
-                            "eo:bands": [band_dict],
-                        },
-                    )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif any(_str in product_type for _str in ["_LFR_", "_LRR_"]):
-                if len(manifest.findall(".//dataObject[@ID='ogviData']")) == 0:
-                    asset_key_list = constants.OLCI_L2_LAND_ASSET_KEYS_RENAMED
-                else:
-                    asset_key_list = constants.OLCI_L2_LAND_ASSET_KEYS
-                for asset_key in asset_key_list:
-                    if asset_key == "ogviData" or asset_key == "gifaparData":
-                        band_key_list = ["Oa03", "Oa10", "Oa17"]
-                    elif asset_key == "otciData":
-                        band_key_list = ["Oa10", "Oa11", "Oa12"]
-                    elif asset_key == "iwvData":
-                        band_key_list = ["Oa18", "Oa19"]
-                    elif asset_key == "rcOgviData":
-                        band_key_list = ["Oa10", "Oa17"]
-                    else:
-                        band_key_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if not band_key_list:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={"s3:spatial_resolution": asset_resolution},
-                        )
-                    else:
-                        band_dict_list = []
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": instrument_bands[band].name,
-                                "description": instrument_bands[band].description,
-                                "center_wavelength": instrument_bands[
-                                    band
-                                ].center_wavelength,
-                                "band_width": instrument_bands[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif "_WFR_" in product_type:
-                # Iterate over both the legacy water keys and the Collection 4
-                # (v4.01) additions. Data objects that are not present in this
-                # particular manifest are skipped, so the same code handles
-                # both the old and new processing baselines.
-                present_asset_keys = []
-                for asset_key in (
-                    constants.OLCI_L2_WATER_ASSET_KEYS
-                    + constants.OLCI_L2_WATER_ASSET_KEYS_C4
-                ):
-                    if len(manifest.findall(f".//dataObject[@ID='{asset_key}']")) == 0:
-                        continue
-                    if asset_key in constants.OLCI_L2_WATER_BAND_KEYS:
-                        band_key_list = constants.OLCI_L2_WATER_BAND_KEYS[asset_key]
-                    elif asset_key.startswith("Oa") and asset_key.endswith(
-                        "_reflectanceData"
-                    ):
-                        band_key_list = [asset_key[:4]]
-                    else:
-                        band_key_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if band_key_list:
-                        band_dict_list = []
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": instrument_bands[band].name,
-                                "description": instrument_bands[band].description,
-                                "center_wavelength": instrument_bands[
-                                    band
-                                ].center_wavelength,
-                                "band_width": instrument_bands[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    else:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={"s3:spatial_resolution": asset_resolution},
-                        )
-                    present_asset_keys.append(asset_key)
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-                # Return only the keys actually present in this manifest so the
-                # asset keys stay aligned with asset_identifier_list/asset_list.
-                asset_key_list = present_asset_keys
-        elif instrument_bands == constants.SENTINEL_SLSTR_BANDS:
-            if "SL_1_" in product_type:
-                asset_key_list = constants.SLSTR_L1_ASSET_KEYS
-                for asset_key, band in zip(asset_key_list, instrument_bands):
-                    band_dict = {
-                        "name": instrument_bands[band].name,
-                        "description": instrument_bands[band].description,
-                        "center_wavelength": instrument_bands[band].center_wavelength,
-                        "band_width": instrument_bands[band].full_width_half_max,
-                    }
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    asset_obj = pystac.Asset(
-                        href=asset_href,
-                        media_type=media_type,
-                        description=asset_description,
-                        roles=["data"],
-                        extra_fields={
-                            "s3:spatial_resolution": asset_resolution,
-                            "eo:bands": [band_dict],
-                        },
-                    )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif "_FRP_" in product_type:
-                asset_key_list = constants.SLSTR_L2_FRP_KEYS
-                for asset_key in asset_key_list:
-                    if asset_key == "FRP_IN_Data":
-                        band_key_list = ["S05", "S06", "S07", "S10"]
-                    else:
-                        band_key_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = manifest.find_attr(
-                        "textInfo", f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if band_key_list:
-                        band_dict_list = []
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": instrument_bands[band].name,
-                                "description": instrument_bands[band].description,
-                                "center_wavelength": instrument_bands[
-                                    band
-                                ].center_wavelength,
-                                "band_width": instrument_bands[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                        asset_description = "Fire Radiative Power (FRP) dataset"
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    else:
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={"s3:spatial_resolution": asset_resolution},
-                        )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif "_LST_" in product_type:
-                asset_key_list = constants.SLSTR_L2_LST_KEYS
-                for asset_key in asset_key_list:
-                    if asset_key == "LST_IN_Data":
-                        band_key_list = ["S08", "S09"]
-                    else:
-                        band_key_list = []
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    if band_key_list:
-                        band_dict_list = []
-                        for band in band_key_list:
-                            band_dict = {
-                                "name": instrument_bands[band].name,
-                                "description": instrument_bands[band].description,
-                                "center_wavelength": instrument_bands[
-                                    band
-                                ].center_wavelength,
-                                "band_width": instrument_bands[
-                                    band
-                                ].full_width_half_max,
-                            }
-                            band_dict_list.append(band_dict)
-                        asset_description = "Land Surface Temperature (LST) values"
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={
-                                "s3:spatial_resolution": asset_resolution,
-                                "eo:bands": band_dict_list,
-                            },
-                        )
-                    else:
-                        asset_description = manifest.find_attr(
-                            "textInfo",
-                            f".//dataObject[@ID='{asset_key}']//fileLocation",
-                        )
-                        asset_obj = pystac.Asset(
-                            href=asset_href,
-                            media_type=media_type,
-                            description=asset_description,
-                            roles=["data"],
-                            extra_fields={"s3:spatial_resolution": asset_resolution},
-                        )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-            elif "_WST_" in product_type:
-                asset_key_list = ["L2P_Data"]
-                band_key_list = ["S07", "S08", "S09"]
-                band_dict_list = []
-                for asset_key in asset_key_list:
-                    for band in band_key_list:
-                        band_dict = {
-                            "name": instrument_bands[band].name,
-                            "description": instrument_bands[band].description,
-                            "center_wavelength": instrument_bands[
-                                band
-                            ].center_wavelength,
-                            "band_width": instrument_bands[band].full_width_half_max,
-                        }
-                        band_dict_list.append(band_dict)
-                    asset_location = self.read_href(
-                        f".//dataObject[@ID='{asset_key}']//fileLocation"
-                    )
-                    asset_href = os.path.join(
-                        self.granule_href, strip_prefix("./", asset_location)
-                    )
-                    media_type = manifest.find_attr(
-                        "mimeType", f".//dataObject[@ID='{asset_key}']//byteStream"
-                    )
-                    asset_description = (
-                        "Data respects the Group for High Resolution "
-                        "Sea Surface Temperature (GHRSST) L2P specification"
-                    )
-                    asset_resolution = self._get_resolution(asset_href, skip_nc)
-                    asset_obj = pystac.Asset(
-                        href=asset_href,
-                        media_type=media_type,
-                        description=asset_description,
-                        roles=["data"],
-                        extra_fields={
-                            "s3:spatial_resolution": asset_resolution,
-                            "eo:bands": band_dict_list,
-                        },
-                    )
-                    asset_identifier_list.append(asset_key)
-                    asset_list.append(asset_obj)
-        return asset_key_list, asset_identifier_list, asset_list
+            if asset_template.resolution:
+                resolution = (
+                    None if skip_nc else self._derived_resolution(asset_template)
+                )
+                extra_fields["s3:spatial_resolution"] = (
+                    self._get_resolution(asset_href, skip_nc)
+                    if resolution is None
+                    else resolution
+                )
+            if asset_template.bands:
+                extra_fields[asset_template.bands_key] = asset_template.clone_bands()
+
+            asset_obj = asset_dict(
+                href=asset_href,
+                media_type=media_type,
+                description=asset_description,
+                roles=list(asset_template.roles),
+                extra_fields=extra_fields,
+            )
+            asset_identifier_list.append(asset_key)
+            asset_list.append(asset_obj)
+
+        return asset_identifier_list, list(asset_identifier_list), asset_list
@@ -0,0 +1,343 @@
+import gzip
+import io
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import pystac
+
+from .serialization import EncodedItem, dumps
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# Default rotation threshold, in uncompressed bytes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Names of shards, with any compression extension and ".part" suffix
+_SHARD_NAME = re.compile(r"^(?P<product>.+)_(?P<date>\d{8})_(?P<index>\d{5,})\.ndjson")
+
+_CLOSE = object()
+
+
+class _Shard:
+    """A single open, compressed NDJSON file."""
+
+    def __init__(self, path: str, compression: str, level: Optional[int]) -> None:
+        self.path = path
+        self.partial_path = path + ".part"
+        self.items = 0
+        self.bytes = 0
+        # Fails if another writer is writing the same shard
+        self._raw = open(self.partial_path, "xb")
+        self._stream: Any
+        if compression == "gzip":
+            self._stream = gzip.GzipFile(
+                fileobj=self._raw,
+                mode="wb",
+                compresslevel=6 if level is None else level,
+                mtime=0,
+            )
+        else:
+            compressor = zstandard.ZstdCompressor(level=3 if level is None else level)
+            self._stream = compressor.stream_writer(self._raw)
+
+    def write(self, line: bytes) -> None:
+        self._stream.write(line)
+        self.items += 1
+        self.bytes += len(line)
+
+    def close(self) -> None:
+        self._stream.close()
+        if not self._raw.closed:
+            self._raw.close()
+        if os.path.exists(self.path):
+            raise FileExistsError(
+                f"Shard {self.path} was written by another writer, "
+                f"keeping this one at {self.partial_path}"
+            )
+        os.replace(self.partial_path, self.path)
+
+
+class NdjsonShardWriter:
+    """Writes STAC items to compressed, newline-delimited JSON shards.
+
+    Items are grouped by product type (``s3:product_name``) and the UTC date
+    of the item ``datetime``, and each group is written to its own sequence of
+    shards named ``<product_name>_<YYYYMMDD>_<index>.ndjson.gz`` (or ``.zst``).
+    A shard is rotated once it holds ``max_items`` items or ``max_bytes``
+    uncompressed bytes. Compression and file writes happen on a background
+    thread, so callers only pay for converting items to dictionaries.
+
+    An item that cannot be written does not stop the writer. If it cannot be
+    grouped, e.g. because it has no datetime, :meth:`write` raises for it. If
+    it fails to serialize, its ID and exception are appended to
+    :attr:`errors`. Failures to write shards themselves are raised from the
+    next call to :meth:`write` or :meth:`close`.
+
+    Shards are written to a ``.part`` file and renamed once complete, so a
+    loader never picks up a partially written shard. Indices continue after
+    the highest index of the group already in the directory, so a resumed or
+    split run adds shards next to those written before instead of
+    overwriting them.
+
+    Example:
+        >>> with NdjsonShardWriter("out", compression="zstd") as writer:
+        ...     for href in hrefs:
+        ...         writer.write(create_item(href))
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        compression: str = "gzip",
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+        max_items: Optional[int] = None,
+        compression_level: Optional[int] = None,
+        max_open_shards: int = 16,
+        queue_size: int = 1024,
+    ) -> None:
+        """
+        Args:
+            directory (str): Local directory that will hold the shards.
+            compression (str): Either "gzip" or "zstd". "zstd" requires the
+                optional ``zstandard`` package. Defaults to "gzip".
+            max_bytes (Optional[int]): Rotate a shard after this many
+                uncompressed bytes. Defaults to 256 MiB.
+            max_items (Optional[int]): Rotate a shard after this many items.
+                Defaults to no limit.
+            compression_level (Optional[int]): Compression level passed to the
+                compressor. Defaults to the compressor's own default.
+            max_open_shards (int): Maximum number of shards kept open at once.
+                The least recently used shard is closed when this is
+                exceeded. Defaults to 16.
+            queue_size (int): Maximum number of items waiting to be written
+                before :meth:`write` blocks. Defaults to 1024.
+        """
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(
+                f"Unsupported compression '{compression}', expected one of "
+                f"{', '.join(COMPRESSION_EXTENSIONS)}"
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ImportError(
+                "zstd compression requires the 'zstandard' package, "
+                "install it with: pip install stactools-sentinel3[zstd]"
+            )
+        if max_bytes is None and max_items is None:
+            raise ValueError("At least one of max_bytes or max_items must be set")
+
+        self.directory = directory
+        self.compression = compression
+        self.compression_level = compression_level
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.max_open_shards = max_open_shards
+        self.shards: List[str] = []
+        self.errors: List[Tuple[Optional[str], Exception]] = []
+
+        self._open: "OrderedDict[Tuple[str, str], _Shard]" = OrderedDict()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+
+        os.makedirs(directory, exist_ok=True)
+        self._next_index = _next_indices(directory)
+        self._thread = threading.Thread(
+            target=self._run, name="ndjson-shard-writer", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "NdjsonShardWriter":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def write(self, item: Union[pystac.Item, Dict[str, Any], EncodedItem]) -> None:
+        """Queues an item to be written.
+
+        Encoded items are written as they are, without being decoded.
+
+        Args:
+            item (Union[pystac.Item, Dict[str, Any], EncodedItem]): The item,
+                its dictionary representation, or its encoded form.
+
+        Raises:
+            ValueError: If the item has no datetime to group it by. The
+                writer carries on with the next item.
+        """
+        if self._closed:
+            raise ValueError("Cannot write to a closed NdjsonShardWriter")
+        self._raise_for_error()
+        if isinstance(item, pystac.Item):
+            item = item.to_dict(include_self_link=False, transform_hrefs=False)
+        self._queue.put((shard_key(item), item))
+
+    def close(self) -> List[str]:
+        """Flushes all pending items and closes every open shard.
+
+        Returns:
+            List[str]: The paths of all shards written, in completion order.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        self._raise_for_error()
+        return self.shards
+
+    def _raise_for_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("NdjsonShardWriter failed") from self._error
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                break
+            if self._error is not None:
+                # Keep draining so that producers never block on a dead writer
+                continue
+            try:
+                self._write(*item)
+            except BaseException as e:
+                logger.exception("Failed to write item to NDJSON shard")
+                self._error = e
+        for key in list(self._open):
+            try:
+                self._close_shard(key)
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+
+    def _write(
+        self, key: Tuple[str, str], item: Union[Dict[str, Any], EncodedItem]
+    ) -> None:
+        if isinstance(item, EncodedItem):
+            data = item.data
+        else:
+            try:
+                data = dumps(item)
+            except Exception as e:
+                logger.debug(f"Could not serialize item {item.get('id')}: {e!r}")
+                self.errors.append((item.get("id"), e))
+                return
+        shard = self._open.get(key)
+        if shard is None:
+            shard = self._open_shard(key)
+        else:
+            self._open.move_to_end(key)
+        shard.write(data + b"\n")
+        if (self.max_items is not None and shard.items >= self.max_items) or (
+            self.max_bytes is not None and shard.bytes >= self.max_bytes
+        ):
+            self._close_shard(key)
+
+    def _open_shard(self, key: Tuple[str, str]) -> _Shard:
+        while len(self._open) >= self.max_open_shards:
+            self._close_shard(next(iter(self._open)))
+        product_name, date = key
+        index = self._next_index.get(key, 0)
+        while True:
+            file_name = (
+                f"{product_name}_{date}_{index:05d}.ndjson"
+                + COMPRESSION_EXTENSIONS[self.compression]
+            )
+            path = os.path.join(self.directory, file_name)
+            index += 1
+            # Skip shards written since the directory was listed
+            if not os.path.exists(path) and not os.path.exists(path + ".part"):
+                break
+        self._next_index[key] = index
+        shard = _Shard(path, self.compression, self.compression_level)
+        self._open[key] = shard
+        return shard
+
+    def _close_shard(self, key: Tuple[str, str]) -> None:
+        shard = self._open.pop(key)
+        shard.close()
+        self.shards.append(shard.path)
+
+
+def _next_indices(directory: str) -> Dict[Tuple[str, str], int]:
+    # Index after the highest index of each group of shards in a directory,
+    # including partial shards left by an interrupted run
+    indices: Dict[Tuple[str, str], int] = {}
+    for name in os.listdir(directory):
+        match = _SHARD_NAME.match(name)
+        if match is not None:
+            key = (match["product"], match["date"])
+            indices[key] = max(indices.get(key, 0), int(match["index"]) + 1)
+    return indices
+
+
+def shard_key(item: Union[Dict[str, Any], EncodedItem]) -> Tuple[str, str]:
+    """Returns the ``(product_name, YYYYMMDD)`` pair used to group an item
+    into shards.
+
+    Args:
+        item (Union[Dict[str, Any], EncodedItem]): The dictionary
+            representation of an item, or its encoded form.
+
+    Returns:
+        Tuple[str, str]: The product name and the UTC date of the item.
+    """
+    item_id: Optional[str]
+    timestamp: Optional[str]
+    if isinstance(item, EncodedItem):
+        item_id = item.id
+        product_name = item.product_name
+        timestamp = item.datetime
+    else:
+        properties = item.get("properties", {})
+        item_id = item.get("id")
+        product_name = properties.get("s3:product_name") or "unknown"
+        timestamp = properties.get("datetime") or properties.get("start_datetime")
+    if not timestamp:
+        raise ValueError(f"Item {item_id} has no datetime")
+    date = pystac.utils.str_to_datetime(timestamp).strftime("%Y%m%d")
+    return product_name, date
+
+
+def read_ndjson(path: str) -> Iterator[Dict[str, Any]]:
+    """Reads the items of an NDJSON file, such as a shard written by
+    :class:`NdjsonShardWriter`.
+
+    Files ending in ``.gz`` or ``.zst`` are decompressed; reading ``.zst``
+    files requires the optional ``zstandard`` package.
+
+    Args:
+        path (str): Path of the NDJSON file.
+
+    Returns:
+        Iterator[Dict[str, Any]]: The items, in file order.
+    """
+    stream: Any
+    if path.endswith(COMPRESSION_EXTENSIONS["gzip"]):
+        stream = gzip.open(path, "rb")
+    elif path.endswith(COMPRESSION_EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise ImportError(
+                "Reading zstd shards requires the 'zstandard' package, "
+                "install it with: pip install stactools-sentinel3[zstd]"
+            )
+        reader = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        stream = io.BufferedReader(reader)
+    else:
+        stream = open(path, "rb")
+    with stream as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,301 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Callable, Deque, Dict, Iterator, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors that a second attempt cannot fix
+PERMANENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    FileNotFoundError,
+    IsADirectoryError,
+    NotADirectoryError,
+    PermissionError,
+)
+
+# Number of recent read latencies kept per kind of read to compute the hedge
+# percentile
+LATENCY_WINDOW = 1000
+
+# Number of threads that run the first attempts of hedged reads. Further reads
+# wait for a thread, and neither their wait nor their hedge delay starts
+# before they have one.
+FIRST_ATTEMPT_THREADS = 32
+
+
+@dataclass(frozen=True)
+class ReadPolicy:
+    """How reads of remote files are retried and hedged.
+
+    The default policy makes a single attempt and never hedges. Policies are
+    immutable and picklable, so they can be installed in worker processes.
+    """
+
+    retries: int = 0
+    """Number of further attempts after a read fails with a transient error."""
+
+    backoff: float = 0.2
+    """Base delay in seconds before the first retry. The delay doubles with
+    every retry, and a uniformly random delay up to it is used ("full
+    jitter"), so that throttled workers do not retry in lockstep."""
+
+    max_backoff: float = 10.0
+    """Upper bound of the delay between retries, in seconds."""
+
+    hedge_after: Optional[float] = None
+    """Send a second, identical request when the first has not completed
+    after this many seconds, and use whichever completes first."""
+
+    hedge_percentile: Optional[float] = None
+    """Hedge after the given percentile (e.g. 95) of recent latencies of reads
+    of the same kind, instead of a fixed delay. Takes precedence over ``hedge_after`` once
+    ``hedge_min_samples`` reads of that kind have completed."""
+
+    hedge_min_samples: int = 20
+    """Number of reads needed before ``hedge_percentile`` is used."""
+
+    retry_on: Tuple[Type[BaseException], ...] = (OSError, TimeoutError)
+    """Errors that are retried, except for :data:`PERMANENT_ERRORS`."""
+
+    def __post_init__(self) -> None:
+        if self.retries < 0:
+            raise ValueError(f"retries must not be negative, got {self.retries}")
+        if self.hedge_percentile is not None and not 0 < self.hedge_percentile < 100:
+            raise ValueError(
+                f"hedge_percentile must be between 0 and 100, "
+                f"got {self.hedge_percentile}"
+            )
+
+    @property
+    def hedges(self) -> bool:
+        return self.hedge_after is not None or self.hedge_percentile is not None
+
+    def delay(self, attempt: int) -> float:
+        """Returns the random delay before retry number ``attempt``, from 0."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return isinstance(error, self.retry_on) and not isinstance(
+            error, PERMANENT_ERRORS
+        )
+
+
+@dataclass
+class ReadStats:
+    """Counters of reads made under a :class:`ReadPolicy`."""
+
+    reads: int = 0
+    """Number of reads, counting retries and hedges once."""
+
+    retries: int = 0
+    """Number of attempts after a failed one."""
+
+    failures: int = 0
+    """Number of reads that failed after all attempts."""
+
+    hedges: int = 0
+    """Number of second requests sent."""
+
+    hedge_wins: int = 0
+    """Number of second requests that completed before the first."""
+
+    def add(self, other: "ReadStats") -> None:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def __sub__(self, other: "ReadStats") -> "ReadStats":
+        return ReadStats(
+            **{
+                f.name: getattr(self, f.name) - getattr(other, f.name)
+                for f in fields(self)
+            }
+        )
+
+
+_policy = ReadPolicy()
+_scoped_policy: "contextvars.ContextVar[Optional[ReadPolicy]]" = contextvars.ContextVar(
+    "read_policy", default=None
+)
+_lock = threading.Lock()
+_stats = ReadStats()
+_thread = threading.local()
+_latencies: Dict[str, Deque[float]] = {}
+_first_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+
+
+def set_read_policy(policy: ReadPolicy) -> None:
+    """Sets the policy of every read in the current process.
+
+    Args:
+        policy (ReadPolicy): The policy.
+    """
+    global _policy
+    _policy = policy
+
+
+@contextmanager
+def use_read_policy(policy: ReadPolicy) -> Iterator[None]:
+    """Applies a policy to the reads of the current thread, including their
+    hedges, until the block exits.
+
+    Unlike :func:`set_read_policy`, this leaves the reads of other threads
+    alone, so it is how tasks on a thread pool install their policy.
+
+    Args:
+        policy (ReadPolicy): The policy.
+    """
+    token = _scoped_policy.set(policy)
+    try:
+        yield
+    finally:
+        _scoped_policy.reset(token)
+
+
+def get_read_policy() -> ReadPolicy:
+    """Returns the policy of reads in the current thread."""
+    policy = _scoped_policy.get()
+    return _policy if policy is None else policy
+
+
+def read_stats() -> ReadStats:
+    """Returns the read counters of the current process since it started."""
+    with _lock:
+        return ReadStats(**vars(_stats))
+
+
+def thread_read_stats() -> ReadStats:
+    """Returns the read counters of the current thread since it started."""
+    stats: Optional[ReadStats] = getattr(_thread, "stats", None)
+    return ReadStats() if stats is None else ReadStats(**vars(stats))
+
+
+def _count(**counts: int) -> None:
+    stats = getattr(_thread, "stats", None)
+    if stats is None:
+        stats = _thread.stats = ReadStats()
+    update = ReadStats(**counts)
+    stats.add(update)
+    with _lock:
+        _stats.add(update)
+
+
+def _hedge_delay(policy: ReadPolicy, kind: str) -> Optional[float]:
+    if policy.hedge_percentile is not None:
+        with _lock:
+            latencies = sorted(_latencies.get(kind, ()))
+        if len(latencies) >= policy.hedge_min_samples:
+            index = int(len(latencies) * policy.hedge_percentile / 100)
+            return latencies[min(index, len(latencies) - 1)]
+    return policy.hedge_after
+
+
+def _get_first_pool() -> ThreadPoolExecutor:
+    global _first_pool
+    with _lock:
+        if _first_pool is None:
+            _first_pool = ThreadPoolExecutor(
+                FIRST_ATTEMPT_THREADS, thread_name_prefix="hedged-read-first"
+            )
+        return _first_pool
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(thread_name_prefix="hedged-read")
+        return _hedge_pool
+
+
+def _record_latency(kind: str, latency: float) -> None:
+    with _lock:
+        latencies = _latencies.get(kind)
+        if latencies is None:
+            latencies = _latencies[kind] = deque(maxlen=LATENCY_WINDOW)
+        latencies.append(latency)
+
+
+def _start(read: Callable[[], T], started: "Future[float]") -> T:
+    started.set_result(time.perf_counter())
+    return read()
+
+
+def _hedged(read: Callable[[], T], delay: float) -> Tuple[T, float]:
+    # First attempts run on a pool of their own, so that they do not queue
+    # behind hedges. The time a read waits for a thread there is not counted
+    # as its latency, which would trigger hedges that only add to the wait.
+    # Both attempts see the policy and block cache of the calling thread.
+    started: "Future[float]" = Future()
+    first = _get_first_pool().submit(
+        contextvars.copy_context().run, _start, read, started
+    )
+    start = started.result()
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result(), time.perf_counter() - start
+    second = _get_hedge_pool().submit(contextvars.copy_context().run, read)
+    _count(hedges=1)
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            future_error = future.exception()
+            if future_error is None:
+                if future is second:
+                    _count(hedge_wins=1)
+                return future.result(), time.perf_counter() - start
+            error = future_error
+    assert error is not None
+    raise error
+
+
+def call(read: Callable[[], T], hedge: bool = True, kind: str = "read") -> T:
+    """Runs a read under the current :class:`ReadPolicy`.
+
+    Args:
+        read (Callable[[], T]): Reads and returns a whole file, or anything
+            else that is safe to run twice at the same time.
+        hedge (bool): Allow a hedged second request. Only pass False for
+            reads whose result must be released by the caller, e.g. an open
+            file.
+        kind (str): The kind of read, e.g. "listing" or "nc_header". Hedge
+            percentiles are computed over reads of the same kind, so that
+            small reads are not hedged after the latency of whole files.
+
+    Returns:
+        T: The result of the first attempt to succeed.
+    """
+    policy = get_read_policy()
+    _count(reads=1)
+    attempt = 0
+    while True:
+        try:
+            delay = _hedge_delay(policy, kind) if hedge and policy.hedges else None
+            if delay is None:
+                start = time.perf_counter()
+                result = read()
+                latency = time.perf_counter() - start
+            else:
+                result, latency = _hedged(read, delay)
+        except Exception as e:
+            if attempt >= policy.retries or not policy.is_retryable(e):
+                _count(failures=1)
+                raise
+            wait_for = policy.delay(attempt)
+            logger.debug(f"Retrying read in {wait_for:.2f}s after {e!r}")
+            time.sleep(wait_for)
+            attempt += 1
+            _count(retries=1)
+            continue
+        _record_latency(kind, latency)
+        return result
@@ -0,0 +1,204 @@
+import contextvars
+import logging
+import posixpath
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import IO, Any, Deque, Generator, Iterable, Mapping, Optional, Tuple, Union
+
+import fsspec  # type: ignore
+from stactools.core.io import ReadHrefModifier
+
+from . import archive
+from .cache import BlockCache, use_block_cache
+from .metadata_links import (
+    MetadataLinks,
+    PrefetchedGranule,
+    open_nc_header,
+    read_nc_header_from,
+)
+from .policy import ReadPolicy, use_read_policy
+
+logger = logging.getLogger(__name__)
+
+
+def prefetch_granule(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    nc_headers: bool = False,
+    probe: str = "grouped",
+) -> PrefetchedGranule:
+    """Reads the manifest of a granule, and optionally the headers of its
+    NetCDF files, ahead of item creation.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+        nc_headers (bool): Also read the NetCDF headers that item creation
+            needs. Defaults to False.
+        probe (str): How item creation will open NetCDF files, see
+            :class:`~stactools.sentinel3.metadata_links.MetadataLinks`, so
+            that exactly the headers it needs are read. Defaults to
+            ``"grouped"``.
+
+    Returns:
+        PrefetchedGranule: What was read, to pass to
+        :func:`~stactools.sentinel3.stac.create_item`.
+    """
+    metalinks = MetadataLinks(
+        granule_href, read_href_modifier, filesystem=filesystem, probe=probe
+    )
+    return PrefetchedGranule(
+        granule_root=metalinks.granule_href,
+        manifest_text=metalinks.manifest_text,
+        nc_headers=metalinks.read_nc_headers() if nc_headers else {},
+    )
+
+
+def prefetched_from_bytes(
+    granule_href: str,
+    manifest: Union[bytes, str],
+    nc_files: Optional[Mapping[str, Union[bytes, IO[bytes]]]] = None,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> PrefetchedGranule:
+    """Wraps a manifest and NetCDF files that the caller has already read.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+            Only the central directory of a zip file is read.
+        manifest (Union[bytes, str]): The contents of ``xfdumanifest.xml``.
+        nc_files (Optional[Mapping[str, Union[bytes, IO[bytes]]]]): NetCDF
+            files by path relative to the granule directory, e.g.
+            ``"Oa01_radiance.nc"``, as bytes or binary file objects. Bytes
+            must hold the whole file, or enough of it for netCDF4 to open it;
+            only the header is read from file objects.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+
+    Returns:
+        PrefetchedGranule: What was given, to pass to
+        :func:`~stactools.sentinel3.stac.create_item`.
+    """
+    nc_headers = {}
+    for path, data in (nc_files or {}).items():
+        path = posixpath.normpath(path)
+        name = posixpath.basename(path)
+        if isinstance(data, bytes):
+            nc_headers[path] = open_nc_header(name, data)
+        else:
+            nc_headers[path] = read_nc_header_from(data, name)
+    return PrefetchedGranule(
+        granule_root=archive.granule_root(granule_href, read_href_modifier, filesystem),
+        manifest_text=(
+            manifest.decode("utf-8") if isinstance(manifest, bytes) else manifest
+        ),
+        nc_headers=nc_headers,
+    )
+
+
+def _prefetch_granule(
+    read_policy: Optional[ReadPolicy],
+    block_cache: Optional[BlockCache],
+    *args: Any,
+) -> PrefetchedGranule:
+    with ExitStack() as stack:
+        if read_policy is not None:
+            stack.enter_context(use_read_policy(read_policy))
+        if block_cache is not None:
+            stack.enter_context(use_block_cache(block_cache))
+        return prefetch_granule(*args)
+
+
+def prefetch(
+    granule_hrefs: Iterable[str],
+    depth: int,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    nc_headers: bool = False,
+    probe: str = "grouped",
+    read_policy: Optional[ReadPolicy] = None,
+    block_cache: Optional[BlockCache] = None,
+) -> Generator[Tuple[str, Optional[PrefetchedGranule]], None, None]:
+    """Reads ahead the manifests of the next ``depth`` granules.
+
+    While the caller processes one granule, the manifests (and optionally
+    NetCDF headers) of the following ``depth`` granules are read on as many
+    I/O threads, so that reading and parsing overlap. At most ``depth``
+    granules are read ahead at any time, which bounds memory use.
+
+    Example:
+        >>> for href, prefetched in prefetch(hrefs, depth=8):
+        ...     item = create_item(href, prefetched=prefetched)
+
+    Args:
+        granule_hrefs (Iterable[str]): HREFs of the granules, consumed lazily.
+        depth (int): Number of granules read ahead.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through.
+        nc_headers (bool): Also read the NetCDF headers that item creation
+            needs. Defaults to False.
+        probe (str): How item creation will open NetCDF files, see
+            :class:`~stactools.sentinel3.metadata_links.MetadataLinks`, so
+            that exactly the headers it needs are read. Defaults to
+            ``"grouped"``.
+        read_policy (Optional[ReadPolicy]): The policy of the reads ahead.
+            Defaults to the policy of the calling thread.
+        block_cache (Optional[BlockCache]): Cache the reads ahead go through.
+            Defaults to the cache of the calling thread.
+
+    Returns:
+        Generator[Tuple[str, Optional[PrefetchedGranule]], None, None]: Every
+        granule HREF, in input order, with what was read ahead, or None if
+        reading ahead failed. Item creation then reads the granule itself,
+        and reports the error if it persists. Closing the generator stops
+        reading ahead.
+    """
+    if depth < 1:
+        raise ValueError(f"depth must be at least 1, got {depth}")
+    hrefs = iter(granule_hrefs)
+    pending: Deque[Tuple[str, "Future[PrefetchedGranule]"]] = deque()
+    pool = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="prefetch")
+
+    def submit() -> None:
+        href = next(hrefs, None)
+        if href is not None:
+            # Read ahead under the policy and cache of the calling thread,
+            # unless given others
+            future = pool.submit(
+                contextvars.copy_context().run,
+                _prefetch_granule,
+                read_policy,
+                block_cache,
+                href,
+                read_href_modifier,
+                filesystem,
+                nc_headers,
+                probe,
+            )
+            pending.append((href, future))
+
+    try:
+        for _ in range(depth):
+            submit()
+        while pending:
+            href, future = pending.popleft()
+            submit()
+            error = future.exception()
+            if error is not None:
+                logger.debug(f"Could not prefetch {href}: {error!r}")
+                yield href, None
+            else:
+                yield href, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
@@ -1,4 +1,3 @@
-import os
 from datetime import datetime
 from typing import Any, Dict, Optional
 
@@ -6,7 +5,7 @@ from pystac.utils import str_to_datetime
 from shapely.geometry import Polygon, mapping  # type: ignore
 from stactools.core.io.xml import XmlElement
 
-from stactools.sentinel3 import xml
+from stactools.sentinel3 import archive, xml
 from stactools.sentinel3.constants import MANIFEST_FILENAME
 from stactools.sentinel3.file_name import FileName
 
@@ -18,7 +17,7 @@ class ProductMetadataError(Exception):
 class ProductMetadata:
     def __init__(self, granule_href: str, manifest: XmlElement) -> None:
         self.granule_href = granule_href
-        self.manifest_href = os.path.join(granule_href, MANIFEST_FILENAME)
+        self.manifest_href = archive.join(granule_href, MANIFEST_FILENAME)
         self._root = manifest
 
         def _get_geometries():
@@ -61,8 +60,7 @@ class ProductMetadata:
     @property
     def product_id(self) -> str:
         # Parse the name from href as it doesn't exist in xml files
-        href = self.manifest_href
-        result = href.split("/")[-2]
+        result = archive.granule_name(self.granule_href)
         if result is None:
             raise ValueError(
                 "Cannot determine product ID using product metadata "
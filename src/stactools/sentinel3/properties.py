@@ -1,5 +1,6 @@
 import os
 from hashlib import md5
+from typing import Any, Dict
 
 from pystac.extensions.eo import EOExtension
 from pystac.extensions.sat import OrbitState, SatExtension
@@ -9,26 +10,32 @@ from stactools.sentinel3 import xml
 from stactools.sentinel3.file_extension_updated import FileExtensionUpdated
 
 
-def fill_sat_properties(sat_ext: SatExtension, manifest: XmlElement) -> None:
-    """Fills the properties for SAR.
-
-    Based on the sat Extension.py
+def sat_properties(manifest: XmlElement) -> Dict[str, Any]:
+    """Returns the sat Extension item properties.
 
     Args:
-        sat_ext (SatExtension): The extension to be populated.
         manifest(XmlElement): manifest file parsed to XmlElement.
+
+    Returns:
+        Dict[str, Any]: The ``sat:`` properties, in the order the extension
+        would set them.
     """
+    properties: Dict[str, Any] = {}
 
-    sat_ext.platform_international_designator = manifest.findall(
+    platform_international_designator = manifest.findall(
         ".//sentinel-safe:nssdcIdentifier"
     )[0].text
+    if platform_international_designator is not None:
+        properties["sat:platform_international_designator"] = (
+            platform_international_designator
+        )
 
     orbit_state = manifest.find_attr(
         "groundTrackDirection", ".//sentinel-safe:orbitNumber"
     )
-    sat_ext.orbit_state = OrbitState(orbit_state)
+    properties["sat:orbit_state"] = OrbitState(orbit_state).value
 
-    sat_ext.absolute_orbit = int(
+    properties["sat:absolute_orbit"] = int(
         xml.find_text(manifest, ".//sentinel-safe:orbitNumber")
     )
 
@@ -37,24 +44,46 @@ def fill_sat_properties(sat_ext: SatExtension, manifest: XmlElement) -> None:
     )
 
     if relative_orbit_num == 0:
-        sat_ext.relative_orbit = int(
+        properties["sat:relative_orbit"] = int(
             xml.find_text(
                 manifest, ".//sentinel-safe:relativeOrbitNumber[@type='stop']"
             )
         )
     else:
-        sat_ext.relative_orbit = relative_orbit_num
+        properties["sat:relative_orbit"] = relative_orbit_num
 
+    return properties
 
-def fill_eo_properties(eo_ext: EOExtension, manifest: XmlElement) -> None:
-    """Fills the properties for EO.
 
-    Based on the eo Extension.py
+def fill_sat_properties(sat_ext: SatExtension, manifest: XmlElement) -> None:
+    """Fills the properties for SAR.
+
+    Based on the sat Extension.py
 
     Args:
-        eo_ext (EOExtension): The extension to be populated.
+        sat_ext (SatExtension): The extension to be populated.
         manifest(XmlElement): manifest file parsed to XmlElement.
     """
+    properties = sat_properties(manifest)
+
+    sat_ext.platform_international_designator = properties.get(
+        "sat:platform_international_designator"
+    )
+    sat_ext.orbit_state = OrbitState(properties["sat:orbit_state"])
+    sat_ext.absolute_orbit = properties["sat:absolute_orbit"]
+    sat_ext.relative_orbit = properties["sat:relative_orbit"]
+
+
+def eo_properties(manifest: XmlElement) -> Dict[str, Any]:
+    """Returns the eo Extension item properties.
+
+    Args:
+        manifest(XmlElement): manifest file parsed to XmlElement.
+
+    Returns:
+        Dict[str, Any]: The ``eo:`` properties, empty for products without a
+        cloud cover estimate.
+    """
 
     def find_or_throw(attribute: str, xpath: str) -> str:
         value = manifest.find_attr(attribute, xpath)
@@ -62,21 +91,22 @@ def fill_eo_properties(eo_ext: EOExtension, manifest: XmlElement) -> None:
             raise RuntimeError(f"Value not in manifest: {xpath}@{attribute}")
         return value
 
+    properties: Dict[str, Any] = {}
     product_name = xml.find_text(manifest, ".//sentinel3:productName")
     if product_name.split("_")[1] == "OL" and product_name.split("_")[2] == "1":
         pass
     elif product_name.split("_")[1] == "OL" and product_name.split("_")[2] == "2":
-        eo_ext.cloud_cover = float(
+        properties["eo:cloud_cover"] = float(
             find_or_throw("percentage", ".//sentinel3:cloudyPixels")
         )
     elif product_name.split("_")[1] == "SL":
-        eo_ext.cloud_cover = float(
+        properties["eo:cloud_cover"] = float(
             find_or_throw("percentage", ".//sentinel3:cloudyPixels")
         )
     elif product_name.split("_")[1] == "SR" and product_name.split("_")[2] == "2":
         pass
     elif product_name.split("_")[1] == "SY" and product_name.split("_")[2] == "2":
-        eo_ext.cloud_cover = float(
+        properties["eo:cloud_cover"] = float(
             find_or_throw("percentage", ".//sentinel3:cloudyPixels")
         )
     else:
@@ -87,50 +117,101 @@ def fill_eo_properties(eo_ext: EOExtension, manifest: XmlElement) -> None:
             "naming convention, including "
             "ending in .SEN3"
         )
+    return properties
 
 
-def fill_file_properties(
-    granule_href: str,
-    asset_key: str,
-    file_ext: FileExtensionUpdated,
-    manifest: XmlElement,
-) -> None:
-    file_ext.checksum = manifest.findall(f".//dataObject[@ID='{asset_key}']//checksum")[
-        0
-    ].text
+def fill_eo_properties(eo_ext: EOExtension, manifest: XmlElement) -> None:
+    """Fills the properties for EO.
+
+    Based on the eo Extension.py
+
+    Args:
+        eo_ext (EOExtension): The extension to be populated.
+        manifest(XmlElement): manifest file parsed to XmlElement.
+    """
+    properties = eo_properties(manifest)
+    if "eo:cloud_cover" in properties:
+        eo_ext.cloud_cover = properties["eo:cloud_cover"]
+
+
+def file_properties(
+    granule_href: str, asset_key: str, manifest: XmlElement
+) -> Dict[str, Any]:
+    """Returns the file Extension asset fields for a manifest data object.
+
+    Args:
+        granule_href (str): The HREF to the granule.
+        asset_key (str): The ID of the data object in the manifest.
+        manifest(XmlElement): manifest file parsed to XmlElement.
+
+    Returns:
+        Dict[str, Any]: The ``file:checksum``, ``file:local_path`` and
+        ``file:size`` fields.
+    """
+    checksum = manifest.findall(f".//dataObject[@ID='{asset_key}']//checksum")[0].text
     manifest_file_location = str(
         manifest.find_attr("href", f".//dataObject[@ID='{asset_key}']//fileLocation")
     )
-    file_ext.local_path = "".join(
+    local_path = "".join(
         [granule_href.split("/")[-1], "/", manifest_file_location.replace("./", "")]
     )
     asset_size = manifest.find_attr(
         "size", f".//dataObject[@ID='{asset_key}']//byteStream"
     )
 
-    if file_ext.checksum is None:
+    if checksum is None:
         raise RuntimeError(
             f"Manifest contains no checksum! Checked location: "
             f"'.//dataObject[@ID='{asset_key}']//checksum'"
         )
-    if file_ext.local_path is None:
-        raise RuntimeError(
-            f"Manifest contains no file location data! Checked location: "
-            f"'.//dataObject[@ID='{asset_key}']//fileLocation'"
-        )
     if asset_size is None:
         raise RuntimeError(
             f"Manifest contains no size data! Checked location: "
             f"'.//dataObject[@ID='{asset_key}']//byteStream'"
         )
 
-    file_ext.size = int(asset_size)
+    return {
+        "file:checksum": checksum,
+        "file:local_path": local_path,
+        "file:size": int(asset_size),
+    }
+
+
+def fill_file_properties(
+    granule_href: str,
+    asset_key: str,
+    file_ext: FileExtensionUpdated,
+    manifest: XmlElement,
+) -> None:
+    properties = file_properties(granule_href, asset_key, manifest)
+    file_ext.checksum = properties["file:checksum"]
+    file_ext.local_path = properties["file:local_path"]
+    file_ext.size = properties["file:size"]
+
+
+def manifest_file_properties(manifest_href: str, manifest_text: str) -> Dict[str, Any]:
+    """Returns the file Extension asset fields for the manifest itself.
+
+    Args:
+        manifest_href (str): The HREF to the manifest.
+        manifest_text (str): The text of the manifest.
+
+    Returns:
+        Dict[str, Any]: The ``file:checksum``, ``file:local_path`` and
+        ``file:size`` fields.
+    """
+    manifest_text_encoded = manifest_text.encode(encoding="UTF-8")
+    return {
+        "file:checksum": md5(manifest_text_encoded).hexdigest(),
+        "file:local_path": os.sep.join(manifest_href.split("/")[-2:]),
+        "file:size": int(len(manifest_text_encoded)),
+    }
 
 
 def fill_manifest_file_properties(
     manifest_href: str, manifest_text: str, file_ext: FileExtensionUpdated
 ) -> None:
-    manifest_text_encoded = manifest_text.encode(encoding="UTF-8")
-    file_ext.checksum = md5(manifest_text_encoded).hexdigest()
-    file_ext.local_path = os.sep.join(manifest_href.split("/")[-2:])
-    file_ext.size = int(len(manifest_text_encoded))
+    properties = manifest_file_properties(manifest_href, manifest_text)
+    file_ext.checksum = properties["file:checksum"]
+    file_ext.local_path = properties["file:local_path"]
+    file_ext.size = properties["file:size"]
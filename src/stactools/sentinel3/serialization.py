@@ -0,0 +1,141 @@
+import json
+import math
+from typing import Any, Dict, NamedTuple, Union
+
+import fsspec  # type: ignore
+import pystac
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore
+
+
+class EncodedItem(NamedTuple):
+    """An item serialized to compact JSON, along with the few fields needed to
+    route it without decoding it again.
+
+    Encoded items are cheap to pickle, so they are what worker processes hand
+    back to the parent when creating items in bulk.
+    """
+
+    id: str
+    product_name: str
+    datetime: str
+    data: bytes
+
+
+def item_to_dict(
+    item: Union[pystac.Item, Dict[str, Any]], include_self_link: bool = True
+) -> Dict[str, Any]:
+    """Returns the dictionary representation of an item.
+
+    Dictionaries are passed through untouched, so callers that already hold
+    a flattened item skip pystac's ``to_dict`` entirely.
+
+    Args:
+        item (Union[pystac.Item, Dict[str, Any]]): The item or its dictionary.
+        include_self_link (bool): Whether to keep the item's self link when
+            converting a ``pystac.Item``. Defaults to True.
+
+    Returns:
+        Dict[str, Any]: The item dictionary.
+    """
+    if isinstance(item, pystac.Item):
+        return item.to_dict(include_self_link=include_self_link)
+    return item
+
+
+def dumps(data: Dict[str, Any], indent: bool = False) -> bytes:
+    """Serializes a JSON dictionary to UTF-8 encoded bytes.
+
+    Uses `orjson <https://github.com/ijl/orjson>`_ when it is installed, and
+    the standard library ``json`` module otherwise. Both produce documents
+    that decode to the same values: compact separators (or two space
+    indentation), non-ASCII characters left unescaped, keys in insertion
+    order, and NaN and infinite floats written as ``null``, since JSON has no
+    literal for them. The text of floats may differ between the two, e.g.
+    orjson writes ``8e-6`` where the standard library writes ``8e-06``, so
+    compare documents by value rather than byte for byte. Values that orjson
+    refuses to serialize (e.g. integers wider than 64 bits) fall back to the
+    standard library.
+
+    Args:
+        data (Dict[str, Any]): The dictionary to serialize.
+        indent (bool): Indent the output by two spaces, matching the layout of
+            ``pystac.Item.save_object``. Defaults to False.
+
+    Returns:
+        bytes: The serialized JSON document.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+        except orjson.JSONEncodeError:
+            pass
+    try:
+        text = _stdlib_dumps(data, indent)
+    except ValueError:
+        # Written as null, like orjson does
+        text = _stdlib_dumps(_finite(data), indent)
+    return text.encode("utf-8")
+
+
+def _stdlib_dumps(data: Any, indent: bool) -> str:
+    if indent:
+        return json.dumps(data, indent=2, ensure_ascii=False, allow_nan=False)
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, allow_nan=False)
+
+
+def _finite(value: Any) -> Any:
+    # Replaces NaN and infinite floats by None
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(v) for key, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def write_item(
+    item: Union[pystac.Item, Dict[str, Any]],
+    dest_href: str,
+    include_self_link: bool = True,
+) -> None:
+    """Writes an item as indented JSON, like ``pystac.Item.save_object``, but
+    through the fast serialization path.
+
+    Args:
+        item (Union[pystac.Item, Dict[str, Any]]): The item or its dictionary.
+        dest_href (str): Where to write the item. Any fsspec-compatible HREF.
+        include_self_link (bool): Whether to keep the item's self link when
+            converting a ``pystac.Item``. Defaults to True.
+    """
+    data = dumps(item_to_dict(item, include_self_link), indent=True)
+    with fsspec.open(dest_href, "wb", auto_mkdir=True) as f:
+        f.write(data)
+
+
+def encode_item(item: Union[pystac.Item, Dict[str, Any]]) -> EncodedItem:
+    """Serializes an item to compact JSON bytes.
+
+    The item's self link is dropped, matching items written to NDJSON.
+
+    Args:
+        item (Union[pystac.Item, Dict[str, Any]]): The item or its dictionary.
+
+    Returns:
+        EncodedItem: The serialized item.
+    """
+    if isinstance(item, pystac.Item):
+        data = item.to_dict(include_self_link=False, transform_hrefs=False)
+    else:
+        data = item
+    properties = data.get("properties", {})
+    return EncodedItem(
+        id=data["id"],
+        product_name=properties.get("s3:product_name") or "unknown",
+        datetime=properties.get("datetime") or properties.get("start_datetime") or "",
+        data=dumps(data),
+    )
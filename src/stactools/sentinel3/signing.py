@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from .filesystem import CHAIN_SEPARATOR, is_member, is_remote
+
+logger = logging.getLogger(__name__)
+
+# Tokens are renewed this many seconds before they expire, so that a token is
+# still valid when the read it signed reaches the server
+DEFAULT_REFRESH_MARGIN = 60.0
+
+# Tokens of the copies of each signer in this process. Worker processes
+# receive a new copy of the signer with every granule, and the copies share
+# their tokens through this. Entries are dropped with the last copy.
+_shared: "weakref.WeakValueDictionary[str, _SharedTokens]" = (
+    weakref.WeakValueDictionary()
+)
+_shared_lock = threading.Lock()
+
+
+class Token(NamedTuple):
+    """A token that grants read access to every file under a prefix."""
+
+    token: str
+    """Query string appended to HREFs, without the leading ``?``, e.g. an
+    Azure SAS token."""
+
+    expires: float
+    """POSIX time the token expires at."""
+
+
+class _SharedTokens:
+    # Tokens of the copies of one signer, with one lock per prefix so that a
+    # slow request for one prefix does not hold up signing for the others
+
+    def __init__(self, tokens: Optional[Dict[str, Token]] = None) -> None:
+        self.tokens: Dict[str, Token] = dict(tokens or {})
+        self.lock = threading.Lock()
+        self._prefix_locks: Dict[str, threading.Lock] = {}
+
+    def prefix_lock(self, prefix: str) -> threading.Lock:
+        with self.lock:
+            lock = self._prefix_locks.get(prefix)
+            if lock is None:
+                lock = self._prefix_locks[prefix] = threading.Lock()
+            return lock
+
+
+def container_prefix(href: str) -> str:
+    """Returns the storage container of an HREF, e.g.
+    ``https://account.blob.core.windows.net/container`` or ``s3://bucket``,
+    which is what most signing services issue tokens for.
+
+    Args:
+        href (str): A remote HREF.
+
+    Returns:
+        str: The scheme and host of the HREF, followed by the first path
+        component for HTTP(S) HREFs.
+    """
+    parts = urlsplit(href)
+    prefix = f"{parts.scheme}://{parts.netloc}"
+    if parts.scheme not in ("http", "https"):
+        # Object store URLs name the bucket or container as their host
+        return prefix
+    container = parts.path.lstrip("/").split("/", 1)[0]
+    return f"{prefix}/{container}"
+
+
+class TokenSigner:
+    """A read HREF modifier that signs HREFs with one token per prefix,
+    reused until shortly before it expires.
+
+    Signing services such as the Planetary Computer's issue tokens that are
+    valid for a whole storage container. Signing every HREF with its own
+    request would call the service once per file; this calls it once per
+    container and token lifetime, in every process. Local HREFs are returned
+    unchanged, and archive members are signed through their archive's HREF.
+
+    Example:
+        >>> def get_token(prefix: str) -> Token:
+        ...     response = requests.get(f"{TOKEN_SERVICE}/{prefix}").json()
+        ...     return Token(response["token"], parse(response["expiry"]))
+        >>> item = create_item(href, read_href_modifier=TokenSigner(get_token))
+    """
+
+    def __init__(
+        self,
+        get_token: Callable[[str], Token],
+        prefix: Callable[[str], str] = container_prefix,
+        refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+    ) -> None:
+        """
+        Args:
+            get_token (Callable[[str], Token]): Requests a token for a prefix.
+                Must be picklable when used with the process executor.
+            prefix (Callable[[str], str]): Returns the prefix a token is
+                requested for from an HREF. Defaults to
+                :func:`container_prefix`.
+            refresh_margin (float): Renew tokens this many seconds before they
+                expire. Defaults to 60.
+        """
+        self.get_token = get_token
+        self.prefix = prefix
+        self.refresh_margin = refresh_margin
+        self.requests = 0
+        self._id = uuid.uuid4().hex
+        self._shared = _SharedTokens()
+        with _shared_lock:
+            _shared[self._id] = self._shared
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        # Copies start with the tokens requested so far
+        state["_tokens"] = dict(state.pop("_shared").tokens)
+        state["requests"] = 0
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        tokens = state.pop("_tokens")
+        self.__dict__.update(state)
+        with _shared_lock:
+            shared = _shared.get(self._id)
+            if shared is None:
+                shared = _shared[self._id] = _SharedTokens(tokens)
+        self._shared = shared
+
+    def token(self, prefix: str) -> Token:
+        """Returns a valid token for a prefix, requesting one if needed.
+
+        Args:
+            prefix (str): The prefix.
+
+        Returns:
+            Token: The token.
+        """
+        shared = self._shared
+        token = shared.tokens.get(prefix)
+        if token is not None and not self._expiring(token):
+            return token
+        # Held while requesting, so that concurrent reads of the same prefix
+        # wait for one request rather than each sending their own
+        with shared.prefix_lock(prefix):
+            token = shared.tokens.get(prefix)
+            if token is None or self._expiring(token):
+                logger.debug(f"Requesting a token for {prefix}")
+                token = self.get_token(prefix)
+                shared.tokens[prefix] = token
+                with shared.lock:
+                    self.requests += 1
+        return token
+
+    def _expiring(self, token: Token) -> bool:
+        return token.expires - self.refresh_margin <= time.time()
+
+    def __call__(self, href: str) -> str:
+        if is_member(href):
+            member, target = href.split(CHAIN_SEPARATOR, 1)
+            return f"{member}{CHAIN_SEPARATOR}{self(target)}"
+        if not is_remote(href):
+            return href
+        token = self.token(self.prefix(href))
+        separator = "&" if "?" in href else "?"
+        return f"{href}{separator}{token.token}"
@@ -0,0 +1,179 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import fsspec  # type: ignore
+from fsspec.spec import AbstractBufferedFile  # type: ignore
+
+
+class ThrottlingError(ConnectionError):
+    """Raised by :class:`SimulatedObjectStore` in place of a request, like
+    the "503 Slow Down" responses of object stores. It is retried under a
+    :class:`~stactools.sentinel3.policy.ReadPolicy` with retries."""
+
+
+@dataclass
+class RequestStats:
+    """Counters of the requests made to a :class:`SimulatedObjectStore`."""
+
+    requests: int = 0
+    """Number of requests, including metadata requests and throttled ones."""
+
+    bytes: int = 0
+    """Number of bytes transferred."""
+
+    throttled: int = 0
+    """Number of requests that raised :class:`ThrottlingError`."""
+
+
+class SimulatedObjectStore(fsspec.AbstractFileSystem):  # type: ignore
+    """An fsspec filesystem that serves the files of another filesystem, by
+    default the local one, with the latency, bandwidth, and throttling of a
+    remote object store.
+
+    Every metadata request (stat and list) and every range read is one
+    request: it waits ``latency`` seconds, plus the transfer time at
+    ``bandwidth``, and is rejected with a :class:`ThrottlingError` with
+    probability ``throttle_rate``. Files are read with range requests of
+    ``block_size`` bytes, like ``s3fs`` and ``adlfs`` do. Requests are
+    counted in :attr:`stats`, so tests and benchmarks can measure how many
+    requests item creation makes without a cloud account.
+
+    The store is picklable: worker processes get a store with the same
+    settings and their own counters.
+
+    Example:
+        >>> store = SimulatedObjectStore(latency=0.05, bandwidth=50e6)
+        >>> item = create_item("/data/S3A_..._002.SEN3", filesystem=store)
+        >>> print(store.stats.requests)
+    """
+
+    protocol = "simulated"
+    cachable = False
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        bandwidth: Optional[float] = None,
+        throttle_rate: float = 0.0,
+        seed: Optional[int] = None,
+        block_size: int = 5 * 2**20,
+        target_protocol: str = "file",
+        target_options: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Args:
+            latency (float): Seconds every request waits before it is
+                answered. Defaults to 0.
+            bandwidth (Optional[float]): Transfer rate of every request in
+                bytes per second. Defaults to unlimited.
+            throttle_rate (float): Probability that a request is rejected
+                with a :class:`ThrottlingError`. Defaults to 0.
+            seed (Optional[int]): Seed of the throttling decisions, for
+                reproducible runs. Defaults to a random seed.
+            block_size (int): Size of the range requests that files are read
+                with. Defaults to 5 MiB.
+            target_protocol (str): Protocol of the filesystem whose files are
+                served. Defaults to "file".
+            target_options (Optional[Dict[str, Any]]): Options of that
+                filesystem.
+        """
+        if not 0 <= throttle_rate < 1:
+            raise ValueError(
+                f"throttle_rate must be at least 0 and below 1, got {throttle_rate}"
+            )
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.throttle_rate = throttle_rate
+        self.blocksize = block_size
+        self.target = fsspec.filesystem(target_protocol, **(target_options or {}))
+        self.stats = RequestStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _request(self, size: int = 0) -> None:
+        with self._lock:
+            self.stats.requests += 1
+            throttled = self._random.random() < self.throttle_rate
+            if throttled:
+                self.stats.throttled += 1
+            else:
+                self.stats.bytes += size
+        delay = self.latency
+        if self.bandwidth and not throttled:
+            delay += size / self.bandwidth
+        if delay > 0:
+            time.sleep(delay)
+        if throttled:
+            raise ThrottlingError("Simulated throttling, slow down")
+
+    def read_range(self, path: str, start: int, end: int) -> bytes:
+        """Reads bytes ``start`` to ``end`` of a file with one request.
+
+        Args:
+            path (str): The path of the file.
+            start (int): The offset of the first byte.
+            end (int): The offset after the last byte.
+
+        Returns:
+            bytes: The bytes.
+        """
+        data: bytes = self.target.cat_file(path, start, end)
+        self._request(len(data))
+        return data
+
+    def cat_file(
+        self,
+        path: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        **kwargs: Any,
+    ) -> bytes:
+        path = self._strip_protocol(path)
+        data: bytes = self.target.cat_file(path, start, end)
+        self._request(len(data))
+        return data
+
+    def info(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+        self._request()
+        info: Dict[str, Any] = self.target.info(self._strip_protocol(path))
+        return info
+
+    def ls(
+        self, path: str, detail: bool = True, **kwargs: Any
+    ) -> Union[List[str], List[Dict[str, Any]]]:
+        self._request()
+        listing: Union[List[str], List[Dict[str, Any]]] = self.target.ls(
+            self._strip_protocol(path), detail=detail
+        )
+        return listing
+
+    def _open(
+        self,
+        path: str,
+        mode: str = "rb",
+        block_size: Optional[int] = None,
+        autocommit: bool = True,
+        cache_options: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> "_SimulatedFile":
+        if mode != "rb":
+            raise NotImplementedError("The simulated object store is read only")
+        return _SimulatedFile(
+            self,
+            path,
+            mode,
+            block_size=block_size or self.blocksize,
+            cache_options=cache_options,
+            **kwargs,
+        )
+
+
+class _SimulatedFile(AbstractBufferedFile):  # type: ignore
+    def _fetch_range(self, start: int, end: int) -> bytes:
+        data: bytes = self.fs.read_range(self.path, start, end)
+        return data
@@ -1,31 +1,36 @@
 import logging
-import os
 import re
-from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import IO, Any, Dict, List, Mapping, Optional, Union
 
 import antimeridian
+import fsspec  # type: ignore
 import pystac
 import shapely.geometry
-from pystac.extensions.eo import EOExtension
-from pystac.extensions.sat import SatExtension
 from stactools.core.io import ReadHrefModifier
 
+from . import archive
 from .constants import (
-    MANIFEST_FILENAME,
+    PROCESSING_EXTENSION_SCHEMA,
     SENTINEL_CONSTELLATION,
-    SENTINEL_PROVIDER,
-    SPECIAL_ASSET_KEYS,
+    SOFTWARE_NAME,
 )
-from .file_extension_updated import FileExtensionUpdated
-from .metadata_links import MetadataLinks
+from .metadata_links import MetadataLinks, PrefetchedGranule
+from .prefetch import prefetched_from_bytes
 from .product_metadata import ProductMetadata
 from .properties import (
-    fill_eo_properties,
-    fill_file_properties,
-    fill_manifest_file_properties,
-    fill_sat_properties,
+    eo_properties,
+    file_properties,
+    manifest_file_properties,
+    sat_properties,
 )
+from .templates import (  # noqa: F401
+    get_item_template,
+    hz2ghz,
+    nano2micro,
+    sen3_to_kebab,
+)
+from .verify import ChecksumMismatchError
+from .verify import verify_checksums as verify_granule
 from .winding import get_winding
 
 logger = logging.getLogger(__name__)
@@ -59,36 +64,6 @@ def recursive_round(coordinates: List[Any], precision: int) -> List[Any]:
     return rounded
 
 
-def nano2micro(value: float) -> float:
-    """Converts nanometers to micrometers while handling floating
-    point arithmetic errors."""
-    return float(Decimal(str(value)) / Decimal("1000"))
-
-
-def hz2ghz(value: float) -> float:
-    """Converts hertz to gigahertz while handling floating point
-    arithmetic errors."""
-    return float(Decimal(str(value)) / Decimal("1000000000"))
-
-
-def sen3_to_kebab(asset_key: str) -> str:
-    """Converts asset_key to a clean kebab case"""
-    if asset_key in SPECIAL_ASSET_KEYS:
-        return SPECIAL_ASSET_KEYS[asset_key]
-
-    # purge Data suffix
-    asset_key = asset_key.replace("_Data", "").replace("Data", "", 1)
-
-    new_asset_key = ""
-    for first, second in zip(asset_key, asset_key[1:]):
-        new_asset_key += first.lower()
-        if first.islower() and second.isupper():
-            new_asset_key += "-"
-    new_asset_key += asset_key[-1].lower()
-    new_asset_key = new_asset_key.replace("_", "-")
-    return new_asset_key
-
-
 def sen3_to_snake(key: str) -> str:
     new_key = "".join("_" + char.lower() if char.isupper() else char for char in key)
     # strip "_pixels_percentages" to match eo:cloud_cover pattern
@@ -101,6 +76,30 @@ def sen3_to_snake(key: str) -> str:
     return new_key
 
 
+def software_version() -> str:
+    """Returns the version of this package, as recorded in
+    ``processing:software``."""
+    from . import __version__
+
+    return __version__
+
+
+def processing_lineage(skip_nc: bool = False, probe: str = "grouped") -> str:
+    """Returns the ``processing:lineage`` of items created with the given
+    options, which tells whether an existing item was created the same way.
+
+    Args:
+        skip_nc (bool): Whether NetCDF files were skipped.
+        probe (str): How NetCDF files were opened.
+
+    Returns:
+        str: A description of what the item was created from.
+    """
+    if skip_nc:
+        return "Created from the SAFE manifest, without reading NetCDF files"
+    return f"Created from the SAFE manifest and NetCDF headers (probe: {probe})"
+
+
 def product_type(source, datatype):
     source_to_name = {"OL": "olci", "SL": "slstr", "SR": "sral", "SY": "synergy"}
     return f"{source_to_name[source]}-{datatype.strip('_').lower()}"
@@ -156,6 +155,11 @@ def create_item(
     granule_href: str,
     skip_nc: bool = False,
     read_href_modifier: Optional[ReadHrefModifier] = None,
+    verify_checksums: bool = False,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    prefetched: Optional[PrefetchedGranule] = None,
+    probe: str = "grouped",
+    record_processing: bool = False,
 ) -> pystac.Item:
     """Create a STC Item from a Sentinel-3 scene.
 
@@ -168,23 +172,139 @@ def create_item(
         read_href_modifier: A function that takes an HREF and returns a modified HREF.
             This can be used to modify a HREF to make it readable, e.g. appending
             an Azure SAS token or creating a signed URL.
+        verify_checksums (bool): Verify every data file against the MD5 checksum
+            in the manifest before creating the item. NetCDF headers are then
+            read from the verified bytes, so no file is read twice. Defaults to
+            False.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A filesystem to read
+            through, shared between calls so that connections are reused, e.g.
+            from :func:`~stactools.sentinel3.filesystem.http_filesystem`.
+            Defaults to the filesystem fsspec infers from each HREF.
+        prefetched (Optional[PrefetchedGranule]): The manifest, and possibly
+            NetCDF headers, already read for this granule, e.g. by
+            :func:`~stactools.sentinel3.prefetch.prefetch`.
+        probe (str): How NetCDF files are opened: ``"all"`` opens each file,
+            ``"grouped"`` one file per group of channel files on the same
+            grid, and ``"strict"`` also checks a second file of each group.
+            ``"derived"`` takes resolutions from the manifest and band
+            constants where it can, and opens the other files as
+            ``"grouped"`` does. See
+            :class:`~stactools.sentinel3.metadata_links.MetadataLinks`.
+            Defaults to ``"grouped"``.
+        record_processing (bool): Record the package version and the options
+            above in ``processing:software`` and ``processing:lineage``
+            (processing extension), so that reprocessing can tell whether the
+            item is current, see
+            :func:`~stactools.sentinel3.incremental.is_item_current`.
+            Defaults to False.
 
     Returns:
         pystac.Item: An item representing the Sentinel-3 OLCI or SLSTR scene.
+
+    Raises:
+        ChecksumMismatchError: If ``verify_checksums`` is set and a data file
+            does not match its checksum.
     """
+    return pystac.Item.from_dict(
+        create_item_dict(
+            granule_href,
+            skip_nc,
+            read_href_modifier,
+            verify_checksums,
+            filesystem,
+            prefetched,
+            probe,
+            record_processing,
+        ),
+        migrate=False,
+        preserve_dict=False,
+    )
 
-    metalinks = MetadataLinks(granule_href, read_href_modifier)
 
-    product_metadata = ProductMetadata(granule_href, metalinks.manifest)
+def create_item_dict(
+    granule_href: str,
+    skip_nc: bool = False,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    verify_checksums: bool = False,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+    prefetched: Optional[PrefetchedGranule] = None,
+    probe: str = "grouped",
+    record_processing: bool = False,
+) -> Dict[str, Any]:
+    """Create the dictionary representation of a STAC Item from a Sentinel-3
+    scene.
+
+    The dictionary is assembled directly, without building ``pystac.Item``,
+    ``pystac.Asset`` or extension objects, and is identical to
+    ``create_item(...).to_dict()``. Use this when items are serialized
+    straight away, e.g. by a batch or streaming sink.
 
-    item = pystac.Item(
-        id=product_metadata.scene_id,
-        geometry=product_metadata.geometry,
-        bbox=product_metadata.bbox,
-        datetime=product_metadata.get_datetime,
-        properties={},
-        stac_extensions=["https://stac-extensions.github.io/file/v2.1.0/schema.json"],
+    Args:
+        granule_href (str): The HREF to the granule.
+            This is expected to be a path to a SEN3 archive.
+        skip_nc (bool): Skip parsing NetCDF data files. Since these are large, this saves
+            bandwidth when working over network, at the cost of metadata we can obtain
+            from them. Defaults to False.
+        read_href_modifier: A function that takes an HREF and returns a modified HREF.
+            This can be used to modify a HREF to make it readable, e.g. appending
+            an Azure SAS token or creating a signed URL.
+        verify_checksums (bool): Verify every data file against the MD5 checksum
+            in the manifest before creating the item. NetCDF headers are then
+            read from the verified bytes, so no file is read twice. Defaults to
+            False.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A filesystem to read
+            through, shared between calls so that connections are reused, e.g.
+            from :func:`~stactools.sentinel3.filesystem.http_filesystem`.
+            Defaults to the filesystem fsspec infers from each HREF.
+        prefetched (Optional[PrefetchedGranule]): The manifest, and possibly
+            NetCDF headers, already read for this granule, e.g. by
+            :func:`~stactools.sentinel3.prefetch.prefetch`.
+        probe (str): How NetCDF files are opened: ``"all"`` opens each file,
+            ``"grouped"`` one file per group of channel files on the same
+            grid, and ``"strict"`` also checks a second file of each group.
+            ``"derived"`` takes resolutions from the manifest and band
+            constants where it can, and opens the other files as
+            ``"grouped"`` does. See
+            :class:`~stactools.sentinel3.metadata_links.MetadataLinks`.
+            Defaults to ``"grouped"``.
+        record_processing (bool): Record the package version and the options
+            above in ``processing:software`` and ``processing:lineage``
+            (processing extension), so that reprocessing can tell whether the
+            item is current, see
+            :func:`~stactools.sentinel3.incremental.is_item_current`.
+            Defaults to False.
+
+    Returns:
+        Dict[str, Any]: A STAC Item dictionary representing the Sentinel-3 scene.
+
+    Raises:
+        ChecksumMismatchError: If ``verify_checksums`` is set and a data file
+            does not match its checksum.
+    """
+    nc_headers = None
+    if verify_checksums:
+        report = verify_granule(
+            granule_href,
+            read_href_modifier,
+            probe_nc=not skip_nc,
+            filesystem=filesystem,
+        )
+        if report.mismatches:
+            raise ChecksumMismatchError(granule_href, report.mismatches)
+        nc_headers = report.nc_headers
+
+    metalinks = MetadataLinks(
+        granule_href,
+        read_href_modifier,
+        nc_headers=nc_headers,
+        filesystem=filesystem,
+        prefetched=prefetched,
+        probe=probe,
     )
+
+    product_metadata = ProductMetadata(metalinks.granule_href, metalinks.manifest)
+
+    item_id = product_metadata.scene_id
     sen3naming = re.match(
         r"^.*/?(?P<mission>...)_(?P<source>[A-Z]{2})_(?P<level>[_012])_(?P<datatype>.{6})"
         r"_(?P<datastart>.{15})_(?P<datastop>.{15})_(?P<creation>.{15})"
@@ -192,137 +312,143 @@ def create_item(
         r"_(?P<relative_orbit>[0-9]{3})"
         r"_(?P<frame>[0-9]{4}))|.{17})_(?P<generating_centre>...)"
         r"_(?P<platform>[OFDR])_(?P<timeliness>[^_]+)_(?P<collection>[^\.]+)\.SEN3",
-        granule_href,
+        archive.granule_name(metalinks.granule_href),
     )
     if not sen3naming:
         raise ValueError(
             "Granule name does not match SEN3 naming convention(s)", granule_href
         )
 
+    # Everything static about the product type comes from its template
+    template = get_item_template(metalinks.manifest)
+
     # ---- Add Extensions ----
+    stac_extensions = list(template.stac_extensions)
+    properties: Dict[str, Any] = {}
+
     # sat
-    sat = SatExtension.ext(item, add_if_missing=True)
-    fill_sat_properties(sat, metalinks.manifest)
+    properties.update(sat_properties(metalinks.manifest))
 
     # eo
     if sen3naming.group("datatype") not in ("WAT___", "LAN___"):
-        eo = EOExtension.ext(item, add_if_missing=True)
-        fill_eo_properties(eo, metalinks.manifest)
+        properties.update(eo_properties(metalinks.manifest))
 
     # s3 properties
-    item.properties.update({**product_metadata.metadata_dict})
+    properties.update({**product_metadata.metadata_dict})
 
     # --Common metadata--
-    item.common_metadata.providers = [SENTINEL_PROVIDER]
-    item.common_metadata.platform = product_metadata.platform
-    item.common_metadata.constellation = SENTINEL_CONSTELLATION
+    # Providers should be supplied in the Collection, not the Item
+    properties.pop("providers", None)
+    properties["platform"] = product_metadata.platform
+    properties["constellation"] = SENTINEL_CONSTELLATION
 
-    if item.common_metadata.instruments == ["SYNERGY"]:
+    if properties.get("instruments") == ["SYNERGY"]:
         # "SYNERGY" is not a instrument
-        item.properties["instruments"] = ["OLCI", "SLSTR"]
+        properties["instruments"] = ["OLCI", "SLSTR"]
 
     # --Extended Sentinel3 metadata--
     # Add the processing timelessness to the properties
-    item.properties["s3:processing_timeliness"] = sen3naming["timeliness"]
+    properties["s3:processing_timeliness"] = sen3naming["timeliness"]
 
     # Add a user-friendly name
-    item.properties["s3:product_name"] = product_type(
+    properties["s3:product_name"] = product_type(
         *sen3naming.group("source", "datatype")
     )
-    # Providers should be supplied in the Collection, not the Item
-    item.properties.pop("providers", None)
 
     # start_datetime and end_datetime are incorrectly formatted
-    item.properties["start_datetime"] = pystac.utils.datetime_to_str(
-        pystac.utils.str_to_datetime(item.properties["start_datetime"])
+    properties["start_datetime"] = pystac.utils.datetime_to_str(
+        pystac.utils.str_to_datetime(properties["start_datetime"])
     )
-    item.properties["end_datetime"] = pystac.utils.datetime_to_str(
-        pystac.utils.str_to_datetime(item.properties["end_datetime"])
+    properties["end_datetime"] = pystac.utils.datetime_to_str(
+        pystac.utils.str_to_datetime(properties["end_datetime"])
     )
 
     # Remove s3:mode, which is always set to EO (Earth # Observation). It
     # offers no additional information.
-    item.properties.pop("s3:mode", None)
+    properties.pop("s3:mode", None)
 
     new_props = {}
-    for key, value in item.properties.items():
+    for key, value in properties.items():
         if key.startswith("s3:"):
             new_props[sen3_to_snake(key)] = value
         else:
             new_props[key] = value
-    item.properties = new_props
+    properties = new_props
 
     # Add assets to item
-    manifest_asset_key, manifest_asset = metalinks.create_manifest_asset()
-    item.add_asset(manifest_asset_key, manifest_asset)
-    manifest_href = os.path.join(granule_href, MANIFEST_FILENAME)
-    manifest_file = FileExtensionUpdated.ext(manifest_asset, add_if_missing=True)
-    fill_manifest_file_properties(manifest_href, metalinks.manifest_text, manifest_file)
+    assets: Dict[str, Dict[str, Any]] = {}
+    manifest_asset_key, manifest_asset = metalinks.create_manifest_asset_dict()
+    manifest_asset.update(
+        manifest_file_properties(metalinks.href, metalinks.manifest_text)
+    )
+    assets[manifest_asset_key] = manifest_asset
 
     # create band asset list
-    band_list, asset_identifier_list, asset_list = metalinks.create_band_asset(
+    _, asset_identifier_list, asset_list = metalinks.create_band_asset_dicts(
         metalinks.manifest, skip_nc
     )
 
-    band_list = [sen3_to_kebab(key) for key in band_list]
-
     # objects for bands
-    for band, identifier, asset in zip(band_list, asset_identifier_list, asset_list):
-        item.add_asset(band, asset)
-        file = FileExtensionUpdated.ext(asset, add_if_missing=True)
-        fill_file_properties(
-            metalinks.granule_href, identifier, file, metalinks.manifest
+    for identifier, asset in zip(asset_identifier_list, asset_list):
+        asset.update(
+            file_properties(metalinks.granule_href, identifier, metalinks.manifest)
         )
+        assets[template.asset_keys[identifier]] = asset
 
     # ---- ASSETS ----
     # pushing shape down to asset level
-    item_shape = item.properties.pop("s3:shape", None)
+    item_shape = properties.pop("s3:shape", None)
+
+    for asset_key, asset in assets.items():
+        # roles are always serialized last, with the radar altimetry bands
+        # right before them
+        roles = asset.pop("roles", None)
+        altimetry_bands = asset.pop("s3:altimetry_bands", None)
 
-    for asset_key, asset in item.assets.items():
         # remove local paths
-        asset.extra_fields.pop("file:local_path", None)
+        asset.pop("file:local_path", None)
+
+        # archive members are read through fsspec URLs that other clients
+        # cannot resolve
+        asset["href"] = archive.public_href(asset["href"])
 
         # ensure shape is set at asset level
-        asset_shape: Optional[List[Dict[str, int]]] = asset.extra_fields.get(
-            "s3:shape", None
-        )
+        asset_shape: Optional[List[Dict[str, int]]] = asset.get("s3:shape", None)
         s3shape: List[int] = []
         if asset_shape or item_shape and asset_key != "safe-manifest":
             s3shape = get_array_shape(asset_shape, item_shape)
         if len(s3shape) > 0:
-            asset.extra_fields["s3:shape"] = s3shape
+            asset["s3:shape"] = s3shape
 
         # Add a description to the safe_manifest asset
         if asset_key == "safe-manifest":
-            asset.description = "SAFE product manifest"
-
-        # correct eo:bands
-        if "eo:bands" in asset.extra_fields:
-            for band in asset.extra_fields["eo:bands"]:
-                band["center_wavelength"] = nano2micro(band["center_wavelength"])
-                band["full_width_half_max"] = nano2micro(band["band_width"])
-                band.pop("band_width")
-
-        # Tune up the radar altimetry bands. Radar altimetry is different
-        # enough than radar imagery that the existing SAR extension doesn't
-        # quite work (plus, the SAR extension doesn't have a band object).
-        # We'll use a band construct similar to eo:bands, but follow the
-        # naming and unit conventions in the SAR extension.
-        if "sral:bands" in asset.extra_fields:
-            asset.extra_fields["s3:altimetry_bands"] = asset.extra_fields.pop(
-                "sral:bands"
-            )
-            for band in asset.extra_fields["s3:altimetry_bands"]:
-                band["frequency_band"] = band.pop("name")
-                band["center_frequency"] = hz2ghz(band.pop("central_frequency"))
-                band["band_width"] = hz2ghz(band.pop("band_width_in_Hz"))
+            asset = {
+                "href": asset.pop("href"),
+                "type": asset.pop("type"),
+                "description": "SAFE product manifest",
+                **asset,
+            }
+            assets[asset_key] = asset
+
+        if altimetry_bands is not None:
+            asset["s3:altimetry_bands"] = altimetry_bands
+        if roles is not None:
+            asset["roles"] = roles
+
+    if record_processing:
+        # Unchanged items can be skipped when reprocessing the same way with
+        # the same version
+        stac_extensions.append(PROCESSING_EXTENSION_SCHEMA)
+        properties["processing:lineage"] = processing_lineage(skip_nc, probe)
+        properties["processing:software"] = {SOFTWARE_NAME: software_version()}
+    properties["datetime"] = pystac.utils.datetime_to_str(product_metadata.get_datetime)
 
     # ---- GEOMETRY ----
-    geometry_dict = item.geometry
+    geometry_dict = product_metadata.geometry
     assert isinstance(geometry_dict, dict)
     assert geometry_dict["type"] == "Polygon"
 
-    if item.properties["s3:product_name"] in [
+    if properties["s3:product_name"] in [
         "synergy-v10",
         "synergy-vg1",
     ]:
@@ -336,13 +462,13 @@ def create_item(
         geometry_dict["coordinates"] = [coords[::-1]]
     elif winding is None:
         logger.warning(
-            f"Could not determine winding order of polygon in Item: '{item.id}'"
+            f"Could not determine winding order of polygon in Item: '{item_id}'"
         )
 
     geometry = shapely.geometry.shape(geometry_dict)
 
     # slstr-lst strip geometries are incorrect, so we apply a hack
-    if item.properties["s3:product_name"] == "slstr-lst" and sen3naming.group(
+    if properties["s3:product_name"] == "slstr-lst" and sen3naming.group(
         "instance_id"
     ).endswith("_____"):
         geometry = antimeridian.fix_polygon(geometry, force_north_pole=True)
@@ -352,12 +478,78 @@ def create_item(
     if not geometry.is_valid:
         geometry = geometry.buffer(0)
 
-    item.bbox = recursive_round(list(geometry.bounds), precision=4)
+    bbox = recursive_round(list(geometry.bounds), precision=4)
     geometry_dict = shapely.geometry.mapping(geometry)
     assert isinstance(geometry_dict, dict)
     geometry_dict["coordinates"] = recursive_round(
         list(geometry_dict["coordinates"]), precision=4
     )
-    item.geometry = geometry_dict
 
-    return item
+    return {
+        "type": "Feature",
+        "stac_version": pystac.get_stac_version(),
+        "stac_extensions": stac_extensions,
+        "id": item_id,
+        "geometry": geometry_dict,
+        "bbox": bbox,
+        "properties": properties,
+        "links": [],
+        "assets": assets,
+    }
+
+
+def create_item_from_bytes(
+    granule_href: str,
+    manifest: Union[bytes, str],
+    nc_files: Optional[Mapping[str, Union[bytes, IO[bytes]]]] = None,
+    skip_nc: bool = False,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> pystac.Item:
+    """Create a STAC Item from a Sentinel-3 scene whose manifest, and
+    possibly NetCDF files, the caller has already read.
+
+    ``granule_href`` is only used for the asset HREFs, so callers can batch
+    and cache reads however suits their platform. Nothing is read for a
+    granule directory if ``nc_files`` holds every NetCDF file item creation
+    needs, or ``skip_nc`` is set; NetCDF files missing from ``nc_files`` are
+    read from ``granule_href``.
+
+    Example:
+        >>> item = create_item_from_bytes(
+        ...     "s3://bucket/S3A_..._002.SEN3",
+        ...     manifest_bytes,
+        ...     {"Oa01_radiance.nc": header_bytes},
+        ... )
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+            Only the central directory of a zip file is read.
+        manifest (Union[bytes, str]): The contents of ``xfdumanifest.xml``.
+        nc_files (Optional[Mapping[str, Union[bytes, IO[bytes]]]]): NetCDF
+            files by path relative to the granule directory, e.g.
+            ``"Oa01_radiance.nc"``, as bytes or binary file objects. Each
+            must hold the whole file, or enough of it for netCDF4 to open it.
+        skip_nc (bool): Skip parsing NetCDF data files. Defaults to False.
+        read_href_modifier: A function that takes an HREF and returns a modified HREF.
+            Used for the files that are still read.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A filesystem to read
+            the files that are still read through.
+
+    Returns:
+        pystac.Item: An item representing the Sentinel-3 scene.
+    """
+    prefetched = prefetched_from_bytes(
+        granule_href,
+        manifest,
+        None if skip_nc else nc_files,
+        read_href_modifier,
+        filesystem,
+    )
+    return create_item(
+        granule_href,
+        skip_nc,
+        read_href_modifier,
+        filesystem=filesystem,
+        prefetched=prefetched,
+    )
@@ -0,0 +1,390 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from pystac.extensions.eo import Band, EOExtension
+from pystac.extensions.sat import SatExtension
+from stactools.core.io.xml import XmlElement
+
+from . import constants, xml
+from .file_extension_updated import FileExtensionUpdated
+
+EO_BANDS = "eo:bands"
+ALTIMETRY_BANDS = "s3:altimetry_bands"
+
+
+def nano2micro(value: float) -> float:
+    """Converts nanometers to micrometers while handling floating
+    point arithmetic errors."""
+    return float(Decimal(str(value)) / Decimal("1000"))
+
+
+def hz2ghz(value: float) -> float:
+    """Converts hertz to gigahertz while handling floating point
+    arithmetic errors."""
+    return float(Decimal(str(value)) / Decimal("1000000000"))
+
+
+def sen3_to_kebab(asset_key: str) -> str:
+    """Converts asset_key to a clean kebab case"""
+    if asset_key in constants.SPECIAL_ASSET_KEYS:
+        return constants.SPECIAL_ASSET_KEYS[asset_key]
+
+    # purge Data suffix
+    asset_key = asset_key.replace("_Data", "").replace("Data", "", 1)
+
+    new_asset_key = ""
+    for first, second in zip(asset_key, asset_key[1:]):
+        new_asset_key += first.lower()
+        if first.islower() and second.isupper():
+            new_asset_key += "-"
+    new_asset_key += asset_key[-1].lower()
+    new_asset_key = new_asset_key.replace("_", "-")
+    return new_asset_key
+
+
+@dataclass(frozen=True)
+class AssetTemplate:
+    """The parts of a data asset that only depend on the product type.
+
+    Attributes:
+        identifier (str): ID of the manifest ``dataObject`` backing the asset.
+        key (str): The kebab-case asset key.
+        bands_key (str): Field holding the bands, ``eo:bands`` or
+            ``s3:altimetry_bands``.
+        bands (Tuple[Mapping[str, Any], ...]): The bands, already converted to
+            the units used on items.
+        description (Optional[str]): A fixed description, replacing the
+            manifest's ``textInfo``.
+        shape_key (Optional[str]): If set, the NetCDF dimensions are stored in
+            this field.
+        resolution (bool): Whether ``s3:spatial_resolution`` is read from the
+            NetCDF file.
+        nominal_resolution (Optional[int]): The resolution in metres shared
+            by all bands of the asset, from
+            ``constants.SLSTR_BANDS_TO_RESOLUTIONS``, used in place of the
+            NetCDF file's when probing with ``probe="derived"``.
+        strip_prefix (bool): Whether the leading ``./`` of the manifest file
+            location is removed when building the asset HREF.
+        optional (bool): Whether the data object may be absent from the
+            manifest, in which case the asset is skipped.
+        roles (Tuple[str, ...]): The asset roles.
+    """
+
+    identifier: str
+    key: str
+    bands_key: str = EO_BANDS
+    bands: Tuple[Mapping[str, Any], ...] = ()
+    description: Optional[str] = None
+    shape_key: Optional[str] = None
+    resolution: bool = True
+    nominal_resolution: Optional[int] = None
+    strip_prefix: bool = True
+    optional: bool = False
+    roles: Tuple[str, ...] = ("data",)
+
+    def clone_bands(self) -> List[Dict[str, Any]]:
+        """Returns a mutable copy of the bands."""
+        return [dict(band) for band in self.bands]
+
+
+@dataclass(frozen=True)
+class ItemTemplate:
+    """Everything static about the items of one product type.
+
+    Attributes:
+        product_type (str): The manifest ``productType``, e.g. ``OL_1_EFR___``.
+        stac_extensions (Tuple[str, ...]): Schema URIs of the extensions used.
+        assets (Tuple[AssetTemplate, ...]): The data assets, in item order.
+        asset_keys (Mapping[str, str]): Data object IDs mapped to asset keys.
+    """
+
+    product_type: str
+    stac_extensions: Tuple[str, ...]
+    assets: Tuple[AssetTemplate, ...]
+    asset_keys: Mapping[str, str]
+
+
+def get_item_template(manifest: XmlElement) -> ItemTemplate:
+    """Returns the item template for the product type of a manifest.
+
+    Templates are built on first use and cached for the life of the process.
+
+    Args:
+        manifest (XmlElement): manifest file parsed to XmlElement.
+
+    Returns:
+        ItemTemplate: The frozen template. Callers must copy any value they
+        intend to modify.
+    """
+    product_type = xml.find_text(manifest, ".//sentinel3:productType")
+    # Newer OLCI land baselines renamed the OGVI products to GIFAPAR
+    renamed_land_keys = (
+        any(_str in product_type for _str in ["_LFR_", "_LRR_"])
+        and len(manifest.findall(".//dataObject[@ID='ogviData']")) == 0
+    )
+    return _build_item_template(product_type, renamed_land_keys)
+
+
+@lru_cache(maxsize=None)
+def _build_item_template(product_type: str, renamed_land_keys: bool) -> ItemTemplate:
+    stac_extensions = [
+        FileExtensionUpdated.get_schema_uri(),
+        SatExtension.get_schema_uri(),
+    ]
+    if product_type[5:] not in ("WAT___", "LAN___"):
+        stac_extensions.append(EOExtension.get_schema_uri())
+    assets = tuple(_asset_templates(product_type, renamed_land_keys))
+    return ItemTemplate(
+        product_type=product_type,
+        stac_extensions=tuple(stac_extensions),
+        assets=assets,
+        asset_keys=MappingProxyType({a.identifier: a.key for a in assets}),
+    )
+
+
+def _eo_bands(
+    instrument_bands: Mapping[str, Band], band_keys: Sequence[str]
+) -> Tuple[Mapping[str, Any], ...]:
+    bands = []
+    for key in band_keys:
+        band = instrument_bands[key]
+        assert band.center_wavelength is not None
+        assert band.full_width_half_max is not None
+        bands.append(
+            MappingProxyType(
+                {
+                    "name": band.name,
+                    "description": band.description,
+                    "center_wavelength": nano2micro(band.center_wavelength),
+                    "full_width_half_max": nano2micro(band.full_width_half_max),
+                }
+            )
+        )
+    return tuple(bands)
+
+
+def _altimetry_bands(
+    instrument_bands: Mapping[str, Band], band_keys: Sequence[str]
+) -> Tuple[Mapping[str, Any], ...]:
+    # Radar altimetry is different enough than radar imagery that the existing
+    # SAR extension doesn't quite work (plus, the SAR extension doesn't have a
+    # band object). We'll use a band construct similar to eo:bands, but follow
+    # the naming and unit conventions in the SAR extension.
+    bands = []
+    for key in band_keys:
+        band = instrument_bands[key]
+        assert band.center_wavelength is not None
+        assert band.full_width_half_max is not None
+        bands.append(
+            MappingProxyType(
+                {
+                    "description": band.description,
+                    "frequency_band": band.name,
+                    "center_frequency": hz2ghz(band.center_wavelength),
+                    "band_width": hz2ghz(band.full_width_half_max),
+                }
+            )
+        )
+    return tuple(bands)
+
+
+def _slstr_resolution(band_keys: Sequence[str]) -> Optional[int]:
+    # Resolution shared by all the bands, or None if they differ
+    resolutions = {
+        resolution
+        for key in band_keys
+        for resolution in constants.SLSTR_BANDS_TO_RESOLUTIONS[key]
+    }
+    return resolutions.pop() if len(resolutions) == 1 else None
+
+
+def _asset(identifier: str, **kwargs: Any) -> AssetTemplate:
+    return AssetTemplate(identifier=identifier, key=sen3_to_kebab(identifier), **kwargs)
+
+
+def _asset_templates(product_type: str, renamed_land_keys: bool) -> List[AssetTemplate]:
+    product_type_category = product_type.split("_")[0]
+    assets: List[AssetTemplate] = []
+
+    if product_type_category == "SR":
+        instrument_bands = constants.SENTINEL_SRAL_BANDS
+        for asset_key in constants.SRAL_L2_LAN_WAT_KEYS:
+            band_key_list = list(instrument_bands)
+            if "reduced" in asset_key:
+                band_key_list = [band_key_list[1]]
+            assets.append(
+                _asset(
+                    asset_key,
+                    bands_key=ALTIMETRY_BANDS,
+                    bands=_altimetry_bands(instrument_bands, band_key_list),
+                    shape_key="shape",
+                    resolution=False,
+                    strip_prefix=False,
+                )
+            )
+    elif product_type_category == "SY":
+        instrument_bands = constants.SENTINEL_SYNERGY_BANDS
+        synergy_band_keys = list(instrument_bands)
+        if "_AOD_" in product_type:
+            assets.append(
+                _asset(
+                    "NTC_AOD_Data",
+                    bands=_eo_bands(instrument_bands, synergy_band_keys[26:32]),
+                    description="Global aerosol parameters",
+                    strip_prefix=False,
+                )
+            )
+        elif "_SYN_" in product_type:
+            for ind, asset_key in enumerate(constants.SYNERGY_SYN_ASSET_KEYS):
+                if ind < 26:
+                    bands = _eo_bands(instrument_bands, [synergy_band_keys[ind]])
+                elif ind == 26 or ind == 27:
+                    bands = _eo_bands(
+                        constants.SENTINEL_OLCI_SLSTR_BANDS,
+                        constants.SYNERGY_L2_A550_T550_BANDS,
+                    )
+                elif ind == 28:
+                    bands = _eo_bands(
+                        constants.SENTINEL_OLCI_SLSTR_BANDS,
+                        constants.SYNERGY_L2_SDR_BANDS,
+                    )
+                else:
+                    bands = ()
+                assets.append(_asset(asset_key, bands=bands, shape_key="s3:shape"))
+        elif any(product_id in product_type for product_id in ["_VG1_", "_V10_"]):
+            for ind, asset_key in enumerate(constants.SYNERGY_V10_VG1_ASSET_KEYS):
+                if ind < 4:
+                    bands = _eo_bands(instrument_bands, [synergy_band_keys[-4:][ind]])
+                elif ind == 4:
+                    bands = _eo_bands(instrument_bands, ["B2", "B3"])
+                else:
+                    bands = ()
+                assets.append(_asset(asset_key, bands=bands, shape_key="s3:shape"))
+        else:
+            for ind, asset_key in enumerate(constants.SYNERGY_VGP_ASSET_KEYS):
+                if ind < 4:
+                    bands = _eo_bands(instrument_bands, [synergy_band_keys[-4:][ind]])
+                else:
+                    bands = ()
+                assets.append(
+                    _asset(
+                        asset_key,
+                        bands=bands,
+                        shape_key="s3:shape",
+                        strip_prefix=False,
+                    )
+                )
+    elif product_type_category == "OL":
+        instrument_bands = constants.SENTINEL_OLCI_BANDS
+        if "OL_1_" in product_type:
+            for asset_key, band in zip(constants.OLCI_L1_ASSET_KEYS, instrument_bands):
+                assets.append(
+                    _asset(asset_key, bands=_eo_bands(instrument_bands, [band]))
+                )
+        elif any(_str in product_type for _str in ["_LFR_", "_LRR_"]):
+            if renamed_land_keys:
+                asset_key_list = constants.OLCI_L2_LAND_ASSET_KEYS_RENAMED
+            else:
+                asset_key_list = constants.OLCI_L2_LAND_ASSET_KEYS
+            for asset_key in asset_key_list:
+                if asset_key == "ogviData" or asset_key == "gifaparData":
+                    band_key_list = ["Oa03", "Oa10", "Oa17"]
+                elif asset_key == "otciData":
+                    band_key_list = ["Oa10", "Oa11", "Oa12"]
+                elif asset_key == "iwvData":
+                    band_key_list = ["Oa18", "Oa19"]
+                elif asset_key == "rcOgviData":
+                    band_key_list = ["Oa10", "Oa17"]
+                else:
+                    band_key_list = []
+                assets.append(
+                    _asset(asset_key, bands=_eo_bands(instrument_bands, band_key_list))
+                )
+        elif "_WFR_" in product_type:
+            # Iterate over both the legacy water keys and the Collection 4
+            # (v4.01) additions. Data objects that are not present in a
+            # particular manifest are skipped, so the same template handles
+            # both the old and new processing baselines.
+            for asset_key in (
+                constants.OLCI_L2_WATER_ASSET_KEYS
+                + constants.OLCI_L2_WATER_ASSET_KEYS_C4
+            ):
+                if asset_key in constants.OLCI_L2_WATER_BAND_KEYS:
+                    band_key_list = constants.OLCI_L2_WATER_BAND_KEYS[asset_key]
+                elif asset_key.startswith("Oa") and asset_key.endswith(
+                    "_reflectanceData"
+                ):
+                    band_key_list = [asset_key[:4]]
+                else:
+                    band_key_list = []
+                assets.append(
+                    _asset(
+                        asset_key,
+                        bands=_eo_bands(instrument_bands, band_key_list),
+                        optional=True,
+                    )
+                )
+        else:
+            raise RuntimeError(f"Unknown product type encountered: {product_type}")
+    elif product_type_category == "SL":
+        instrument_bands = constants.SENTINEL_SLSTR_BANDS
+        if "SL_1_" in product_type:
+            for asset_key, band in zip(constants.SLSTR_L1_ASSET_KEYS, instrument_bands):
+                assets.append(
+                    _asset(
+                        asset_key,
+                        bands=_eo_bands(instrument_bands, [band]),
+                        nominal_resolution=_slstr_resolution([band]),
+                    )
+                )
+        elif "_FRP_" in product_type:
+            for asset_key in constants.SLSTR_L2_FRP_KEYS:
+                if asset_key == "FRP_IN_Data":
+                    assets.append(
+                        _asset(
+                            asset_key,
+                            bands=_eo_bands(
+                                instrument_bands, ["S05", "S06", "S07", "S10"]
+                            ),
+                            nominal_resolution=_slstr_resolution(
+                                ["S05", "S06", "S07", "S10"]
+                            ),
+                            description="Fire Radiative Power (FRP) dataset",
+                        )
+                    )
+                else:
+                    assets.append(_asset(asset_key))
+        elif "_LST_" in product_type:
+            for asset_key in constants.SLSTR_L2_LST_KEYS:
+                if asset_key == "LST_IN_Data":
+                    assets.append(
+                        _asset(
+                            asset_key,
+                            bands=_eo_bands(instrument_bands, ["S08", "S09"]),
+                            nominal_resolution=_slstr_resolution(["S08", "S09"]),
+                            description="Land Surface Temperature (LST) values",
+                        )
+                    )
+                else:
+                    assets.append(_asset(asset_key))
+        elif "_WST_" in product_type:
+            assets.append(
+                _asset(
+                    "L2P_Data",
+                    bands=_eo_bands(instrument_bands, ["S07", "S08", "S09"]),
+                    nominal_resolution=_slstr_resolution(["S07", "S08", "S09"]),
+                    description=(
+                        "Data respects the Group for High Resolution "
+                        "Sea Surface Temperature (GHRSST) L2P specification"
+                    ),
+                )
+            )
+        else:
+            raise RuntimeError(f"Unknown product type encountered: {product_type}")
+    else:
+        raise RuntimeError(f"Unknown product type encountered: {product_type_category}")
+
+    return assets
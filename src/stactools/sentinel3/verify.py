@@ -0,0 +1,250 @@
+import contextvars
+import hashlib
+import logging
+import posixpath
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import fsspec  # type: ignore
+from lxml import etree  # type: ignore
+from stactools.core.io import ReadHrefModifier
+from stactools.core.io.xml import XmlElement
+
+from . import archive, policy
+from .completeness import DataObject, data_objects
+from .constants import MANIFEST_FILENAME
+from .filesystem import modify_href, open_file, read_text
+from .hdf5 import truncated_image
+from .metadata_links import HEADER_READ_SIZE, NcHeader, open_nc_header
+
+logger = logging.getLogger(__name__)
+
+# Files are hashed in chunks of this many bytes
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Most leading bytes of a file kept while hashing it to probe its header.
+# Files whose header is not within them are left to item creation to open.
+MAX_PROBE_SIZE = 64 * 1024 * 1024
+
+
+class FileChecksum(NamedTuple):
+    """The result of checking one file against its manifest checksum."""
+
+    data_object: DataObject
+    checksum: str
+    """The MD5 checksum of the file, as a hexadecimal string."""
+
+    size: int
+    """Number of bytes read."""
+
+    @property
+    def ok(self) -> bool:
+        return self.checksum == self.data_object.checksum
+
+
+class ChecksumMismatchError(Exception):
+    """Raised when a granule's files do not match the checksums in its
+    manifest."""
+
+    def __init__(self, granule_href: str, mismatches: List[FileChecksum]) -> None:
+        paths = ", ".join(result.data_object.path for result in mismatches)
+        super().__init__(f"Checksum mismatch in granule {granule_href}: {paths}")
+        self.granule_href = granule_href
+        self.mismatches = mismatches
+
+    def __reduce__(self) -> Tuple[object, ...]:
+        # Keep the error picklable, so it can be returned from worker processes
+        return type(self), (self.granule_href, self.mismatches)
+
+
+@dataclass
+class VerificationReport:
+    """The results of verifying a granule's files against its manifest."""
+
+    files: List[FileChecksum] = field(default_factory=list)
+    seconds: float = 0.0
+    """Wall clock time spent reading and hashing."""
+
+    nc_headers: Dict[str, NcHeader] = field(default_factory=dict)
+    """Headers of the NetCDF files, probed from the bytes that were hashed,
+    by path relative to the granule."""
+
+    @property
+    def mismatches(self) -> List[FileChecksum]:
+        return [result for result in self.files if not result.ok]
+
+    @property
+    def bytes(self) -> int:
+        return sum(result.size for result in self.files)
+
+    @property
+    def throughput(self) -> float:
+        """Bytes read per second."""
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+
+class _HeaderProbe:
+    # Reads a NetCDF-4 header from the leading bytes of a file as they are
+    # hashed, like read_nc_header_from, keeping no more of them than needed
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.header: Optional[NcHeader] = None
+        self._head = bytearray()
+        self._size = HEADER_READ_SIZE
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        if self._done:
+            return
+        self._head += chunk
+        while not self._done and len(self._head) >= self._size:
+            image = truncated_image(bytes(self._head[: self._size]))
+            if image is None:
+                # Not NetCDF-4
+                self._stop()
+                break
+            try:
+                self.header = open_nc_header(self.name, image)
+            except OSError:
+                self._size *= 4
+                if self._size > MAX_PROBE_SIZE:
+                    self._stop()
+            else:
+                self._stop()
+
+    def finish(self) -> Optional[NcHeader]:
+        # The file ended before a prefix held its header, so the whole file
+        # is in memory, and under MAX_PROBE_SIZE
+        if not self._done and self._head:
+            try:
+                self.header = open_nc_header(self.name, bytes(self._head))
+            except Exception as e:
+                logger.debug(f"Could not probe {self.name} from memory: {e}")
+            self._stop()
+        return self.header
+
+    def _stop(self) -> None:
+        self._done = True
+        self._head = bytearray()
+
+
+def _verify_file(
+    href: str,
+    data_object: DataObject,
+    chunk_size: int,
+    probe: bool,
+    filesystem: Optional[fsspec.AbstractFileSystem],
+) -> Tuple[FileChecksum, Optional[NcHeader]]:
+    def read() -> Tuple[str, int, Optional[NcHeader]]:
+        md5 = hashlib.md5()
+        size = 0
+        # Probe the header from the bytes as they are hashed, so the file is
+        # only read once
+        header_probe = _HeaderProbe(posixpath.basename(data_object.path))
+        with open_file(href, filesystem=filesystem, cached=False) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                md5.update(chunk)
+                size += len(chunk)
+                if probe:
+                    header_probe.feed(chunk)
+        header = header_probe.finish() if probe else None
+        return md5.hexdigest(), size, header
+
+    # Whole files are not hedged, a second request would double the transfer
+    checksum, size, header = policy.call(read, hedge=False, kind="file")
+    return FileChecksum(data_object, checksum, size), header
+
+
+def verify_checksums(
+    granule_href: str,
+    read_href_modifier: Optional[ReadHrefModifier] = None,
+    executor: str = "thread",
+    max_workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    probe_nc: bool = False,
+    filesystem: Optional[fsspec.AbstractFileSystem] = None,
+) -> VerificationReport:
+    """Verifies every data file of a granule against the MD5 checksum in its
+    manifest.
+
+    Files are streamed in chunks of ``chunk_size`` bytes through ``hashlib``
+    concurrently. ``hashlib`` releases the GIL, so threads suit network
+    storage; a process pool can be faster for local disks.
+
+    With ``probe_nc`` the header of each NetCDF file is read from its leading
+    bytes as they are hashed, keeping only as many of them as the header
+    needs, see :func:`~stactools.sentinel3.metadata_links.read_nc_header_from`. Passing
+    :attr:`VerificationReport.nc_headers` on to item creation means every file
+    is read only once.
+
+    Args:
+        granule_href (str): The HREF to the granule directory or zip file.
+        read_href_modifier (Optional[ReadHrefModifier]): An optional function to
+            modify read HREFs, e.g. to add a token to a URL.
+        executor (str): ``"thread"`` or ``"process"``. Defaults to ``"thread"``.
+        max_workers (Optional[int]): Number of files read at once. Defaults to
+            the number of CPUs.
+        chunk_size (int): Number of bytes read at a time. Defaults to 8 MiB.
+        probe_nc (bool): Read the headers of NetCDF files from the hashed
+            bytes. Defaults to False.
+        filesystem (Optional[fsspec.AbstractFileSystem]): A shared filesystem
+            to read through. Must be picklable with the process executor.
+
+    Returns:
+        VerificationReport: The checksum of every file, the time taken, and
+        the probed NetCDF headers.
+    """
+    root = archive.granule_root(granule_href, read_href_modifier, filesystem)
+    manifest_text = read_text(
+        archive.join(root, MANIFEST_FILENAME), read_href_modifier, filesystem
+    )
+    manifest = XmlElement(etree.fromstring(manifest_text.encode("utf-8")))
+    objects = [
+        data_object
+        for data_object in data_objects(manifest)
+        if data_object.checksum is not None
+    ]
+
+    pool: Executor
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+    elif executor == "process":
+        pool = ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"Unknown executor '{executor}'")
+
+    report = VerificationReport()
+    start = time.perf_counter()
+    with pool:
+        futures = []
+        for data_object in objects:
+            href = modify_href(archive.join(root, data_object.path), read_href_modifier)
+            probe = probe_nc and data_object.path.endswith(".nc")
+            verify = partial(
+                _verify_file, href, data_object, chunk_size, probe, filesystem
+            )
+            if executor == "thread":
+                # Threads read under the policy and block cache of the caller
+                futures.append(pool.submit(contextvars.copy_context().run, verify))
+            else:
+                futures.append(pool.submit(verify))
+        for future in futures:
+            result, header = future.result()
+            report.files.append(result)
+            if header is not None:
+                report.nc_headers[result.data_object.path] = header
+    report.seconds = time.perf_counter() - start
+
+    logger.info(
+        f"Verified {len(report.files)} files of {granule_href}: "
+        f"{report.bytes / 1e6:.1f} MB at {report.throughput / 1e6:.1f} MB/s, "
+        f"{len(report.mismatches)} mismatches"
+    )
+    return report
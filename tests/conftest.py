@@ -1,3 +1,4 @@
+import hashlib
 from pathlib import Path
 
 import pytest
@@ -13,3 +14,39 @@ def ol_1_efr() -> Path:
             "20211021T091357_0164_077_334_4320_LN1_O_NR_002.SEN3"
         )
     )
+
+
+SYNTHETIC_FILES = {
+    "Oa01_radiance.nc": b"radiance" * 1000,
+    "geo_coordinates.nc": b"coordinates" * 500,
+}
+
+
+@pytest.fixture
+def synthetic_granule(tmp_path: Path) -> Path:
+    """A granule whose manifest lists the sizes and checksums of its files.
+
+    The test data granules are trimmed, so their files do not match their
+    manifests.
+    """
+    granule = tmp_path / (
+        "S3A_OL_1_EFR____20211021T073827_20211021T074112_"
+        "20211021T091357_0164_077_334_4320_LN1_O_NR_002.SEN3"
+    )
+    granule.mkdir()
+    data_objects = []
+    for name, data in SYNTHETIC_FILES.items():
+        (granule / name).write_bytes(data)
+        data_objects.append(
+            f'<dataObject ID="{name.split(".")[0]}Data">'
+            f'<byteStream mimeType="application/x-netcdf" size="{len(data)}">'
+            f'<fileLocation locatorType="URL" href="./{name}"/>'
+            f'<checksum checksumName="MD5">{hashlib.md5(data).hexdigest()}</checksum>'
+            "</byteStream></dataObject>"
+        )
+    (granule / "xfdumanifest.xml").write_text(
+        "<xfdu:XFDU xmlns:xfdu='urn:ccsds:schema:xfdu:1'><dataObjectSection>"
+        + "".join(data_objects)
+        + "</dataObjectSection></xfdu:XFDU>"
+    )
+    return granule
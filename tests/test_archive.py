@@ -0,0 +1,56 @@
+import shutil
+from pathlib import Path
+
+from stactools.sentinel3 import archive
+from stactools.sentinel3.stac import create_item_dict
+from stactools.sentinel3.verify import verify_checksums
+
+
+def make_zip(granule: Path, tmp_path: Path) -> str:
+    return shutil.make_archive(
+        str(tmp_path / "archive" / granule.name),
+        "zip",
+        root_dir=granule.parent,
+        base_dir=granule.name,
+    )
+
+
+def test_join() -> None:
+    assert (
+        archive.join("data/G.SEN3", "Oa01_radiance.nc")
+        == "data/G.SEN3/Oa01_radiance.nc"
+    )
+    root = "zip://G.SEN3::s3://bucket/G.SEN3.zip"
+    assert archive.join(root, "./Oa01_radiance.nc") == (
+        "zip://G.SEN3/Oa01_radiance.nc::s3://bucket/G.SEN3.zip"
+    )
+    assert archive.join("zip://::G.SEN3.zip", "xfdumanifest.xml") == (
+        "zip://xfdumanifest.xml::G.SEN3.zip"
+    )
+    assert archive.granule_name(root) == "G.SEN3"
+    assert archive.granule_name("zip://::s3://bucket/G.SEN3.zip") == "G.SEN3"
+    assert archive.granule_name("data/G.SEN3/") == "G.SEN3"
+    assert archive.public_href(archive.join(root, "Oa01_radiance.nc")) == (
+        "s3://bucket/G.SEN3.zip#G.SEN3/Oa01_radiance.nc"
+    )
+    assert archive.public_href("data/G.SEN3/a.nc") == "data/G.SEN3/a.nc"
+
+
+def test_create_item_from_zip(ol_1_efr: Path, tmp_path: Path) -> None:
+    zipped = make_zip(ol_1_efr, tmp_path)
+    root = archive.granule_root(zipped)
+    assert root == f"zip://{ol_1_efr.name}::{zipped}"
+
+    expected = create_item_dict(str(ol_1_efr))
+    item = create_item_dict(zipped)
+    for key, asset in item["assets"].items():
+        href = asset.pop("href")
+        member = expected["assets"][key].pop("href")[len(str(ol_1_efr.parent)) + 1 :]
+        assert href == f"{zipped}#{member}"
+    assert item == expected
+
+
+def test_verify_zip(synthetic_granule: Path, tmp_path: Path) -> None:
+    report = verify_checksums(make_zip(synthetic_granule, tmp_path))
+    assert len(report.files) == 2
+    assert report.mismatches == []
@@ -0,0 +1,148 @@
+import asyncio
+import gzip
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+import pystac
+import pytest
+
+from stactools.sentinel3 import batch, stac
+from stactools.sentinel3.ndjson import NdjsonShardWriter
+from stactools.sentinel3.serialization import EncodedItem
+
+
+def test_create_items(ol_1_efr: Path, tmp_path: Path) -> None:
+    missing = str(tmp_path / "missing.SEN3")
+    results = dict(batch.create_items([str(ol_1_efr), missing], skip_nc=True))
+    assert isinstance(results[str(ol_1_efr)], pystac.Item)
+    assert isinstance(results[missing], Exception)
+
+
+def test_create_items_process_executor(ol_1_efr: Path) -> None:
+    results = list(
+        batch.create_items([str(ol_1_efr)], skip_nc=True, executor="process")
+    )
+    assert len(results) == 1
+    assert isinstance(results[0][1], pystac.Item)
+
+
+def test_create_items_bounds_in_flight(monkeypatch: pytest.MonkeyPatch) -> None:
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+    consumed = 0
+
+    def fake_create_item(href: str, *args: Any) -> str:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= 1
+        return href
+
+    def hrefs() -> Iterator[str]:
+        nonlocal consumed
+        for i in range(20):
+            consumed += 1
+            yield str(i)
+
+    monkeypatch.setattr(batch, "_create_item", fake_create_item)
+    results = batch.create_items(hrefs(), max_workers=4, max_in_flight=3)
+    next(results)
+    assert consumed <= 4
+    assert len(list(results)) == 19
+    assert consumed == 20
+    assert peak <= 3
+
+
+def test_create_items_rejects_unknown_executor() -> None:
+    with pytest.raises(ValueError):
+        next(batch.create_items(["foo"], executor="fork"))
+
+
+def test_create_items_async(ol_1_efr: Path, tmp_path: Path) -> None:
+    missing = str(tmp_path / "missing.SEN3")
+
+    async def run() -> dict:
+        return {
+            href: result
+            async for href, result in batch.create_items_async(
+                [str(ol_1_efr), missing], skip_nc=True, max_in_flight=1
+            )
+        }
+
+    results = asyncio.run(run())
+    assert isinstance(results[str(ol_1_efr)], pystac.Item)
+    assert isinstance(results[missing], Exception)
+
+
+def test_create_items_encoded(ol_1_efr: Path, tmp_path: Path) -> None:
+    ((href, encoded),) = batch.create_items(
+        [str(ol_1_efr)], skip_nc=True, executor="process", encode=True
+    )
+    assert isinstance(encoded, EncodedItem)
+    item = stac.create_item(str(ol_1_efr), skip_nc=True)
+    assert json.loads(encoded.data) == item.to_dict(include_self_link=False)
+    assert encoded.id == item.id
+    assert encoded.product_name == "olci-efr"
+
+    with NdjsonShardWriter(str(tmp_path)) as writer:
+        writer.write(encoded)
+    with gzip.open(tmp_path / "olci-efr_20211021_00000.ndjson.gz", "rb") as f:
+        assert f.read() == encoded.data + b"\n"
+
+
+def test_create_items_recycles_workers(ol_1_efr: Path) -> None:
+    stats = batch.BatchStats()
+    results = list(
+        batch.create_items(
+            [str(ol_1_efr)] * 3,
+            skip_nc=True,
+            executor="process",
+            max_workers=1,
+            max_in_flight=1,
+            stats=stats,
+            max_granules_per_worker=1,
+        )
+    )
+    assert all(isinstance(result, pystac.Item) for _, result in results)
+    assert stats.granules == 3
+    assert stats.failures == 0
+    assert stats.recycles == 3
+    assert len(stats.peak_rss) == 3
+    assert all(rss > 0 for rss in stats.peak_rss.values())
+
+
+@pytest.mark.skipif(batch.peak_rss() is None, reason="RSS cannot be measured")
+def test_workers_below_rss_watermark_are_kept(ol_1_efr: Path) -> None:
+    watermark = 384 * 1024 * 1024
+    # This process holds more than the watermark, which forked workers would
+    # count as their own
+    buffer = b"\xff" * (512 * 1024 * 1024)
+    stats = batch.BatchStats()
+    results = list(
+        batch.create_items(
+            [str(ol_1_efr)] * 3,
+            skip_nc=True,
+            executor="process",
+            max_workers=1,
+            max_in_flight=1,
+            stats=stats,
+            max_worker_rss=watermark,
+        )
+    )
+    assert all(isinstance(result, pystac.Item) for _, result in results)
+    assert stats.recycles == 0
+    (worker_rss,) = stats.peak_rss.values()
+    assert 0 < worker_rss < watermark
+    del buffer
+
+
+def test_recycling_requires_process_executor() -> None:
+    with pytest.raises(ValueError):
+        next(batch.create_items(["foo"], max_granules_per_worker=1))
@@ -0,0 +1,160 @@
+import pickle
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+import fsspec  # type: ignore
+import fsspec.implementations.memory  # type: ignore
+import pytest
+
+from stactools.sentinel3 import cache, filesystem
+from stactools.sentinel3.cache import BlockCache
+from stactools.sentinel3.stac import create_item_dict
+
+
+@pytest.fixture(autouse=True)
+def restore_cache() -> Iterator[None]:
+    yield
+    cache.set_block_cache(None)
+
+
+@pytest.fixture
+def remote(tmp_path: Path) -> Iterator[str]:
+    memory = fsspec.filesystem("memory")
+    root = f"/{tmp_path.name}"
+    yield f"memory://{root}"
+    memory.rm(root, recursive=True)
+
+
+def test_read_through_cache(remote: str, tmp_path: Path) -> None:
+    memory = fsspec.filesystem("memory")
+    href = f"{remote}/data.bin"
+    data = bytes(range(256)) * 40
+    memory.pipe(href, data)
+    block_cache = BlockCache(str(tmp_path / "cache"), block_size=1000)
+    cache.set_block_cache(block_cache)
+
+    assert filesystem.read_bytes(href) == data
+    assert block_cache.misses == 11
+    hits = block_cache.hits
+    with filesystem.open_file(href) as f:
+        f.seek(2500)
+        assert f.read(1000) == data[2500:3500]
+    assert (block_cache.hits - hits, block_cache.misses) == (2, 11)
+
+    # A file that changes size is read again
+    memory.pipe(href, data[:5000])
+    assert filesystem.read_bytes(href) == data[:5000]
+    assert block_cache.misses == 16
+
+    # Checksum verification reads the remote file, not the cache
+    with filesystem.open_file(href, cached=False) as f:
+        assert f.read() == data[:5000]
+    assert block_cache.misses == 16
+
+
+def test_unvalidated_cache(remote: str, tmp_path: Path) -> None:
+    memory = fsspec.filesystem("memory")
+    href = f"{remote}/data.bin"
+    memory.pipe(href, bytes(5000))
+    block_cache = BlockCache(str(tmp_path / "cache"), block_size=1000, validate=False)
+    with block_cache.open(memory, href, href) as f:
+        assert f.read() == bytes(5000)
+
+    class Counting(fsspec.implementations.memory.MemoryFileSystem):
+        infos = 0
+
+        def info(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+            Counting.infos += 1
+            return super().info(path, **kwargs)
+
+    with block_cache.open(Counting(), href, href) as f:
+        assert f.read() == bytes(5000)
+    # A warm cache makes no request
+    assert Counting.infos == 0
+    assert block_cache.hits == 5
+
+
+def test_unknown_size_is_not_cached(remote: str, tmp_path: Path) -> None:
+    memory = fsspec.filesystem("memory")
+    href = f"{remote}/data.bin"
+    memory.pipe(href, b"data")
+
+    class Unsized(fsspec.implementations.memory.MemoryFileSystem):
+        def info(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+            return {**super().info(path, **kwargs), "size": None}
+
+    block_cache = BlockCache(str(tmp_path / "cache"))
+    with block_cache.open(Unsized(), href, href) as f:
+        assert f.read() == b"data"
+    assert block_cache.size() == 0
+
+
+def test_read_member_through_cache(
+    remote: str, synthetic_granule: Path, tmp_path: Path
+) -> None:
+    zipped = shutil.make_archive(
+        str(tmp_path / "granule"), "zip", root_dir=synthetic_granule
+    )
+    href = f"{remote}/granule.zip"
+    fsspec.filesystem("memory").put(zipped, href)
+    block_cache = BlockCache(str(tmp_path / "cache"), block_size=512)
+    cache.set_block_cache(block_cache)
+    member = f"zip://geo_coordinates.nc::{href}"
+    assert filesystem.read_bytes(member) == b"coordinates" * 500
+    assert filesystem.read_bytes(member) == b"coordinates" * 500
+    assert block_cache.hits > 0
+
+
+def test_eviction(tmp_path: Path) -> None:
+    block_cache = BlockCache(str(tmp_path), max_size=1000, block_size=100)
+    for index in range(30):
+        block_cache.put("key", index, bytes(100))
+        assert block_cache.size() <= 1000 + 100
+    assert block_cache.get("key", 0) is None
+    assert block_cache.get("key", 29) == bytes(100)
+    block_cache.clear()
+    assert block_cache.size() == 0
+
+
+def test_settings() -> None:
+    with pytest.raises(ValueError):
+        BlockCache("unused", max_size=10, block_size=100)
+    with pytest.raises(ValueError):
+        BlockCache("unused", compression="gzip")
+
+
+def test_compression(tmp_path: Path) -> None:
+    pytest.importorskip("zstandard")
+    block_cache = BlockCache(str(tmp_path), compression="zstd")
+    block_cache.put("key", 0, bytes(10000))
+    assert block_cache.size() < 10000
+    assert block_cache.get("key", 0) == bytes(10000)
+
+
+def test_pickle(tmp_path: Path) -> None:
+    block_cache = BlockCache(str(tmp_path), max_size=4096, block_size=1024)
+    block_cache.get("key", 0)
+    copy = pickle.loads(pickle.dumps(block_cache))
+    assert (copy.directory, copy.max_size, copy.block_size) == (
+        str(tmp_path),
+        4096,
+        1024,
+    )
+    assert copy.misses == 0
+
+
+def test_create_item_through_cache(remote: str, ol_1_efr: Path, tmp_path: Path) -> None:
+    href = f"{remote}/{ol_1_efr.name}"
+    fsspec.filesystem("memory").put(str(ol_1_efr), href, recursive=True)
+    block_cache = BlockCache(str(tmp_path / "cache"))
+    cache.set_block_cache(block_cache)
+
+    expected = create_item_dict(str(ol_1_efr))
+    for _ in range(2):
+        item = create_item_dict(href)
+        for key, asset in item["assets"].items():
+            assert asset.pop("href").startswith(href)
+            expected["assets"][key].pop("href", None)
+        assert item == expected
+    assert block_cache.hits > 0
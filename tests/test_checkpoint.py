@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from stactools.sentinel3.checkpoint import CheckpointJournal, granule_key
+
+
+def test_granule_key() -> None:
+    assert granule_key("s3://bucket/prefix/S3A_foo.SEN3/") == "S3A_foo.SEN3"
+    assert granule_key("/data/S3A_foo.SEN3") == "S3A_foo.SEN3"
+
+
+def test_resume(tmp_path: Path) -> None:
+    path = str(tmp_path / "journal.sqlite")
+    with CheckpointJournal(path) as journal:
+        journal.record("/data/a.SEN3", "a", "out/a.json")
+        assert "/data/a.SEN3" in journal
+
+    with CheckpointJournal(path) as journal:
+        assert len(journal) == 1
+        assert "/mnt/a.SEN3/" in journal
+        assert journal.location("/data/a.SEN3") == "out/a.json"
+        assert list(journal.pending(["/data/a.SEN3", "/data/b.SEN3"])) == [
+            "/data/b.SEN3"
+        ]
+        with pytest.raises(KeyError):
+            journal.location("/data/b.SEN3")
+
+
+def test_commits_in_batches(tmp_path: Path) -> None:
+    path = str(tmp_path / "journal.sqlite")
+    journal = CheckpointJournal(path, batch_size=2)
+    for name in "abc":
+        journal.record(f"{name}.SEN3", name, f"{name}.json")
+
+    # Simulate a crash: only the first, full batch has been committed
+    assert len(CheckpointJournal(path)) == 2
+    journal.close()
+    assert len(CheckpointJournal(path)) == 3
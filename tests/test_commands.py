@@ -714,3 +714,72 @@ class CreateItemTest(CliTestCase):
 
                 [self.assertTrue(band in band_list) for band in bands_seen]
                 os.remove(f"{tmp_dir}/{item_id}.json")
+
+
+class CreateItemsTest(CliTestCase):
+    def create_subcommand_functions(self):
+        return [create_sentinel3_command]
+
+    def test_create_items_resumes_from_checkpoint(self):
+        granule_href = test_data.get_path(
+            "data-files/"
+            "S3A_OL_1_EFR____"
+            "20211021T073827_20211021T074112_20211021T091357_"
+            "0164_077_334_4320_LN1_O_NR_002.SEN3"
+        )
+        with TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, "granules.txt")
+            with open(src, "w") as f:
+                f.write(f"{granule_href}\n")
+            dst = os.path.join(tmp_dir, "items")
+            checkpoint = os.path.join(tmp_dir, "checkpoint.sqlite")
+            cmd = [
+                "sentinel3",
+                "create-items",
+                src,
+                dst,
+                "--skip_nc",
+                "True",
+                "--checkpoint",
+                checkpoint,
+                "--executor",
+                "thread",
+            ]
+
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+            self.assertEqual(len(os.listdir(dst)), 1)
+
+            os.remove(os.path.join(dst, os.listdir(dst)[0]))
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+            self.assertEqual(os.listdir(dst), [])
+
+
+class InventoryTest(CliTestCase):
+    def create_subcommand_functions(self):
+        return [create_sentinel3_command]
+
+    def test_build_and_query_inventory(self):
+        data_files = test_data.get_path("data-files")
+        hrefs = sorted(
+            os.path.join(data_files, name)
+            for name in os.listdir(data_files)
+            if name.endswith(".SEN3")
+        )
+        with TemporaryDirectory() as tmp_dir:
+            src = os.path.join(tmp_dir, "listing.txt")
+            with open(src, "w") as f:
+                f.write("\n".join(hrefs))
+            inventory = os.path.join(tmp_dir, "inventory.npz")
+
+            result = self.run_command(["sentinel3", "build-inventory", src, inventory])
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+
+            cmd = ["sentinel3", "query-inventory", inventory, "--mission", "S3B"]
+            result = self.run_command(cmd)
+            self.assertEqual(result.exit_code, 0, msg=result.output)
+            self.assertEqual(len(result.output.splitlines()), 5)
+
+            result = self.run_command(cmd + ["--part", "1", "2"])
+            self.assertEqual(len(result.output.splitlines()), 2)
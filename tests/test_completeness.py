@@ -0,0 +1,68 @@
+import pickle
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from stactools.sentinel3 import batch
+from stactools.sentinel3.completeness import (
+    IncompleteGranuleError,
+    assert_complete,
+    check_completeness,
+)
+
+
+def test_complete(synthetic_granule: Path) -> None:
+    report = check_completeness(str(synthetic_granule))
+    assert report.complete
+    assert str(report) == "complete"
+    assert_complete(str(synthetic_granule))
+
+
+def test_missing_and_truncated(synthetic_granule: Path) -> None:
+    (synthetic_granule / "Oa01_radiance.nc").unlink()
+    (synthetic_granule / "geo_coordinates.nc").write_bytes(b"short")
+    report = check_completeness(str(synthetic_granule))
+    assert [data_object.path for data_object in report.missing] == ["Oa01_radiance.nc"]
+    assert [(d.path, size) for d, size in report.wrong_size] == [
+        ("geo_coordinates.nc", 5)
+    ]
+
+    with pytest.raises(IncompleteGranuleError) as info:
+        assert_complete(str(synthetic_granule))
+    error = pickle.loads(pickle.dumps(info.value))
+    assert error.report == report
+
+
+def test_missing_manifest(synthetic_granule: Path) -> None:
+    (synthetic_granule / "xfdumanifest.xml").unlink()
+    report = check_completeness(str(synthetic_granule))
+    assert [data_object.path for data_object in report.missing] == ["xfdumanifest.xml"]
+
+
+def test_zip(synthetic_granule: Path, tmp_path: Path) -> None:
+    archive = shutil.make_archive(
+        str(tmp_path / synthetic_granule.name),
+        "zip",
+        root_dir=tmp_path,
+        base_dir=synthetic_granule.name,
+    )
+    assert check_completeness(archive).complete
+
+    truncated = tmp_path / "truncated.SEN3.zip"
+    with zipfile.ZipFile(archive) as source, zipfile.ZipFile(truncated, "w") as dest:
+        for info in source.infolist():
+            data = source.read(info)
+            if info.filename.endswith("Oa01_radiance.nc"):
+                data = data[:10]
+            dest.writestr(info, data)
+    assert not check_completeness(str(truncated)).complete
+
+
+def test_create_items_checks_completeness(synthetic_granule: Path) -> None:
+    (synthetic_granule / "Oa01_radiance.nc").write_bytes(b"short")
+    ((_, error),) = batch.create_items(
+        [str(synthetic_granule)], executor="process", check_complete=True
+    )
+    assert isinstance(error, IncompleteGranuleError)
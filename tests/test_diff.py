@@ -0,0 +1,50 @@
+import random
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from stactools.sentinel3 import stac
+from stactools.sentinel3.diff import external_sort, missing_granules, read_item_ids
+from stactools.sentinel3.file_name import FileName
+from stactools.sentinel3.ndjson import NdjsonShardWriter
+
+DATA_FILES = Path(__file__).parent / "data-files"
+
+
+@pytest.fixture
+def hrefs() -> List[str]:
+    return [str(path) for path in sorted(DATA_FILES.glob("*.SEN3"))]
+
+
+def scene_id(href: str) -> str:
+    return FileName.from_str(Path(href).name).scene_id
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_external_sort(chunk_size: int, tmp_path: Path) -> None:
+    lines = [f"line-{i}" for i in range(100)]
+    shuffled = random.Random(0).sample(lines, len(lines))
+    assert list(external_sort(shuffled, chunk_size, str(tmp_path))) == sorted(lines)
+
+
+@pytest.mark.parametrize("chunk_size", [2, 1000])
+def test_missing_granules(hrefs: List[str], chunk_size: int) -> None:
+    done = [scene_id(href) for href in hrefs[::2]] + ["S3A_unrelated"]
+    missing = list(missing_granules(reversed(hrefs), done, chunk_size=chunk_size))
+    assert sorted(missing) == sorted(hrefs[1::2])
+    assert [scene_id(href) for href in missing] == sorted(
+        scene_id(href) for href in missing
+    )
+
+
+def test_read_item_ids(ol_1_efr: Path, tmp_path: Path) -> None:
+    (tmp_path / "S3A_foo.json").write_text("{}")
+    (tmp_path / "README.md").write_text("")
+    item = stac.create_item(str(ol_1_efr), skip_nc=True)
+    with NdjsonShardWriter(str(tmp_path)) as writer:
+        writer.write(item)
+    assert sorted(read_item_ids(str(tmp_path))) == sorted(["S3A_foo", item.id])
+
+    with pytest.raises(ValueError):
+        list(read_item_ids(str(tmp_path / "README.md")))
@@ -0,0 +1,105 @@
+import pickle
+import shutil
+from pathlib import Path
+
+import fsspec  # type: ignore
+
+from stactools.sentinel3 import batch, filesystem
+from stactools.sentinel3.serialization import EncodedItem
+from stactools.sentinel3.stac import create_item_dict
+
+
+def test_modify_href() -> None:
+    def sign(href: str) -> str:
+        return f"{href}?token=abc"
+
+    assert filesystem.modify_href("zip://G.SEN3/a.nc::https://host/G.zip", sign) == (
+        "zip://G.SEN3/a.nc::https://host/G.zip?token=abc"
+    )
+    assert (
+        filesystem.modify_href("https://host/a.nc", sign)
+        == "https://host/a.nc?token=abc"
+    )
+
+
+def test_read_through_filesystem(synthetic_granule: Path, tmp_path: Path) -> None:
+    local = fsspec.filesystem("file")
+    href = str(synthetic_granule / "Oa01_radiance.nc")
+    assert filesystem.read_bytes(href, filesystem=local) == b"radiance" * 1000
+
+    zipped = shutil.make_archive(
+        str(tmp_path / "granule"), "zip", root_dir=synthetic_granule
+    )
+    member = f"zip://geo_coordinates.nc::{zipped}"
+    assert filesystem.read_bytes(member, filesystem=local) == b"coordinates" * 500
+    assert filesystem.read_bytes(member) == b"coordinates" * 500
+
+
+def test_local_path(tmp_path: Path) -> None:
+    local = fsspec.filesystem("file")
+    path = str(tmp_path / "a.nc")
+    assert filesystem.local_path(path) == path
+    assert filesystem.local_path(f"file://{path}") == path
+    assert filesystem.local_path(path, filesystem=local) == path
+    assert filesystem.local_path("https://host/a.nc") is None
+    assert filesystem.local_path(f"zip://a.nc::{tmp_path}/G.zip") is None
+    assert (
+        filesystem.local_path(path, filesystem=filesystem.InMemoryFileSystem()) is None
+    )
+
+
+def test_http_filesystem() -> None:
+    fs = filesystem.http_filesystem(max_connections=8, max_connections_per_host=2)
+    assert fs is filesystem.http_filesystem(
+        max_connections=8, max_connections_per_host=2
+    )
+    # Worker processes rebuild the pool from the same settings
+    copy = pickle.loads(pickle.dumps(fs))
+    assert copy.get_client.args == (8, 2, filesystem.DEFAULT_KEEPALIVE_TIMEOUT)
+
+
+def test_create_item_with_filesystem(ol_1_efr: Path) -> None:
+    local = fsspec.filesystem("file")
+    expected = create_item_dict(str(ol_1_efr))
+    assert create_item_dict(str(ol_1_efr), filesystem=local) == expected
+
+    ((_, result),) = batch.create_items(
+        [str(ol_1_efr)], executor="process", encode=True, filesystem=local
+    )
+    assert isinstance(result, EncodedItem)
+    assert result.id == expected["id"]
+
+
+def test_in_memory_filesystem() -> None:
+    fs = filesystem.InMemoryFileSystem({"/a/b.nc": b"data"})
+    assert fs.cat_file("memory://a/b.nc") == b"data"
+    # Instances do not share files
+    assert not filesystem.InMemoryFileSystem().exists("/a/b.nc")
+    assert not fsspec.filesystem("memory").exists("/a/b.nc")
+    copy = pickle.loads(pickle.dumps(fs))
+    assert copy.cat_file("/a/b.nc") == b"data"
+
+
+def test_create_item_in_memory(ol_1_efr: Path, tmp_path: Path) -> None:
+    expected = create_item_dict(str(ol_1_efr))
+    zipped = shutil.make_archive(
+        str(tmp_path / ol_1_efr.name),
+        "zip",
+        root_dir=ol_1_efr.parent,
+        base_dir=ol_1_efr.name,
+    )
+    for source in [str(ol_1_efr), zipped]:
+        memory, href = filesystem.load_granule(source)
+        assert href.startswith("memory://")
+        item = create_item_dict(href, filesystem=memory)
+        for key, asset in item["assets"].items():
+            assert asset.pop("href").startswith(href)
+        for asset in expected["assets"].values():
+            asset.pop("href", None)
+        assert item == expected
+
+    ((_, result),) = batch.create_items(
+        [href], executor="process", encode=True, filesystem=memory
+    )
+    assert isinstance(result, EncodedItem)
+    assert result.id == expected["id"]
@@ -0,0 +1,102 @@
+import io
+from pathlib import Path
+from typing import IO, Any, Dict, Optional
+
+import netCDF4 as nc
+import numpy as np
+import pytest
+
+from stactools.sentinel3 import hdf5, metadata_links
+from stactools.sentinel3.metadata_links import (
+    HEADER_READ_SIZE,
+    open_nc_header,
+    read_nc_header_from,
+)
+
+
+class CountingFile(io.BytesIO):
+    def __init__(self, data: bytes) -> None:
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def make_netcdf(
+    path: Path, late_attributes: bool = False, chunked: bool = True
+) -> bytes:
+    with nc.Dataset(path, "w") as ds:
+        ds.createDimension("columns", 500)
+        ds.createDimension("rows", 1000)
+        ds.resolution = "[ 270 294 ]"
+        # Sentinel-3 files store their variables compressed, and so chunked
+        options: Dict[str, Any] = (
+            {"zlib": True, "chunksizes": (100, 500)} if chunked else {}
+        )
+        variable = ds.createVariable("radiance", "u2", ("rows", "columns"), **options)
+        variable[:] = np.random.default_rng(0).integers(
+            0, 60000, (1000, 500), dtype="u2"
+        )
+    if late_attributes:
+        # Attributes added after the data are stored after it
+        with nc.Dataset(path, "a") as ds:
+            for i in range(20):
+                setattr(ds, f"comment_{i}", "comment" * 20)
+    return path.read_bytes()
+
+
+def test_lookup3(ol_1_efr: Path) -> None:
+    data = (ol_1_efr / "Oa01_radiance.nc").read_bytes()
+    # Version 2 superblocks end with their checksum
+    assert data[8] == 2
+    assert hdf5.lookup3(data[:44]) == int.from_bytes(data[44:48], "little")
+    assert hdf5.lookup3(b"") == 0xDEADBEEF
+
+
+def test_truncated_image(tmp_path: Path) -> None:
+    data = make_netcdf(tmp_path / "a.nc")
+    image = hdf5.truncated_image(data[:HEADER_READ_SIZE])
+    assert image is not None and len(image) == HEADER_READ_SIZE
+    assert open_nc_header("a.nc", image) == open_nc_header(str(tmp_path / "a.nc"))
+    assert hdf5.truncated_image(b"CDF\x01" + bytes(100)) is None
+    assert hdf5.truncated_image(data[:20]) is None
+
+
+@pytest.mark.parametrize(
+    "late_attributes,chunked,whole",
+    [(False, True, False), (True, True, True), (False, False, True)],
+)
+def test_read_nc_header_from(
+    tmp_path: Path, late_attributes: bool, chunked: bool, whole: bool
+) -> None:
+    data = make_netcdf(tmp_path / "a.nc", late_attributes, chunked)
+    assert len(data) > 10 * HEADER_READ_SIZE
+    f = CountingFile(data)
+    header = read_nc_header_from(f, "a.nc")
+    assert header == open_nc_header(str(tmp_path / "a.nc"))
+    # Files are read whole if attributes come after the data, or HDF5 checks
+    # that contiguous variables are within the file
+    assert f.bytes_read == (len(data) if whole else HEADER_READ_SIZE)
+
+
+def test_reads_member_headers(
+    ol_1_efr: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    from .test_archive import make_zip
+
+    calls = []
+
+    def counting(f: IO[bytes], name: str) -> metadata_links.NcHeader:
+        calls.append(name)
+        return read_nc_header_from(f, name)
+
+    monkeypatch.setattr(metadata_links, "read_nc_header_from", counting)
+    links = metadata_links.MetadataLinks(make_zip(ol_1_efr, tmp_path), probe="all")
+    headers = links.read_nc_headers()
+    assert len(calls) == len(headers) == 21
+    assert headers["Oa01_radiance.nc"] == open_nc_header(
+        str(ol_1_efr / "Oa01_radiance.nc")
+    )
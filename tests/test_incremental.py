@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pystac
+
+from stactools.sentinel3 import batch, stac
+from stactools.sentinel3.incremental import (
+    ItemDirectory,
+    Unchanged,
+    is_item_current,
+    manifest_checksum,
+)
+from stactools.sentinel3.serialization import write_item
+
+
+def test_is_item_current(ol_1_efr: Path) -> None:
+    assert (
+        "processing:software" not in stac.create_item_dict(str(ol_1_efr))["properties"]
+    )
+    item = stac.create_item_dict(str(ol_1_efr), skip_nc=True, record_processing=True)
+    checksum = manifest_checksum(str(ol_1_efr))
+    assert item["properties"]["processing:software"] == {
+        "stactools-sentinel3": stac.software_version()
+    }
+    assert is_item_current(item, checksum, skip_nc=True)
+    assert not is_item_current(item, "0" * 32, skip_nc=True)
+    # Items created with other options are stale
+    assert not is_item_current(item, checksum)
+    item = stac.create_item_dict(str(ol_1_efr), probe="derived", record_processing=True)
+    assert is_item_current(item, checksum, probe="derived")
+    assert not is_item_current(item, checksum)
+
+    item["properties"]["processing:software"]["stactools-sentinel3"] = "0.0.1"
+    assert not is_item_current(item, checksum, probe="derived")
+
+
+def test_skips_unchanged_items(ol_1_efr: Path, tmp_path: Path) -> None:
+    existing_items = ItemDirectory(str(tmp_path))
+    stats = batch.BatchStats()
+    ((_, item),) = batch.create_items(
+        [str(ol_1_efr)], skip_nc=True, existing_items=existing_items, stats=stats
+    )
+    assert isinstance(item, pystac.Item)
+    assert stats.unchanged == 0
+
+    write_item(item, existing_items.href(str(ol_1_efr)))
+    ((_, unchanged),) = batch.create_items(
+        [str(ol_1_efr)], skip_nc=True, existing_items=existing_items, stats=stats
+    )
+    assert unchanged == Unchanged(item.id)
+    assert stats.unchanged == 1
+
+    ((_, item),) = batch.create_items(
+        [str(ol_1_efr)], existing_items=existing_items, stats=stats
+    )
+    assert isinstance(item, pystac.Item)
+    assert stats.unchanged == 1
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pytest
+
+from stactools.sentinel3.file_name import FileName
+from stactools.sentinel3.inventory import GranuleInventory
+
+DATA_FILES = Path(__file__).parent / "data-files"
+
+
+@pytest.fixture
+def hrefs() -> List[str]:
+    return [str(path) for path in sorted(DATA_FILES.glob("*.SEN3"))]
+
+
+def test_file_name_fields() -> None:
+    file_name = FileName.from_str(
+        "S3A_OL_1_EFR____20211021T073827_20211021T074112_20211021T091357_"
+        "0164_077_334_4320_LN1_O_NR_002.SEN3"
+    )
+    assert file_name.product_type == "OL_1_EFR___"
+    assert file_name.duration == 164
+    assert file_name.cycle == 77
+    assert file_name.relative_orbit == 334
+    assert file_name.frame == 4320
+    assert file_name.platform == "O"
+    assert file_name.timeliness == "NR"
+    assert file_name.baseline == "002"
+
+    tile = FileName.from_str(
+        "S3A_SY_2_V10____20210911T000000_20210920T235959_20210928T121452_"
+        "EUROPE____________LN2_O_NT_002.SEN3"
+    )
+    assert tile.product_type == "SY_2_V10___"
+    assert tile.cycle is None
+    assert tile.relative_orbit is None
+    assert tile.timeliness == "NT"
+
+
+def test_from_hrefs(hrefs: List[str]) -> None:
+    inventory = GranuleInventory.from_hrefs(hrefs + ["not-a-granule.SEN3"])
+    assert len(inventory) == len(hrefs)
+    product_types = inventory["product_type"]
+    assert np.all(product_types[:-1] <= product_types[1:])
+    assert sorted(inventory.hrefs()) == hrefs
+
+
+def test_query(hrefs: List[str]) -> None:
+    inventory = GranuleInventory.from_hrefs(hrefs)
+
+    wfr = inventory.query(product_type="OL_2_WFR___")
+    assert len(wfr) == 2
+    assert len(wfr.query(start="2026-01-01")) == 1
+    assert len(inventory.query(product_type="OL_2_WFR___", end="2026-01-01")) == 1
+
+    since = datetime(2021, 10, 1, tzinfo=timezone.utc)
+    assert [
+        FileName.from_str(Path(h).name).product_type
+        for h in inventory.query(start=since, end="2021-11-01").hrefs()
+    ] == ["OL_1_EFR___", "SY_2_VG1___"]
+
+    (href,) = inventory.query(relative_orbit=334, cycle=77, frame=4320).hrefs()
+    assert "OL_1_EFR" in href
+    assert len(inventory.query(mission_id="S3B", timeliness="NT")) == 5
+    assert len(inventory.query(product_type="SL_2_XXX___")) == 0
+
+
+def test_save_load_and_split(hrefs: List[str], tmp_path: Path) -> None:
+    inventory = GranuleInventory.from_hrefs(hrefs)
+    path = str(tmp_path / "inventory.npz")
+    inventory.save(path)
+    loaded = GranuleInventory.load(path)
+    assert loaded.hrefs() == inventory.hrefs()
+
+    parts = loaded.split(3)
+    assert [len(part) for part in parts] == [5, 6, 6]
+    assert sum((part.hrefs() for part in parts), []) == inventory.hrefs()
+
+
+def test_deduplicate() -> None:
+    prefix = "S3A_OL_1_EFR____20211021T073827_20211021T074112_"
+    instance = "_0164_077_334_4320_LN1_O_"
+    nr = f"{prefix}20211021T091357{instance}NR_002.SEN3"
+    nt = f"{prefix}20211022T091357{instance}NT_002.SEN3"
+    st_new_baseline = f"{prefix}20211101T000000{instance}ST_003.SEN3"
+    nt_reprocessed = f"{prefix}20211023T091357{instance}NT_002.SEN3"
+    other_frame = nr.replace("_4320_", "_4500_")
+    inventory = GranuleInventory.from_hrefs(
+        [nr, nt, st_new_baseline, nt_reprocessed, other_frame]
+    )
+
+    assert sorted(inventory.deduplicate().hrefs()) == sorted(
+        [nt_reprocessed, other_frame]
+    )
+    assert sorted(
+        inventory.deduplicate(preference=("baseline", "timeliness")).hrefs()
+    ) == sorted([st_new_baseline, other_frame])
+    assert sorted(
+        inventory.deduplicate(timeliness=("NR",), preference=("timeliness",)).hrefs()
+    ) == sorted([nr, other_frame])
+
+    with pytest.raises(ValueError):
+        inventory.deduplicate(preference=("size",))
@@ -0,0 +1,101 @@
+import gzip
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from stactools.sentinel3 import stac
+from stactools.sentinel3.ndjson import NdjsonShardWriter, shard_key
+
+
+def make_item(item_id: str, product_name: str, datetime: str) -> Dict[str, Any]:
+    return {
+        "type": "Feature",
+        "id": item_id,
+        "properties": {"s3:product_name": product_name, "datetime": datetime},
+    }
+
+
+def test_rotates_by_item_count(tmp_path: Path) -> None:
+    with NdjsonShardWriter(str(tmp_path), max_items=2) as writer:
+        for i in range(5):
+            writer.write(make_item(f"item-{i}", "olci-efr", "2021-10-21T07:39:39Z"))
+        writer.write(make_item("other", "slstr-rbt", "2021-10-22T00:00:00Z"))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "olci-efr_20211021_00000.ndjson.gz",
+        "olci-efr_20211021_00001.ndjson.gz",
+        "olci-efr_20211021_00002.ndjson.gz",
+        "slstr-rbt_20211022_00000.ndjson.gz",
+    ]
+    with gzip.open(tmp_path / "olci-efr_20211021_00001.ndjson.gz", "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == ["item-2", "item-3"]
+
+
+def test_continues_after_existing_shards(tmp_path: Path) -> None:
+    for run in range(2):
+        with NdjsonShardWriter(str(tmp_path), max_items=2) as writer:
+            for i in range(3):
+                writer.write(
+                    make_item(f"run-{run}-{i}", "olci-efr", "2021-10-21T07:39:39Z")
+                )
+    # A shard left behind by an interrupted run is not overwritten either
+    (tmp_path / "olci-efr_20211021_00004.ndjson.gz.part").touch()
+    with NdjsonShardWriter(str(tmp_path)) as writer:
+        writer.write(make_item("run-2", "olci-efr", "2021-10-21T07:39:39Z"))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "olci-efr_20211021_00000.ndjson.gz",
+        "olci-efr_20211021_00001.ndjson.gz",
+        "olci-efr_20211021_00002.ndjson.gz",
+        "olci-efr_20211021_00003.ndjson.gz",
+        "olci-efr_20211021_00004.ndjson.gz.part",
+        "olci-efr_20211021_00005.ndjson.gz",
+    ]
+    with gzip.open(tmp_path / "olci-efr_20211021_00000.ndjson.gz", "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == ["run-0-0", "run-0-1"]
+
+
+def test_bad_items_do_not_stop_the_writer(tmp_path: Path) -> None:
+    with NdjsonShardWriter(str(tmp_path)) as writer:
+        writer.write(make_item("first", "olci-efr", "2021-10-21T07:39:39Z"))
+        with pytest.raises(ValueError):
+            writer.write({"id": "no-datetime", "properties": {}})
+        item = make_item("unserializable", "olci-efr", "2021-10-21T07:39:39Z")
+        item["properties"]["value"] = object()
+        writer.write(item)
+        writer.write(make_item("last", "olci-efr", "2021-10-21T07:39:39Z"))
+    ((item_id, error),) = writer.errors
+    assert item_id == "unserializable"
+    assert isinstance(error, TypeError)
+    with gzip.open(tmp_path / "olci-efr_20211021_00000.ndjson.gz", "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == ["first", "last"]
+
+
+def test_rotates_by_bytes(tmp_path: Path) -> None:
+    writer = NdjsonShardWriter(str(tmp_path), max_bytes=1)
+    for i in range(3):
+        writer.write(make_item(f"item-{i}", "olci-efr", "2021-10-21T07:39:39Z"))
+    shards = writer.close()
+    assert len(shards) == 3
+
+
+def test_writes_pystac_items(tmp_path: Path, ol_1_efr: Path) -> None:
+    item = stac.create_item(str(ol_1_efr), skip_nc=True)
+    with NdjsonShardWriter(str(tmp_path)) as writer:
+        writer.write(item)
+    with gzip.open(tmp_path / "olci-efr_20211021_00000.ndjson.gz", "rt") as f:
+        lines = f.readlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["id"] == item.id
+
+
+def test_shard_key_requires_datetime() -> None:
+    with pytest.raises(ValueError):
+        shard_key({"id": "foo", "properties": {}})
+
+
+def test_unknown_compression(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        NdjsonShardWriter(str(tmp_path), compression="bz2")
@@ -0,0 +1,181 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator, List
+
+import pytest
+
+from stactools.sentinel3 import batch, cache, policy
+from stactools.sentinel3.cache import BlockCache
+from stactools.sentinel3.policy import ReadPolicy
+
+
+@pytest.fixture(autouse=True)
+def restore_policy() -> Iterator[None]:
+    previous = policy.get_read_policy()
+    yield
+    policy.set_read_policy(previous)
+
+
+def test_retries() -> None:
+    policy.set_read_policy(ReadPolicy(retries=3, backoff=0.001))
+    remaining = [2]
+
+    def read() -> str:
+        if remaining[0]:
+            remaining[0] -= 1
+            raise ConnectionResetError("throttled")
+        return "data"
+
+    before = policy.thread_read_stats()
+    assert policy.call(read) == "data"
+    stats = policy.thread_read_stats() - before
+    assert (stats.reads, stats.retries, stats.failures) == (1, 2, 0)
+
+
+def test_permanent_errors_are_not_retried() -> None:
+    policy.set_read_policy(ReadPolicy(retries=3, backoff=0.001))
+    attempts = []
+
+    def read() -> str:
+        attempts.append(1)
+        raise FileNotFoundError("missing")
+
+    before = policy.thread_read_stats()
+    with pytest.raises(FileNotFoundError):
+        policy.call(read)
+    assert len(attempts) == 1
+    assert (policy.thread_read_stats() - before).failures == 1
+
+
+def test_gives_up() -> None:
+    policy.set_read_policy(ReadPolicy(retries=1, backoff=0.001))
+
+    def read() -> str:
+        raise TimeoutError()
+
+    with pytest.raises(TimeoutError):
+        policy.call(read)
+
+
+def test_backoff_is_bounded() -> None:
+    read_policy = ReadPolicy(backoff=1, max_backoff=3)
+    assert all(0 <= read_policy.delay(attempt) <= 3 for attempt in range(10))
+    with pytest.raises(ValueError):
+        ReadPolicy(hedge_percentile=100)
+
+
+def test_hedge_wins() -> None:
+    policy.set_read_policy(ReadPolicy(hedge_after=0.01))
+    calls = []
+
+    def read() -> int:
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return 1
+        return 2
+
+    before = policy.thread_read_stats()
+    assert policy.call(read) == 2
+    stats = policy.thread_read_stats() - before
+    assert (stats.hedges, stats.hedge_wins) == (1, 1)
+
+    # Reads that complete in time are not hedged
+    assert policy.call(lambda: 3) == 3
+    assert (policy.thread_read_stats() - before).hedges == 1
+
+
+def test_create_items_reports_reads(ol_1_efr: Path) -> None:
+    stats = batch.BatchStats()
+    ((_, item),) = batch.create_items(
+        [str(ol_1_efr)],
+        executor="process",
+        encode=True,
+        stats=stats,
+        read_policy=ReadPolicy(retries=2),
+    )
+    assert not isinstance(item, Exception)
+    assert stats.reads.reads > 0
+    assert stats.reads.failures == 0
+
+
+def test_first_attempt_is_not_queued(monkeypatch: pytest.MonkeyPatch) -> None:
+    policy.set_read_policy(ReadPolicy(hedge_after=0.5))
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(policy, "_hedge_pool", pool)
+    # Another read holds the only hedge thread
+    busy = pool.submit(time.sleep, 1)
+    start = time.perf_counter()
+    assert policy.call(lambda: 1) == 1
+    assert time.perf_counter() - start < 0.5
+    busy.result()
+    pool.shutdown()
+
+
+def test_hedge_percentile_per_kind(monkeypatch: pytest.MonkeyPatch) -> None:
+    read_policy = ReadPolicy(hedge_percentile=50, hedge_min_samples=2)
+    monkeypatch.setattr(policy, "_latencies", {})
+    policy._record_latency("file", 2.0)
+    policy._record_latency("file", 3.0)
+    policy._record_latency("listing", 0.1)
+    assert policy._hedge_delay(read_policy, "file") == 3.0
+    # Too few listings to use their percentile
+    assert policy._hedge_delay(read_policy, "listing") is None
+    policy._record_latency("listing", 0.2)
+    assert policy._hedge_delay(read_policy, "listing") == 0.2
+
+
+def test_use_read_policy_applies_to_hedges() -> None:
+    read_policy = ReadPolicy(hedge_after=0.01)
+    seen: List[ReadPolicy] = []
+
+    def read() -> int:
+        seen.append(policy.get_read_policy())
+        if len(seen) == 1:
+            time.sleep(0.2)
+        return len(seen)
+
+    with policy.use_read_policy(read_policy):
+        assert policy.get_read_policy() is read_policy
+        assert policy.call(read) == 2
+    assert seen == [read_policy, read_policy]
+    assert policy.get_read_policy() == ReadPolicy()
+
+
+def test_create_items_does_not_leak_globals(ol_1_efr: Path, tmp_path: Path) -> None:
+    block_cache = BlockCache(str(tmp_path / "cache"))
+    ((_, item),) = batch.create_items(
+        [str(ol_1_efr)],
+        executor="thread",
+        read_policy=ReadPolicy(retries=2),
+        block_cache=block_cache,
+    )
+    assert not isinstance(item, Exception)
+    assert policy.get_read_policy() == ReadPolicy()
+    assert cache.get_block_cache() is None
+
+
+def test_first_attempts_are_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    policy.set_read_policy(ReadPolicy(hedge_after=5))
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(policy, "_first_pool", pool)
+    lock = threading.Lock()
+    running = [0]
+    most = [0]
+
+    def read() -> int:
+        with lock:
+            running[0] += 1
+            most[0] = max(most[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return 1
+
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        results = list(callers.map(lambda _: policy.call(read), range(8)))
+    assert results == [1] * 8
+    assert most[0] == 2
+    pool.shutdown()
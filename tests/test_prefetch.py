@@ -0,0 +1,122 @@
+import io
+import threading
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, TypeVar, Union
+
+import pytest
+
+from stactools.sentinel3 import batch, policy, prefetch
+from stactools.sentinel3.metadata_links import MetadataLinks
+from stactools.sentinel3.policy import ReadPolicy
+from stactools.sentinel3.stac import create_item_dict, create_item_from_bytes
+
+T = TypeVar("T")
+
+
+def test_prefetch_order(synthetic_granule: Path, tmp_path: Path) -> None:
+    hrefs = [str(synthetic_granule), str(tmp_path / "missing"), str(synthetic_granule)]
+    results = list(prefetch.prefetch(hrefs, depth=2))
+    assert [href for href, _ in results] == hrefs
+    assert results[0][1] is not None
+    assert "dataObjectSection" in results[0][1].manifest_text
+    assert results[0][1].nc_headers == {}
+    # A granule that cannot be read ahead is left to item creation
+    assert results[1][1] is None
+    with pytest.raises(ValueError):
+        next(prefetch.prefetch(hrefs, depth=0))
+
+
+def test_prefetch_depth(synthetic_granule: Path) -> None:
+    started: List[int] = []
+    lock = threading.Lock()
+
+    def hrefs():
+        for i in range(10):
+            with lock:
+                started.append(i)
+            yield str(synthetic_granule)
+
+    results = prefetch.prefetch(hrefs(), depth=3)
+    next(results)
+    # The first granule, and the three after it, have been requested
+    assert len(started) == 4
+    results.close()
+
+
+def test_create_item_with_prefetched(ol_1_efr: Path) -> None:
+    prefetched = prefetch.prefetch_granule(str(ol_1_efr), nc_headers=True)
+    assert prefetched.nc_headers
+    assert create_item_dict(str(ol_1_efr), prefetched=prefetched) == create_item_dict(
+        str(ol_1_efr)
+    )
+
+
+@pytest.mark.parametrize("probe,headers", [("all", 21), ("derived", 0)])
+def test_prefetch_probe(ol_1_efr: Path, probe: str, headers: int) -> None:
+    ((_, prefetched),) = prefetch.prefetch(
+        [str(ol_1_efr)], depth=1, nc_headers=True, probe=probe
+    )
+    assert prefetched is not None
+    # Exactly the headers that item creation with the same probe needs
+    assert len(prefetched.nc_headers) == headers
+    links = MetadataLinks(str(ol_1_efr), prefetched=prefetched, probe=probe)
+    assert links.read_nc_headers() == prefetched.nc_headers
+
+
+def test_create_items_prefetch(ol_1_efr: Path) -> None:
+    stats = batch.BatchStats()
+    results = list(
+        batch.create_items(
+            [str(ol_1_efr)] * 3,
+            executor="process",
+            encode=True,
+            stats=stats,
+            prefetch_depth=2,
+            prefetch_nc=True,
+        )
+    )
+    assert len(results) == 3
+    assert not any(isinstance(item, Exception) for _, item in results)
+    assert stats.failures == 0
+
+
+def test_create_item_from_bytes(ol_1_efr: Path, tmp_path: Path) -> None:
+    needed = prefetch.prefetch_granule(str(ol_1_efr), nc_headers=True).nc_headers
+    nc_files: Dict[str, Union[bytes, IO[bytes]]] = {
+        path: (ol_1_efr / path).read_bytes() for path in needed
+    }
+    # File objects are accepted too
+    path = next(iter(nc_files))
+    nc_files[path] = io.BytesIO(nc_files[path])  # type: ignore
+
+    # Nothing is read from the granule HREF
+    href = str(tmp_path / ol_1_efr.name)
+    item = create_item_from_bytes(
+        href, (ol_1_efr / "xfdumanifest.xml").read_bytes(), nc_files
+    ).to_dict()
+    expected = create_item_dict(str(ol_1_efr))
+    for key, asset in item["assets"].items():
+        assert asset.pop("href").startswith(href)
+        expected["assets"][key].pop("href")
+    assert item == expected
+
+
+def test_prefetch_read_policy(synthetic_granule: Path) -> None:
+    read_policy = ReadPolicy(retries=1)
+    seen: List[ReadPolicy] = []
+    call = policy.call
+
+    def recording(read: Callable[[], T], **kwargs: Any) -> T:
+        seen.append(policy.get_read_policy())
+        return call(read, **kwargs)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(policy, "call", recording)
+        results = list(
+            prefetch.prefetch(
+                [str(synthetic_granule)], depth=1, read_policy=read_policy
+            )
+        )
+    assert results[0][1] is not None
+    assert seen and all(p is read_policy for p in seen)
+    assert policy.get_read_policy() == ReadPolicy()
@@ -0,0 +1,46 @@
+import json
+import math
+from pathlib import Path
+
+import pystac
+import pytest
+
+from stactools.sentinel3 import serialization
+
+EXAMPLES = sorted((Path(__file__).parents[1] / "examples").glob("*.json"))
+
+
+@pytest.mark.parametrize("path", EXAMPLES, ids=lambda p: p.stem)
+@pytest.mark.parametrize("indent", [False, True])
+def test_fast_and_stdlib_paths_agree(
+    path: Path, indent: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    data = json.loads(path.read_text())
+    fast = serialization.dumps(data, indent=indent)
+    monkeypatch.setattr(serialization, "orjson", None)
+    stdlib = serialization.dumps(data, indent=indent)
+    assert json.loads(fast) == json.loads(stdlib) == data
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf])
+def test_non_finite_floats(value: float, monkeypatch: pytest.MonkeyPatch) -> None:
+    data = {"nodata": value, "values": [1.5, value], "nested": {"scale": value}}
+    expected = b'{"nodata":null,"values":[1.5,null],"nested":{"scale":null}}'
+    assert serialization.dumps(data) == expected
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.dumps(data) == expected
+
+
+def test_write_item_matches_save_object(tmp_path: Path) -> None:
+    item = pystac.Item.from_file(str(EXAMPLES[0]))
+    item.set_self_href(str(tmp_path / "pystac.json"))
+    item.save_object()
+    serialization.write_item(item, str(tmp_path / "fast.json"))
+    assert json.loads((tmp_path / "fast.json").read_text()) == json.loads(
+        (tmp_path / "pystac.json").read_text()
+    )
+
+
+def test_item_to_dict_passes_dicts_through() -> None:
+    data = {"id": "foo"}
+    assert serialization.item_to_dict(data) is data
@@ -0,0 +1,99 @@
+import gc
+import pickle
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from stactools.sentinel3 import signing
+from stactools.sentinel3.signing import Token, TokenSigner, container_prefix
+from stactools.sentinel3.stac import create_item_dict
+
+ACCOUNT = "https://account.blob.core.windows.net"
+
+
+def get_token(prefix: str) -> Token:
+    return Token(f"sig={prefix.rsplit('/', 1)[1]}", time.time() + 3600)
+
+
+def test_container_prefix() -> None:
+    assert container_prefix(f"{ACCOUNT}/c/a/b.nc") == f"{ACCOUNT}/c"
+    assert container_prefix("s3://bucket/a/b.nc") == "s3://bucket"
+
+
+def test_token_signer() -> None:
+    signer = TokenSigner(get_token)
+    assert signer(f"{ACCOUNT}/c/a.nc") == f"{ACCOUNT}/c/a.nc?sig=c"
+    assert signer(f"{ACCOUNT}/c/b.nc?x=1") == f"{ACCOUNT}/c/b.nc?x=1&sig=c"
+    assert signer(f"{ACCOUNT}/d/a.nc") == f"{ACCOUNT}/d/a.nc?sig=d"
+    assert signer(f"zip://G.SEN3/a.nc::{ACCOUNT}/c/G.zip") == (
+        f"zip://G.SEN3/a.nc::{ACCOUNT}/c/G.zip?sig=c"
+    )
+    assert signer("/local/a.nc") == "/local/a.nc"
+    # One request per container
+    assert signer.requests == 2
+
+    # Copies sent to worker processes share their tokens
+    copy = pickle.loads(pickle.dumps(signer))
+    assert copy(f"{ACCOUNT}/c/a.nc") == f"{ACCOUNT}/c/a.nc?sig=c"
+    assert copy(f"{ACCOUNT}/e/a.nc") == f"{ACCOUNT}/e/a.nc?sig=e"
+    assert copy.requests == 1
+    assert pickle.loads(pickle.dumps(signer))._shared is signer._shared
+
+
+def test_shared_tokens_are_released() -> None:
+    signer = TokenSigner(get_token)
+    key = signer._id
+    copy = pickle.loads(pickle.dumps(signer))
+    del signer
+    assert signing._shared[key] is copy._shared
+    del copy
+    gc.collect()
+    assert key not in signing._shared
+
+
+def test_prefixes_are_signed_concurrently() -> None:
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(prefix: str) -> Token:
+        if prefix.endswith("/slow"):
+            started.set()
+            release.wait(5)
+        return get_token(prefix)
+
+    signer = TokenSigner(slow)
+    thread = threading.Thread(target=signer, args=(f"{ACCOUNT}/slow/a.nc",))
+    thread.start()
+    assert started.wait(5)
+    # Not held up by the pending request for the other container
+    assert signer(f"{ACCOUNT}/c/a.nc") == f"{ACCOUNT}/c/a.nc?sig=c"
+    release.set()
+    thread.join()
+    assert signer.requests == 2
+
+
+def test_token_refresh() -> None:
+    tokens = iter(["sig=1", "sig=2"])
+
+    def expiring(prefix: str) -> Token:
+        return Token(next(tokens), time.time() + 30)
+
+    signer = TokenSigner(expiring, refresh_margin=60)
+    assert signer(f"{ACCOUNT}/c/a.nc").endswith("sig=1")
+    # Tokens that expire within the margin are renewed
+    assert signer(f"{ACCOUNT}/c/a.nc").endswith("sig=2")
+
+
+def test_modifier_applies_to_every_read(ol_1_efr: Path) -> None:
+    hrefs: List[str] = []
+
+    def modifier(href: str) -> str:
+        hrefs.append(href)
+        return href
+
+    item = create_item_dict(str(ol_1_efr), read_href_modifier=modifier)
+    read = {Path(href).name for href in hrefs}
+    assert "xfdumanifest.xml" in read
+    assert "Oa01_radiance.nc" in read
+    assert item == create_item_dict(str(ol_1_efr))
@@ -0,0 +1,62 @@
+import pickle
+import time
+from pathlib import Path
+
+import pytest
+
+from stactools.sentinel3 import filesystem, policy
+from stactools.sentinel3.policy import ReadPolicy
+from stactools.sentinel3.simulation import SimulatedObjectStore, ThrottlingError
+from stactools.sentinel3.stac import create_item_dict
+
+
+def test_create_item(ol_1_efr: Path) -> None:
+    store = SimulatedObjectStore()
+    assert create_item_dict(str(ol_1_efr), filesystem=store) == create_item_dict(
+        str(ol_1_efr)
+    )
+    assert store.stats.requests > 0
+    assert store.stats.bytes > 0
+    assert store.stats.throttled == 0
+
+
+def test_range_requests(synthetic_granule: Path) -> None:
+    store = SimulatedObjectStore(block_size=1000)
+    with store.open(str(synthetic_granule / "Oa01_radiance.nc")) as f:
+        f.seek(4000)
+        assert f.read(100) == b"radiance" * 12 + b"radi"
+    # One stat request, and one range request of the bytes read plus a block
+    # read ahead
+    assert (store.stats.requests, store.stats.bytes) == (2, 1100)
+
+
+def test_latency_and_bandwidth(synthetic_granule: Path) -> None:
+    store = SimulatedObjectStore(latency=0.02, bandwidth=100_000)
+    start = time.perf_counter()
+    assert store.cat_file(str(synthetic_granule / "Oa01_radiance.nc")) == (
+        b"radiance" * 1000
+    )
+    # 20 ms of latency and 80 ms to transfer 8000 bytes
+    assert time.perf_counter() - start >= 0.1
+
+    copy = pickle.loads(pickle.dumps(store))
+    assert (copy.latency, copy.bandwidth) == (0.02, 100_000)
+    assert copy.stats.requests == 0
+
+
+def test_throttling(synthetic_granule: Path) -> None:
+    href = str(synthetic_granule / "Oa01_radiance.nc")
+    with pytest.raises(ValueError):
+        SimulatedObjectStore(throttle_rate=1)
+    store = SimulatedObjectStore(throttle_rate=0.5, seed=1)
+    previous = policy.get_read_policy()
+    policy.set_read_policy(ReadPolicy(retries=20, backoff=0.001))
+    try:
+        assert filesystem.read_bytes(href, filesystem=store) == b"radiance" * 1000
+    finally:
+        policy.set_read_policy(previous)
+    assert store.stats.throttled > 0
+
+    with pytest.raises(ThrottlingError):
+        for _ in range(100):
+            store.cat_file(href)
@@ -1,8 +1,9 @@
 from pathlib import Path
+from typing import List, Optional
 
 import pytest
 
-from stactools.sentinel3 import stac
+from stactools.sentinel3 import metadata_links, stac
 from stactools.sentinel3.constants import (
     OLCI_L1_ASSET_KEYS,
     OLCI_L2_LAND_ASSET_KEYS,
@@ -16,6 +17,7 @@ from stactools.sentinel3.constants import (
     SYNERGY_V10_VG1_ASSET_KEYS,
     SYNERGY_VGP_ASSET_KEYS,
 )
+from stactools.sentinel3.metadata_links import NcHeader
 
 ASSET_KEY_LISTS = [
     OLCI_L1_ASSET_KEYS[0],
@@ -59,3 +61,109 @@ def test_kebab_assets(key: str, expected: str) -> None:
 def test_id(ol_1_efr: Path) -> None:
     item = stac.create_item(str(ol_1_efr), skip_nc=True)
     assert item.id == "S3A_OL_1_EFR_20211021T073827_20211021T074112_0164_077_334_4320"
+
+
+def test_create_item_dict_matches_create_item(ol_1_efr: Path) -> None:
+    item_dict = stac.create_item_dict(str(ol_1_efr), skip_nc=True)
+    item = stac.create_item(str(ol_1_efr), skip_nc=True)
+    assert item_dict == item.to_dict()
+    assert list(item_dict["assets"]) == list(item.assets)
+
+
+@pytest.mark.parametrize(
+    "location,group",
+    [
+        ("Oa01_radiance.nc", "radiance"),
+        ("./S1_radiance_an.nc", "radiance_an"),
+        ("F1_BT_fo.nc", "BT_fo"),
+        ("Syn_S1N_reflectance.nc", "Syn_reflectance"),
+        ("geodetic_an.nc", None),
+        ("FRP_in.nc", None),
+    ],
+)
+def test_grid_group(location: str, group: Optional[str]) -> None:
+    assert metadata_links.grid_group(location) == group
+
+
+def test_probe(ol_1_efr: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    opened: List[str] = []
+    open_nc_header = metadata_links.open_nc_header
+
+    def counting(path: str, memory: Optional[bytes] = None) -> NcHeader:
+        opened.append(path)
+        return open_nc_header(path, memory)
+
+    monkeypatch.setattr(metadata_links, "open_nc_header", counting)
+    expected = stac.create_item_dict(str(ol_1_efr), probe="all")
+    assert len(opened) == 21
+    for probe, opens in [("grouped", 1), ("strict", 2), ("derived", 0)]:
+        opened.clear()
+        assert stac.create_item_dict(str(ol_1_efr), probe=probe) == expected
+        assert len(opened) == opens
+
+
+@pytest.mark.parametrize(
+    "granule,opens",
+    [
+        (
+            "S3A_SL_1_RBT____20210930T220914_20210930T221214_20211002T102150_"
+            "0180_077_043_5400_LN2_O_NT_004.SEN3",
+            0,
+        ),
+        (
+            "S3A_SL_2_LST____20210510T002955_20210510T003255_20210511T101010_"
+            "0179_071_301_5760_LN2_O_NT_004.SEN3",
+            10,
+        ),
+        # FRP bands mix the 500 m and 1 km grids, so its data file is opened
+        (
+            "S3A_SL_2_FRP____20210802T000420_20210802T000720_20210803T123912_"
+            "0179_074_344_2880_LN2_O_NT_004.SEN3",
+            14,
+        ),
+        # L2P data is on the 1 km grid of its bands
+        (
+            "S3B_SL_2_WST____20210419T051754_20210419T065853_20210420T160434_"
+            "6059_051_247______MAR_O_NT_003.SEN3",
+            0,
+        ),
+        (
+            "S3A_SY_2_SYN____20210325T005418_20210325T005718_20210325T142858_"
+            "0180_070_031_1620_LN2_O_ST_002.SEN3",
+            13,
+        ),
+    ],
+)
+def test_derived_probe(
+    granule: str, opens: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    href = str(Path(__file__).parent / "data-files" / granule)
+    opened: List[str] = []
+    open_nc_header = metadata_links.open_nc_header
+
+    def counting(path: str, memory: Optional[bytes] = None) -> NcHeader:
+        opened.append(path)
+        return open_nc_header(path, memory)
+
+    # Opening every file is the ground truth
+    expected = stac.create_item_dict(href, probe="all")
+    monkeypatch.setattr(metadata_links, "open_nc_header", counting)
+    assert stac.create_item_dict(href, probe="derived") == expected
+    # Files of assets without bands, and Synergy files, are still opened
+    assert len(opened) == opens
+    links = metadata_links.MetadataLinks(href, probe="derived")
+    assert len(links.read_nc_headers()) == opens
+
+
+def test_strict_probe_falls_back(ol_1_efr: Path) -> None:
+    wrong = NcHeader(dimensions={"columns": 1, "rows": 1}, attributes={})
+    links = metadata_links.MetadataLinks(
+        str(ol_1_efr), nc_headers={"Oa01_radiance.nc": wrong}, probe="strict"
+    )
+    headers = links.read_nc_headers()
+    assert headers["Oa01_radiance.nc"] == wrong
+    # The second file differs from the first, so every file is opened
+    assert len(headers) == 21
+    assert headers["Oa21_radiance.nc"] == headers["Oa02_radiance.nc"] != wrong
+    with pytest.raises(ValueError):
+        metadata_links.MetadataLinks(str(ol_1_efr), probe="some")
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+
+from stactools.sentinel3 import stac
+from stactools.sentinel3.metadata_links import MetadataLinks
+from stactools.sentinel3.templates import get_item_template
+
+
+def test_template_is_cached(ol_1_efr: Path) -> None:
+    manifest = MetadataLinks(str(ol_1_efr)).manifest
+    template = get_item_template(manifest)
+    assert get_item_template(manifest) is template
+    assert template.product_type == "OL_1_EFR___"
+    assert len(template.assets) == 21
+    assert template.asset_keys["Oa01_radianceData"] == "oa01-radiance"
+
+
+def test_template_is_frozen(ol_1_efr: Path) -> None:
+    template = get_item_template(MetadataLinks(str(ol_1_efr)).manifest)
+    with pytest.raises(AttributeError):
+        template.assets[0].description = "foo"  # type: ignore
+    with pytest.raises(TypeError):
+        template.assets[0].bands[0]["name"] = "foo"  # type: ignore
+
+
+def test_items_do_not_share_template_state(ol_1_efr: Path) -> None:
+    first = stac.create_item_dict(str(ol_1_efr), skip_nc=True)
+    first["assets"]["oa01-radiance"]["eo:bands"][0]["name"] = "changed"
+    first["assets"]["oa01-radiance"]["roles"].append("changed")
+    second = stac.create_item_dict(str(ol_1_efr), skip_nc=True)
+    assert second["assets"]["oa01-radiance"]["eo:bands"][0]["name"] == "Oa01"
+    assert second["assets"]["oa01-radiance"]["roles"] == ["data"]
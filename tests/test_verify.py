@@ -0,0 +1,85 @@
+import hashlib
+import pickle
+import shutil
+from pathlib import Path
+
+import pytest
+
+from stactools.sentinel3 import batch, verify
+from stactools.sentinel3.metadata_links import HEADER_READ_SIZE, open_nc_header
+from stactools.sentinel3.stac import create_item_dict
+from stactools.sentinel3.verify import ChecksumMismatchError, verify_checksums
+
+
+def test_verify_checksums(synthetic_granule: Path) -> None:
+    report = verify_checksums(str(synthetic_granule), chunk_size=1000)
+    assert [result.data_object.path for result in report.files] == [
+        "Oa01_radiance.nc",
+        "geo_coordinates.nc",
+    ]
+    assert all(result.ok for result in report.files)
+    assert report.mismatches == []
+    assert report.bytes == 8000 + 5500
+    assert report.throughput > 0
+    # The synthetic files are not NetCDF, so there is nothing to probe
+    assert report.nc_headers == {}
+
+
+def test_mismatch(synthetic_granule: Path) -> None:
+    (synthetic_granule / "geo_coordinates.nc").write_bytes(b"coordinates" * 499 + b"x")
+    report = verify_checksums(str(synthetic_granule), executor="process")
+    assert [result.data_object.path for result in report.mismatches] == [
+        "geo_coordinates.nc"
+    ]
+    error = pickle.loads(
+        pickle.dumps(ChecksumMismatchError(str(synthetic_granule), report.mismatches))
+    )
+    assert error.mismatches == report.mismatches
+
+
+def test_probe_nc(synthetic_granule: Path, ol_1_efr: Path) -> None:
+    data = (ol_1_efr / "Oa01_radiance.nc").read_bytes()
+    (synthetic_granule / "Oa01_radiance.nc").write_bytes(data)
+    manifest = synthetic_granule / "xfdumanifest.xml"
+    text = manifest.read_text()
+    text = text.replace(
+        hashlib.md5(b"radiance" * 1000).hexdigest(), hashlib.md5(data).hexdigest()
+    )
+    manifest.write_text(text)
+
+    report = verify_checksums(str(synthetic_granule), probe_nc=True)
+    assert report.mismatches == []
+    assert list(report.nc_headers) == ["Oa01_radiance.nc"]
+
+
+def test_create_item_rejects_mismatch(ol_1_efr: Path, tmp_path: Path) -> None:
+    # The test data files are trimmed, so they do not match their manifest
+    granule = tmp_path / ol_1_efr.name
+    shutil.copytree(ol_1_efr, granule)
+    with pytest.raises(ChecksumMismatchError):
+        create_item_dict(str(granule), verify_checksums=True)
+
+    ((_, error),) = batch.create_items([str(granule)], verify_checksums=True)
+    assert isinstance(error, ChecksumMismatchError)
+
+
+def test_probe_keeps_only_the_header(tmp_path: Path) -> None:
+    from .test_hdf5 import make_netcdf
+
+    data = make_netcdf(tmp_path / "a.nc")
+    expected = open_nc_header(str(tmp_path / "a.nc"))
+    header_probe = verify._HeaderProbe("a.nc")
+    chunk_size = 1000
+    for start in range(0, len(data), chunk_size):
+        header_probe.feed(data[start : start + chunk_size])
+        if start + chunk_size >= HEADER_READ_SIZE:
+            # Probed from the first bytes, which are then released
+            assert header_probe.header == expected
+            assert not header_probe._head
+    assert header_probe.finish() == expected
+
+    # Files with the header after their data are kept up to their end
+    data = make_netcdf(tmp_path / "b.nc", late_attributes=True)
+    header_probe = verify._HeaderProbe("b.nc")
+    header_probe.feed(data)
+    assert header_probe.finish() == open_nc_header(str(tmp_path / "b.nc"))